@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Hermetic benchmark harness for the setup modules.
+
+Runs each module in src/modules against a temporary HOME, with PATH
+containing only stand-ins (shim.py) for git, code, gsettings, dconf,
+defaults, osascript and the other tools the modules call. Every module is
+run twice: a cold run against the empty HOME and a warm re-run, where there
+should be nothing left to do. Each run records:
+
+- wall-clock time
+- process spawns, in total and per command
+- filesystem operations on the fake HOME and the repo's config files
+
+Results are printed as JSON so runs on different commits can be compared.
+Use --baseline to compare against an earlier result and fail on regressions.
+
+Usage:
+  uv run benchmarks/harness.py > results.json
+  uv run benchmarks/harness.py --module git --runs 10
+  uv run benchmarks/harness.py --baseline results.json
+  uv run benchmarks/harness.py --copy   # Copy config files, as Windows does
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+
+sys.path.insert(0, str(REPO_ROOT))
+
+from src.modules.vscode import EXTENSIONS  # noqa: E402
+from src.utils import registry, vsix_cache  # noqa: E402
+
+# Tools the modules call, all stood in for by shim.py
+SHIMMED_TOOLS = [
+    "git",
+    "code",
+    "gsettings",
+    "dconf",
+    "defaults",
+    "osascript",
+    "killall",
+    "sudo",
+]
+
+# Allowed slowdown in wall time against a baseline before it is a regression
+WALL_TIME_TOLERANCE = 1.5
+
+
+@dataclass
+class RunResult:
+    """Measurements from running one module once."""
+
+    wall_ms: float
+    exit_code: int
+    spawns: int
+    fs_ops: int
+    spawns_by_command: dict[str, int] = field(default_factory=dict)
+    fs_ops_by_kind: dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class ModuleBenchmark:
+    """Cold and warm measurements for one module."""
+
+    module: str
+    cold: RunResult
+    warm: RunResult
+
+
+def make_vsix(extension_id: str) -> bytes:
+    """Build a minimal VSIX package for an extension."""
+    publisher, _, name = extension_id.partition(".")
+    manifest = {"publisher": publisher, "name": name, "version": "1.0.0"}
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("extension/package.json", json.dumps(manifest))
+    return buffer.getvalue()
+
+
+class Sandbox:
+    """A temporary HOME with its own shim PATH and tool state."""
+
+    def __init__(self, root: Path, copy: bool = False) -> None:
+        self.root = root
+        self.copy = copy
+        self.home = root / "home"
+        self.shims = root / "shims"
+        self.state = root / "shim-state"
+        for directory in (self.home, self.shims, self.state):
+            directory.mkdir(parents=True)
+
+        shim_source = (BENCHMARKS_DIR / "shim.py").read_text(encoding="utf-8")
+        # Point the shebang at this interpreter, since PATH holds only shims
+        shim_source = shim_source.replace("#!/usr/bin/env python3", f"#!{sys.executable}", 1)
+        for tool in SHIMMED_TOOLS:
+            shim = self.shims / tool
+            shim.write_text(shim_source, encoding="utf-8")
+            shim.chmod(0o755)
+
+        # Never reach the marketplace: every extension is a cache hit
+        for extension in EXTENSIONS:
+            vsix_cache.store(make_vsix(extension), self.vsix_cache)
+
+    @property
+    def vsix_cache(self) -> Path:
+        """The VSIX cache directory used by the sandboxed runs."""
+        return self.root / "vsix-cache"
+
+    def env(self) -> dict[str, str]:
+        """Get a hermetic environment for the CLI."""
+        home = str(self.home)
+        env = {
+            "PATH": str(self.shims),
+            "HOME": home,
+            "USERPROFILE": home,
+            "XDG_CONFIG_HOME": str(self.home / ".config"),
+            "XDG_CACHE_HOME": str(self.home / ".cache"),
+            "XDG_STATE_HOME": str(self.home / ".local" / "state"),
+            "GIT_CONFIG_GLOBAL": str(self.home / ".gitconfig"),
+            "GIT_USER_EMAIL": "bench@example.com",
+            "GIT_USER_NAME": "Bench",
+            "DOTFILES_SHIM_STATE": str(self.state),
+            "DOTFILES_VSIX_CACHE": str(self.vsix_cache),
+            "PYTHONDONTWRITEBYTECODE": "1",
+            "LANG": os.environ.get("LANG", "C.UTF-8"),
+        }
+        if self.copy:
+            env["DOTFILES_LINK_MODE"] = "copy"
+        return env
+
+    def run(self, module: str) -> RunResult:
+        """Run one module through the instrumented CLI."""
+        counts_file = self.root / "counts.json"
+        start = time.perf_counter()
+        result = subprocess.run(
+            [
+                sys.executable,
+                str(BENCHMARKS_DIR / "instrument.py"),
+                str(counts_file),
+                str(self.home),
+                str(REPO_ROOT / "config"),
+                "--",
+                "--module",
+                module,
+            ],
+            cwd=REPO_ROOT,
+            env=self.env(),
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        wall_ms = (time.perf_counter() - start) * 1000
+
+        counts = json.loads(counts_file.read_text(encoding="utf-8"))
+        spawns = counts["spawns"]
+        fs_ops = counts["fs_ops"]
+        if result.returncode != 0:
+            print(f"⚠️  {module} exited with {result.returncode}:", file=sys.stderr)
+            print(result.stdout + result.stderr, file=sys.stderr)
+        return RunResult(
+            wall_ms=round(wall_ms, 2),
+            exit_code=result.returncode,
+            spawns=sum(spawns.values()),
+            fs_ops=sum(fs_ops.values()),
+            spawns_by_command=spawns,
+            fs_ops_by_kind=fs_ops,
+        )
+
+
+def benchmark_module(module: str, runs: int, copy: bool = False) -> ModuleBenchmark:
+    """Run a module cold once, then warm the given number of times."""
+    with tempfile.TemporaryDirectory(prefix="dotfiles-harness-") as temp_dir:
+        sandbox = Sandbox(Path(temp_dir), copy=copy)
+        cold = sandbox.run(module)
+        warm_runs = [sandbox.run(module) for _ in range(runs)]
+
+    # Counts are deterministic; report the median wall time
+    warm = warm_runs[0]
+    warm.wall_ms = round(statistics.median(run.wall_ms for run in warm_runs), 2)
+    return ModuleBenchmark(module=module, cold=cold, warm=warm)
+
+
+def git_revision() -> str | None:
+    """Get the commit being benchmarked."""
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def find_regressions(results: dict[str, Any], baseline: dict[str, Any]) -> list[str]:
+    """Compare results against a baseline, returning a message per regression."""
+    regressions = []
+    previous_modules = {entry["module"]: entry for entry in baseline["modules"]}
+    for entry in results["modules"]:
+        previous = previous_modules.get(entry["module"])
+        if previous is None:
+            continue
+        for phase in ("cold", "warm"):
+            now, before = entry[phase], previous[phase]
+            for metric in ("spawns", "fs_ops"):
+                if now[metric] > before[metric]:
+                    regressions.append(
+                        f"{entry['module']} {phase} {metric}: {before[metric]} -> {now[metric]}"
+                    )
+            if now["wall_ms"] > before["wall_ms"] * WALL_TIME_TOLERANCE:
+                regressions.append(
+                    f"{entry['module']} {phase} wall_ms: {before['wall_ms']} -> {now['wall_ms']}"
+                )
+    return regressions
+
+
+def main() -> int:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Hermetic benchmark of the setup modules")
+    parser.add_argument("--module", action="append", help="Only benchmark these modules")
+    parser.add_argument("--runs", type=int, default=3, help="Warm runs per module (default: 3)")
+    parser.add_argument("--output", type=Path, help="Write the JSON results to a file")
+    parser.add_argument("--baseline", type=Path, help="Fail on regressions against a result")
+    parser.add_argument(
+        "--copy", action="store_true", help="Copy config files instead of symlinking them"
+    )
+    args = parser.parse_args()
+
+    modules = args.module or [module.name for module in registry.MODULES]
+    benchmarks = []
+    for module in modules:
+        print(f"Benchmarking {module}...", file=sys.stderr)
+        benchmarks.append(benchmark_module(module, max(args.runs, 1), args.copy))
+
+    results: dict[str, Any] = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": sys.platform,
+        "time": time.time(),
+        "link_mode": "copy" if args.copy else "symlink",
+        "modules": [asdict(benchmark) for benchmark in benchmarks],
+    }
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = find_regressions(results, baseline)
+        for regression in regressions:
+            print(f"⚠️  Regression: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+
+    failed = [b.module for b in benchmarks if b.cold.exit_code or b.warm.exit_code]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Run the dotfiles CLI while counting process spawns and filesystem operations.
+
+Used by harness.py. Spawns are counted with the subprocess.Popen audit event.
+Filesystem operations are counted with the os/shutil audit events plus
+counting wrappers around os.stat, os.lstat and os.readlink, which raise no
+audit events. Only operations on paths under the watched directories (the
+fake HOME and the repo's config/) are counted, so reading Python sources
+during imports doesn't drown out the setup's own work.
+
+Usage:
+  python benchmarks/instrument.py COUNTS.json WATCHED_DIR... -- CLI_ARGS...
+"""
+
+import json
+import os
+import runpy
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Audit events for filesystem operations, and how many path arguments they take
+FS_EVENTS = {
+    "open": 1,
+    "os.listdir": 1,
+    "os.scandir": 1,
+    "os.mkdir": 1,
+    "os.rmdir": 1,
+    "os.remove": 1,
+    "os.rename": 2,
+    "os.symlink": 2,
+    "os.link": 2,
+    "os.truncate": 1,
+    "os.utime": 1,
+    "os.chmod": 1,
+    "os.chown": 1,
+    "shutil.copyfile": 2,
+    "shutil.rmtree": 1,
+}
+
+
+def main() -> None:
+    """Main entry point."""
+    separator = sys.argv.index("--")
+    counts_file = Path(sys.argv[1])
+    watched = tuple(os.path.realpath(path) + os.sep for path in sys.argv[2:separator])
+    cli_args = sys.argv[separator + 1 :]
+
+    spawns: Counter[str] = Counter()
+    fs_ops: Counter[str] = Counter()
+
+    def is_watched(path: Any) -> bool:
+        if isinstance(path, bytes):
+            path = os.fsdecode(path)
+        if not isinstance(path, str | os.PathLike):
+            return False  # File descriptors
+        # Not Path.resolve(): its lstat calls would be counted, and recurse into here
+        return os.path.abspath(path).startswith(watched)  # noqa: PTH100
+
+    def audit(event: str, args: tuple[Any, ...]) -> None:
+        if event == "subprocess.Popen":
+            argv = args[1] if isinstance(args[1], list | tuple) else [args[0]]
+            spawns[Path(str(argv[0])).name] += 1
+        elif event in FS_EVENTS and any(is_watched(a) for a in args[: FS_EVENTS[event]]):
+            fs_ops[event] += 1
+
+    def counting(name: str, function: Any) -> Any:
+        def wrapper(path: Any, *args: Any, **kwargs: Any) -> Any:
+            if is_watched(path):
+                fs_ops[name] += 1
+            return function(path, *args, **kwargs)
+
+        return wrapper
+
+    os.stat = counting("os.stat", os.stat)
+    os.lstat = counting("os.lstat", os.lstat)
+    os.readlink = counting("os.readlink", os.readlink)
+    sys.addaudithook(audit)
+
+    sys.argv = [str(REPO_ROOT / "src" / "main.py"), *cli_args]
+    sys.path.insert(0, str(REPO_ROOT))
+    exit_code: Any = 0
+    try:
+        runpy.run_module("src.main", run_name="__main__", alter_sys=True)
+    except SystemExit as e:
+        exit_code = e.code
+    finally:
+        with counts_file.open("w", encoding="utf-8") as f:
+            json.dump({"spawns": dict(spawns), "fs_ops": dict(fs_ops)}, f)
+
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Stand-in for the external tools the setup modules call.
+
+harness.py installs this script under the name of each tool (git, code,
+gsettings, dconf, defaults, osascript, ...) on a PATH of its own. It
+emulates just enough of each tool for the modules to run, keeping state in
+$DOTFILES_SHIM_STATE so a warm re-run sees what the cold run applied.
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+STATE_DIR = Path(os.environ.get("DOTFILES_SHIM_STATE", "."))
+
+DEFAULT_TERMINAL_PROFILE = "b1dcc9dd-5262-4d8d-a863-c897e6d979b9"
+
+
+def code(args: list[str]) -> int:
+    """VSCode CLI: lists and installs extensions."""
+    extensions_file = STATE_DIR / "code-extensions.txt"
+    installed = extensions_file.read_text().split() if extensions_file.exists() else []
+
+    if "--list-extensions" in args:
+        for extension in installed:
+            print(extension if "--show-versions" in args else extension.partition("@")[0])
+        return 0
+
+    for index, arg in enumerate(args[:-1]):
+        if arg == "--install-extension":
+            # Either an extension id or a cached publisher.name@version.vsix path
+            name = Path(args[index + 1]).name.removesuffix(".vsix")
+            extension = name if "@" in name else f"{name}@1.0.0"
+            if extension not in installed:
+                installed.append(extension)
+    extensions_file.write_text("\n".join(installed) + "\n")
+    return 0
+
+
+def load_dconf() -> dict[str, str]:
+    """Load the emulated dconf database."""
+    try:
+        return dict(json.loads((STATE_DIR / "dconf.json").read_text()))
+    except (OSError, ValueError):
+        return {}
+
+
+def dconf(args: list[str]) -> int:
+    """dconf: read, write, dump and load keys in a JSON-backed database."""
+    database = load_dconf()
+    command, path = args[0], args[1] if len(args) > 1 else "/"
+
+    if command == "read":
+        if path in database:
+            print(database[path])
+        return 0
+
+    if command == "dump":
+        sections: dict[str, list[str]] = {}
+        for key, value in sorted(database.items()):
+            if key.startswith(path):
+                directory, _, name = key.rpartition("/")
+                section = directory[len(path) :].strip("/") or "/"
+                sections.setdefault(section, []).append(f"{name}={value}")
+        for section, lines in sections.items():
+            print(f"[{section}]")
+            print("\n".join(lines))
+            print()
+        return 0
+
+    if command == "write":
+        database[path] = args[2]
+    elif command == "load":
+        section = path
+        for raw_line in sys.stdin.read().splitlines():
+            line = raw_line.strip()
+            if line.startswith("[") and line.endswith("]"):
+                name = line[1:-1].strip("/")
+                section = f"{path}{name}/" if name else path
+            elif "=" in line:
+                key, _, value = line.partition("=")
+                database[f"{section}{key}"] = value
+    else:
+        return 1
+
+    (STATE_DIR / "dconf.json").write_text(json.dumps(database))
+    return 0
+
+
+def gsettings(args: list[str]) -> int:
+    """gsettings: only knows the GNOME Terminal default profile."""
+    if args[:3] == ["get", "org.gnome.Terminal.ProfilesList", "default"]:
+        print(f"'{DEFAULT_TERMINAL_PROFILE}'")
+        return 0
+    return 0 if args and args[0] == "set" else 1
+
+
+def defaults(args: list[str]) -> int:
+    """macOS defaults: export and import whole domains as plist files."""
+    scope = ""
+    if args and args[0] == "-currentHost":
+        scope, args = "currentHost.", args[1:]
+    command, domain = args[0], args[1]
+    plist = STATE_DIR / "defaults" / f"{scope}{domain}.plist"
+
+    if command == "export":
+        if not plist.exists():
+            print(f"Domain {domain} does not exist", file=sys.stderr)
+            return 1
+        sys.stdout.write(plist.read_text())
+        return 0
+    if command == "import":
+        plist.parent.mkdir(parents=True, exist_ok=True)
+        plist.write_text(sys.stdin.read())
+        return 0
+    return 1
+
+
+TOOLS = {"code": code, "dconf": dconf, "gsettings": gsettings, "defaults": defaults}
+
+
+def main() -> int:
+    """Main entry point."""
+    tool = Path(sys.argv[0]).name
+    handler = TOOLS.get(tool)
+    # git, osascript, killall, sudo... succeed without doing anything
+    return handler(sys.argv[1:]) if handler else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
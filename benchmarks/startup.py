@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark for the dotfiles CLI.
+
+Measures `--list`, `--dry-run` and a no-op run (a second run after
+everything has been applied): how many modules each imports and how long
+the imports take, as reported by `python -X importtime`, and its wall-clock
+time. Runs use the sandbox of harness.py, a throwaway HOME and a PATH
+holding only stand-ins for git, code, dconf, defaults and the other tools,
+so they never touch your real dotfiles, desktop settings or the network.
+
+The import counts are checked against startup_budget.json next to this
+script, and the benchmark exits non-zero if a scenario imports more modules
+than budgeted. Counts do not depend on the machine, unlike times, which are
+only reported; they do depend on the Python version, so the budget records
+the version it was taken with.
+
+Usage:
+  uv run benchmarks/startup.py                   # Check against the budget
+  uv run benchmarks/startup.py --runs 10         # More samples per scenario
+  uv run benchmarks/startup.py --update-budget   # Record a new budget
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from harness import REPO_ROOT, Sandbox
+
+BUDGET_FILE = Path(__file__).resolve().parent / "startup_budget.json"
+
+# Scenario name -> CLI arguments
+SCENARIOS = {
+    "list": ["--list"],
+    "dry-run": ["--dry-run"],
+    "no-op": [],
+}
+
+
+@dataclass
+class ScenarioResult:
+    """Imports and timings for one CLI scenario."""
+
+    name: str
+    imports: int
+    wall_ms: float
+    import_ms: float
+    slowest_imports: list[tuple[str, float]] = field(default_factory=list)
+
+
+def run_cli(args: list[str], env: dict[str, str], importtime: bool = False) -> tuple[float, str]:
+    """
+    Run the CLI once.
+
+    Returns:
+        The wall-clock time in milliseconds and the captured stderr
+    """
+    flags = ["-X", "importtime"] if importtime else []
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, *flags, "-m", "src.main", *args],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    return (time.perf_counter() - start) * 1000, result.stderr
+
+
+def parse_importtime(stderr: str) -> tuple[int, dict[str, float]]:
+    """
+    Parse `-X importtime` output.
+
+    Returns:
+        The number of modules imported, and the cumulative milliseconds of
+        each top-level import
+    """
+    count = 0
+    imports: dict[str, float] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue  # Header line
+        count += 1
+        name = fields[2].rstrip()
+        # Nested imports are indented under the import that triggered them
+        if name.startswith("  "):
+            continue
+        name = name.strip()
+        imports[name] = imports.get(name, 0.0) + int(fields[1]) / 1000
+    return count, imports
+
+
+def measure(name: str, args: list[str], env: dict[str, str], runs: int) -> ScenarioResult:
+    """Measure one scenario: its imports and median wall time."""
+    wall = [run_cli(args, env)[0] for _ in range(runs)]
+    _, stderr = run_cli(args, env, importtime=True)
+    count, imports = parse_importtime(stderr)
+    slowest = sorted(imports.items(), key=lambda item: item[1], reverse=True)[:5]
+    return ScenarioResult(
+        name=name,
+        imports=count,
+        wall_ms=statistics.median(wall),
+        import_ms=sum(imports.values()),
+        slowest_imports=[(module, round(ms, 2)) for module, ms in slowest],
+    )
+
+
+def python_version() -> str:
+    """Get the Python version import counts are comparable within."""
+    return ".".join(platform.python_version_tuple()[:2])
+
+
+def load_budget() -> dict[str, Any]:
+    """Load the recorded budget, or an empty one if there is none yet."""
+    try:
+        return dict(json.loads(BUDGET_FILE.read_text(encoding="utf-8")))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_budget(results: list[ScenarioResult]) -> None:
+    """Record the measured import counts as the new budget."""
+    budget: dict[str, Any] = {"python": python_version()}
+    budget.update({result.name: {"imports": result.imports} for result in results})
+    BUDGET_FILE.write_text(json.dumps(budget, indent=2) + "\n", encoding="utf-8")
+    print(f"Recorded budget in {BUDGET_FILE}")
+
+
+def check_budget(results: list[ScenarioResult], budget: dict[str, Any]) -> bool:
+    """Print each result against its budget and check that none is over."""
+    within = True
+    print(f"{'scenario':<10} {'imports':>8} {'budget':>8} {'import ms':>10} {'wall ms':>10}")
+    for result in results:
+        limit = budget.get(result.name, {}).get("imports", float("inf"))
+        over = result.imports > limit
+        within = within and not over
+        print(
+            f"{result.name:<10} {result.imports:>8} {limit:>8} "
+            f"{result.import_ms:>10.1f} {result.wall_ms:>10.1f}"
+            f"{'  ⚠️  over budget' if over else ''}"
+        )
+        for module, ms in result.slowest_imports:
+            print(f"{'':<12}{module}: {ms} ms")
+    return within
+
+
+def main() -> int:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark dotfiles CLI startup time")
+    parser.add_argument("--runs", type=int, default=5, help="Samples per scenario (default: 5)")
+    parser.add_argument(
+        "--update-budget", action="store_true", help="Record the results as the new budget"
+    )
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="dotfiles-startup-") as temp_dir:
+        env = Sandbox(Path(temp_dir)).env()
+        results = [measure("list", SCENARIOS["list"], env, args.runs)]
+        results.append(measure("dry-run", SCENARIOS["dry-run"], env, args.runs))
+
+        # Apply everything once so the measured run has nothing left to do
+        run_cli(SCENARIOS["no-op"], env)
+        results.append(measure("no-op", SCENARIOS["no-op"], env, args.runs))
+
+    if args.json:
+        print(json.dumps([asdict(result) for result in results], indent=2))
+
+    if args.update_budget:
+        save_budget(results)
+        return 0
+
+    budget = load_budget()
+    if not budget:
+        print(f"No budget recorded in {BUDGET_FILE}; run with --update-budget")
+    elif budget.get("python") != python_version():
+        print(
+            f"The budget was not recorded with Python {python_version()}, whose standard "
+            "library imports differ; re-record it with --update-budget"
+        )
+        budget = {}
+    return 0 if check_budget(results, budget) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,15 +2,55 @@
 """
 Main entry point for the dotfiles setup system.
 Provides CLI interface for configuration management.
+
+Only what --list needs is imported at startup; asyncio, the scheduler and
+the setup modules are imported on the paths that use them.
 """
 
+from __future__ import annotations
+
 import argparse
-import asyncio
-import importlib
 import os
-import platform
 import sys
+import time
+import weakref
 from pathlib import Path
+from typing import TYPE_CHECKING
+
+# Allow running as a script (uv run src/main.py) as well as with python -m src.main
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.utils import registry
+
+if TYPE_CHECKING:
+    import asyncio
+    from types import ModuleType
+
+    from src.utils.metrics import RunMetrics
+    from src.utils.plan import Plan
+    from src.utils.scheduler import ModuleSpec
+    from src.utils.targets import Target
+
+DEFAULT_JOBS = 4
+
+# Default cap on concurrent external commands; process.DEFAULT_MAX_WORKERS,
+# repeated so --list doesn't import the executor
+DEFAULT_MAX_COMMANDS = 8
+
+# Seconds a module may run before it is cancelled
+DEFAULT_MODULE_TIMEOUT = 600
+
+# --check exit codes: managed items have drifted, could not all be checked,
+# or could not be verified because the tools that read them are missing
+EXIT_DRIFT = 1
+EXIT_CHECK_FAILED = 2
+EXIT_UNVERIFIED = 3
+
+# Module runs of each event loop (i.e. each run), so every module runs at most once
+_module_runs: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[str, asyncio.Future[bool]]
+] = weakref.WeakKeyDictionary()
 
 
 def setup_argparser() -> argparse.ArgumentParser:
@@ -23,7 +63,22 @@ Examples:
   %(prog)s                    # Run all setup modules
   %(prog)s --module git       # Run only git setup
   %(prog)s --dry-run          # Show what would be done
+  %(prog)s --check            # Exit non-zero if anything has drifted (for monitoring)
+  %(prog)s --watch            # Keep running, re-applying whatever a file change affects
+  %(prog)s --jobs 1           # Run modules one at a time
+  %(prog)s --max-commands 2   # Run at most two external commands at a time
+  %(prog)s --home /home/alice /home/bob   # Provision other users' home directories
+  %(prog)s --root build/rootfs            # Provision a container root filesystem
+  %(prog)s --export-tar dotfiles.tar.gz   # Reproducible archive for a container layer
+  %(prog)s --force            # Re-apply everything, even if unchanged
+  %(prog)s --copy --checksum  # Copy config files instead of linking, comparing contents
+  %(prog)s --timeout 900      # Give up on modules still running after 15 minutes
+  %(prog)s --trace trace.json # Record where the time goes (open in Perfetto)
+  %(prog)s --profile          # Profile each module and summarise hot functions
+  %(prog)s --metrics-file /var/lib/node_exporter/dotfiles.prom
+  %(prog)s --seed-vsix-cache  # Download VSCode extensions into the local cache
   %(prog)s --list             # List available modules
+  %(prog)s --history          # Show run history and flag slow modules
         """,
     )
 
@@ -39,12 +94,166 @@ Examples:
         help="Show what would be done without making changes",
     )
 
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help=(
+            f"Verify every managed item without changing anything; exits {EXIT_DRIFT} on "
+            f"drift, {EXIT_CHECK_FAILED} if the current state could not be read and "
+            f"{EXIT_UNVERIFIED} if items could not be verified, e.g. without dconf or code"
+        ),
+    )
+
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help=(
+            "After the run, keep watching config/ and the managed paths and re-apply "
+            "only the actions a change affects"
+        ),
+    )
+
+    parser.add_argument(
+        "--home",
+        type=Path,
+        nargs="+",
+        action="extend",
+        metavar="DIR",
+        help="Apply to these home directories instead of your own, in parallel",
+    )
+
+    parser.add_argument(
+        "--root",
+        type=Path,
+        nargs="+",
+        action="extend",
+        metavar="DIR",
+        help="Apply inside these root filesystems (e.g. container rootfs trees), in parallel",
+    )
+
+    parser.add_argument(
+        "--export-tar",
+        type=Path,
+        metavar="FILE",
+        help=(
+            "Materialize the result into an empty staging root and write it as a reproducible "
+            "tar archive (gzipped if FILE ends in .gz), e.g. for a container layer"
+        ),
+    )
+
+    parser.add_argument(
+        "--stage",
+        type=Path,
+        metavar="DIR",
+        help="Empty directory to use, and keep, as the --export-tar staging root",
+    )
+
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f"Maximum number of modules to run concurrently (default: {DEFAULT_JOBS})",
+    )
+
+    parser.add_argument(
+        "--max-commands",
+        type=int,
+        default=DEFAULT_MAX_COMMANDS,
+        metavar="N",
+        help=(
+            "Maximum number of external commands running at once, across all modules "
+            f"(default: {DEFAULT_MAX_COMMANDS})"
+        ),
+    )
+
+    parser.add_argument(
+        "--module-timeout",
+        type=float,
+        default=DEFAULT_MODULE_TIMEOUT,
+        metavar="SECONDS",
+        help=(
+            "Cancel a module, killing its commands, after this long "
+            f"(default: {DEFAULT_MODULE_TIMEOUT}, 0 for no limit)"
+        ),
+    )
+
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        metavar="SECONDS",
+        help="Deadline for the whole run; modules still running or waiting then are cancelled",
+    )
+
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Ignore the state manifest and re-apply every action",
+    )
+
+    parser.add_argument(
+        "--copy",
+        action="store_true",
+        help="Keep synced copies of config files instead of symlinks, as Windows does "
+        "when it may not create symlinks",
+    )
+
+    parser.add_argument(
+        "--checksum",
+        action="store_true",
+        help="Compare file contents, not just size and modification time, when syncing copies",
+    )
+
+    parser.add_argument(
+        "--trace",
+        type=Path,
+        metavar="FILE",
+        help="Write a Chrome trace-event JSON of modules, file operations and commands",
+    )
+
+    parser.add_argument(
+        "--metrics-file",
+        type=Path,
+        metavar="FILE",
+        help="Write Prometheus textfile metrics (e.g. for node-exporter) to FILE",
+    )
+
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        nargs="?",
+        const=Path("profile"),
+        metavar="DIR",
+        help="Profile each module with cProfile, writing .pstats files to DIR (default: profile)",
+    )
+
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=20,
+        metavar="N",
+        help="Number of hot functions to show in the profile summary (default: 20)",
+    )
+
+    parser.add_argument(
+        "--history",
+        action="store_true",
+        help="Show module duration trends from previous runs and flag regressions",
+    )
+
     parser.add_argument(
         "--list",
         action="store_true",
         help="List all available modules",
     )
 
+    parser.add_argument(
+        "--seed-vsix-cache",
+        nargs="*",
+        metavar="VSIX",
+        help="Pre-seed the VSCode extension cache from the marketplace and any given .vsix files",
+    )
+
     parser.add_argument(
         "--verbose",
         "-v",
@@ -70,53 +279,18 @@ def get_current_platform() -> str:
     """Return the platform key for module selection. WSL is treated as its own platform."""
     if is_wsl():
         return "wsl"
-    return platform.system().lower()
+    # Same keys as platform.system().lower(), without importing platform
+    return {"win32": "windows"}.get(sys.platform, sys.platform)
 
 
 def get_platform_modules() -> dict[str, list[str]]:
-    """Define which modules should run on each platform."""
-    return {
-        "darwin": [  # macOS
-            "git",
-            "zsh",
-            "starship",
-            "vscode",
-            "osx",
-        ],
-        "linux": [  # Linux (native)
-            "git",
-            "zsh",
-            "starship",
-            "vscode",
-            "terminal",
-            "mouse",
-        ],
-        "wsl": [  # WSL: dev-only — VSCode runs on Windows via Remote-WSL, no GNOME desktop.
-            "git",
-            "zsh",
-            "starship",
-        ],
-        "windows": [  # Windows
-            "git",
-            "starship",
-            "vscode",
-            "windows",
-        ],
-    }
+    """Define which modules should run on each platform, from the module registry."""
+    return registry.get_platform_modules()
 
 
 def list_available_modules() -> list[str]:
     """List all available setup modules."""
-    modules_dir = Path(__file__).parent / "modules"
-    if not modules_dir.exists():
-        return []
-
-    modules = []
-    for module_file in modules_dir.glob("*.py"):
-        if module_file.name != "__init__.py":
-            modules.append(module_file.stem)
-
-    return sorted(modules)
+    return sorted(module.name for module in registry.MODULES)
 
 
 def get_modules_for_platform(platform_name: str | None = None) -> list[str]:
@@ -128,16 +302,142 @@ def get_modules_for_platform(platform_name: str | None = None) -> list[str]:
     return platform_modules.get(platform_name, [])
 
 
-async def run_module(module_name: str, dry_run: bool = False) -> bool:
-    """Run a specific setup module."""
+def load_module(module_name: str) -> ModuleType:
+    """Import a setup module by name."""
+    import importlib
+
+    return importlib.import_module(f"src.modules.{module_name}")
+
+
+def get_module_spec(module_name: str) -> ModuleSpec:
+    """Get the scheduling metadata for a module from the registry."""
+    from src.utils.scheduler import ModuleSpec
+
+    info = registry.get_module_info(module_name)
+    if info is None:
+        raise KeyError(module_name)
+    return ModuleSpec(
+        name=module_name,
+        dependencies=list(info.dependencies),
+        resources=list(info.resources),
+    )
+
+
+async def run_plan_module(module_name: str, module: ModuleType, dry_run: bool) -> bool:
+    """Build a module's plan and apply (or, in a dry run, preview) the changes."""
+    from src.utils.metrics import get_metrics
+    from src.utils.plan import execute
+
+    print(f"{'Planning' if dry_run else 'Running'} module: {module_name}")
+    result = await execute(
+        module.build_plan,
+        module.__name__,
+        dry_run,
+        before_apply=getattr(module, "before_apply", None),
+        after_apply=getattr(module, "after_apply", None),
+    )
+
+    metrics = get_metrics()
+    if metrics is not None:
+        metrics.record_plan(module_name, result)
+
+    if dry_run:
+        print(f"{module_name}: {result.summary(dry_run=True)}")
+    elif result.failed:
+        print(f"⚠️  {module_name} setup completed with errors: {result.summary()}")
+    else:
+        print(f"✅ {module_name} setup completed successfully: {result.summary()}")
+    return not result.failed
+
+
+def get_module_timeout(module_timeout: float | None, deadline: float | None) -> float | None:
+    """
+    Get how long a module starting now may run.
+
+    Args:
+        module_timeout: The per-module budget in seconds, or None for no limit
+        deadline: time.monotonic() by which the whole run must finish, if any
+
+    Returns:
+        The smaller of the two budgets in seconds, or None if neither is set
+    """
+    budgets = []
+    if module_timeout:
+        budgets.append(module_timeout)
+    if deadline is not None:
+        budgets.append(max(0.0, deadline - time.monotonic()))
+    return min(budgets) if budgets else None
+
+
+async def run_module(module_name: str, dry_run: bool = False, timeout: float | None = None) -> bool:
+    """
+    Run a specific setup module, at most once per run.
+
+    A module that is requested again, e.g. directly and as another module's
+    dependency, is not re-run; the caller shares the result of the first run.
+
+    Args:
+        module_name: The module to run
+        dry_run: Only show what would change
+        timeout: Seconds after which the module, and any command it is
+            running, is cancelled and counted as failed
+    """
+    import asyncio
+
+    runs = _module_runs.setdefault(asyncio.get_running_loop(), {})
+    run = runs.get(module_name)
+    if run is None:
+        run = runs[module_name] = asyncio.ensure_future(
+            run_module_once(module_name, dry_run, timeout)
+        )
+    # Shielded so a caller being cancelled doesn't cancel the run for the others
+    return await asyncio.shield(run)
+
+
+async def run_module_once(module_name: str, dry_run: bool, timeout: float | None) -> bool:
+    """Run a setup module within its time budget and record how it went."""
+    import asyncio
+
+    from src.utils.metrics import get_metrics
+    from src.utils.profiling import profile
+    from src.utils.trace import span
+
+    if registry.get_module_info(module_name) is None:
+        print(f"Error: Unknown module {module_name}. Use --list to see available modules")
+        return False
+
+    metrics = get_metrics()
+    if timeout is not None and timeout <= 0:
+        print(f"⚠️  Skipping module {module_name}: the run deadline has passed")
+        if metrics is not None:
+            metrics.record_module(module_name, 0.0, False, timed_out=True)
+        return False
+
+    start = time.monotonic()
+    timed_out = False
+    # Each module gets its own trace track so concurrent modules don't overlap
+    with span(module_name, "module", track=module_name) as details, profile(module_name):
+        try:
+            async with asyncio.timeout(timeout):
+                success = await load_and_run_module(module_name, dry_run)
+        except TimeoutError:
+            print(f"⚠️  {module_name} timed out after {timeout:.1f}s and was cancelled")
+            success = False
+            timed_out = details["timed_out"] = True
+        details["success"] = success
+
+    if metrics is not None:
+        metrics.record_module(module_name, time.monotonic() - start, success, timed_out)
+    return success
+
+
+async def load_and_run_module(module_name: str, dry_run: bool) -> bool:
+    """Import a setup module and run it, reporting any error."""
     try:
-        # Add current directory to path if needed
-        current_dir = Path(__file__).parent.parent
-        if str(current_dir) not in sys.path:
-            sys.path.insert(0, str(current_dir))
+        module = load_module(module_name)
 
-        module_path = f"src.modules.{module_name}"
-        module = importlib.import_module(module_path)
+        if hasattr(module, "build_plan"):
+            return await run_plan_module(module_name, module, dry_run)
 
         if not hasattr(module, "setup"):
             print(f"Error: Module {module_name} does not have a setup function")
@@ -160,8 +460,40 @@ async def run_module(module_name: str, dry_run: bool = False) -> bool:
         return False
 
 
-async def run_all_modules(dry_run: bool = False) -> bool:
-    """Run all platform-appropriate setup modules."""
+def get_learned_durations() -> dict[str, float]:
+    """Get each module's usual duration on this host from the run history."""
+    from src.utils.state import get_history_path
+
+    # Until a run is recorded there is nothing to learn, and no need for sqlite3
+    if not get_history_path().exists():
+        return {}
+
+    import sqlite3
+
+    from src.utils.history import get_module_durations
+
+    try:
+        return get_module_durations()
+    except (OSError, sqlite3.Error) as e:
+        print(f"Warning: Could not read run history, using the default module order: {e}")
+        return {}
+
+
+async def run_all_modules(
+    dry_run: bool = False,
+    jobs: int = DEFAULT_JOBS,
+    module_timeout: float | None = DEFAULT_MODULE_TIMEOUT,
+    deadline: float | None = None,
+) -> bool:
+    """
+    Run all platform-appropriate setup modules, concurrently where possible.
+
+    Args:
+        dry_run: Only show what would change
+        jobs: Maximum number of modules running at the same time
+        module_timeout: Seconds each module may run, or None for no limit
+        deadline: time.monotonic() by which the whole run must finish, if any
+    """
     current_platform = get_current_platform()
     modules = get_modules_for_platform(current_platform)
 
@@ -169,63 +501,522 @@ async def run_all_modules(dry_run: bool = False) -> bool:
         print(f"No modules configured for platform: {current_platform}")
         return True
 
-    print(f"Running {len(modules)} modules for {current_platform}:")
+    print(f"Running {len(modules)} modules for {current_platform} (jobs: {jobs}):")
+    return await run_modules(modules, dry_run, jobs, module_timeout, deadline)
+
+
+async def run_with_dependencies(
+    module_name: str,
+    dry_run: bool = False,
+    jobs: int = DEFAULT_JOBS,
+    module_timeout: float | None = DEFAULT_MODULE_TIMEOUT,
+    deadline: float | None = None,
+) -> bool:
+    """Run a single module, after the modules it depends on."""
+    dependencies = registry.get_dependencies(module_name)
+    if not dependencies:
+        return await run_module(module_name, dry_run, get_module_timeout(module_timeout, deadline))
+
+    print(f"Running {module_name} and the modules it depends on (jobs: {jobs}):")
+    return await run_modules([*dependencies, module_name], dry_run, jobs, module_timeout, deadline)
+
+
+async def run_modules(
+    modules: list[str],
+    dry_run: bool,
+    jobs: int,
+    module_timeout: float | None,
+    deadline: float | None,
+) -> bool:
+    """List the given modules, then run them, concurrently where possible."""
+    from src.utils.scheduler import run_scheduled
+
+    durations = get_learned_durations()
+
     for module in modules:
-        print(f"  - {module}")
+        usual = f" (usually {durations[module]:.1f}s)" if module in durations else ""
+        print(f"  - {module}{usual}")
     print()
 
-    success = True
+    specs = [get_module_spec(module_name) for module_name in modules]
+    try:
+        results = await run_scheduled(
+            specs,
+            # The budget is worked out as each module starts, against the run deadline
+            lambda name: run_module(name, dry_run, get_module_timeout(module_timeout, deadline)),
+            jobs=jobs,
+            durations=durations,
+        )
+    except ValueError as e:
+        print(f"Error: {e}")
+        return False
+
+    return all(result.success for result in results)
+
+
+async def build_plans(modules: list[str]) -> list[tuple[str, ModuleType, Plan]]:
+    """Import plan-based modules and build their plans, without applying anything."""
+    from src.utils.plan import Plan
+
+    plans = []
     for module_name in modules:
-        if not await run_module(module_name, dry_run):
-            success = False
+        module = load_module(module_name)
+        if not hasattr(module, "build_plan"):
+            print(f"⚠️  Module {module_name} has no plan, skipping")
+            continue
+        plan = Plan(module=module.__name__)
+        await module.build_plan(plan)
+        plans.append((module_name, module, plan))
+    return plans
+
+
+async def apply_to_targets(
+    built: list[tuple[str, ModuleType, Plan]],
+    targets: list[Target],
+    dry_run: bool,
+    jobs: int,
+    *,
+    force: bool = False,
+    record_state: bool = True,
+) -> bool:
+    """
+    Apply plans, built once by build_plans(), to every target in parallel.
+
+    Each target is handled in its own process, whose output is printed
+    together once the target is done.
+    """
+    import asyncio
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    from src.utils.targets import apply_to_target
+
+    names = {module.__name__: module_name for module_name, module, _ in built}
+    plans = [plan for _, _, plan in built]
+
+    print(f"\nApplying {len(plans)} module plans to {len(targets)} targets (jobs: {jobs}):")
+    loop = asyncio.get_running_loop()
+    # Spawned rather than forked, so workers start without this run's state
+    with ProcessPoolExecutor(
+        max_workers=min(jobs, len(targets)), mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        reports = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    pool, apply_to_target, target, plans, dry_run, force, record_state
+                )
+                for target in targets
+            ),
+            return_exceptions=True,
+        )
 
+    success = True
+    for target, report in zip(targets, reports, strict=True):
+        print(f"\n== {target.path} ==")
+        if isinstance(report, BaseException):
+            print(f"❌ Could not apply to {target.path}: {report}")
+            success = False
+            continue
+        output, results = report
+        print(output, end="")
+        for module_key, result in results.items():
+            print(f"{names[module_key]}: {result.summary(dry_run=dry_run)}")
+            success = success and not result.failed
     return success
 
 
-async def main_async() -> int:
+async def watch_modules(modules: list[str], dry_run: bool = False) -> int:
+    """
+    Watch the files behind the modules' plans, re-applying affected actions.
+
+    Runs until interrupted. Only actions with a changed path (a managed file,
+    its directory, or the config file a symlink points to) are diffed and,
+    if they differ, applied again.
+    """
+    from src.utils.plan import Plan, apply_plan
+    from src.utils.state import get_manifest
+    from src.utils.watch import affected_actions, open_watcher, watch_paths
+
+    loaded = {}
+    plans = []
+    for module_name, module, plan in await build_plans(modules):
+        loaded[module.__name__] = (module_name, module)
+        plans.append(plan)
+
+    paths = {path for plan in plans for action in plan.actions for path in watch_paths(action)}
+    watcher = open_watcher(paths)
+    manifest = get_manifest()
+    print(f"\nWatching {len(paths)} paths for {', '.join(modules)} (Ctrl-C to stop)")
+
+    try:
+        while True:
+            changed = await watcher.wait()
+            for module_key, actions in affected_actions(plans, changed).items():
+                module_name, module = loaded[module_key]
+                result = await apply_plan(
+                    Plan(module=module_key, actions=actions),
+                    dry_run,
+                    before_apply=getattr(module, "before_apply", None),
+                )
+                after_apply = getattr(module, "after_apply", None)
+                if not dry_run and after_apply is not None:
+                    await after_apply(result)
+                if result.changed or result.failed:
+                    print(f"{module_name}: {result.summary(dry_run=dry_run)}")
+
+            try:
+                manifest.save()
+            except OSError as e:
+                print(f"Warning: Could not save state manifest {manifest.path}: {e}")
+    finally:
+        watcher.close()
+
+
+async def seed_vsix_cache(vsix_files: list[str]) -> int:
+    """Pre-seed the local VSIX cache with every configured VSCode extension."""
+    from src.modules.vscode import EXTENSIONS
+    from src.utils import vsix_cache
+
+    print(f"Seeding VSIX cache in {vsix_cache.get_cache_dir()}")
+    report = await vsix_cache.seed(EXTENSIONS, list(vsix_files))
+    print(report.summary())
+
+    missing = [extension for extension in EXTENSIONS if vsix_cache.find_cached(extension) is None]
+    for extension in missing:
+        print(f"⚠️  {extension} is not cached")
+    return 1 if missing else 0
+
+
+def records_history(args: argparse.Namespace) -> bool:
+    """Whether a run is added to the run history."""
+    # Checks may run every few minutes, and neither they, dry runs nor runs
+    # for other targets do the work being tracked
+    return not (args.check or args.dry_run or args.home or args.root or args.export_tar)
+
+
+def record_history(metrics: RunMetrics, success: bool) -> None:
+    """Append the run to the local history and warn about slow modules."""
+    import sqlite3
+
+    from src.utils.history import get_trends, record_run
+
+    try:
+        record_run(metrics, success, get_current_platform())
+        regressed = [trend for trend in get_trends() if trend.regressed]
+    except (OSError, sqlite3.Error) as e:
+        print(f"Warning: Could not record run history: {e}")
+        return
+
+    for trend in regressed:
+        if trend.module in metrics.modules:
+            print(
+                f"⚠️  {trend.module} took {trend.latest:.2f}s, "
+                f"{trend.change:+.0%} against its usual {trend.baseline:.2f}s"
+            )
+
+
+def show_history() -> int:
+    """Print module duration trends from the run history."""
+    import sqlite3
+
+    from src.utils.history import print_history
+
+    try:
+        return print_history()
+    except (OSError, sqlite3.Error) as e:
+        print(f"Error: Could not read run history: {e}")
+        return 1
+
+
+def list_modules() -> int:
+    """Print every module, marking those that run on the current platform."""
+    all_modules = list_available_modules()
+    current_platform = get_current_platform()
+    platform_modules = get_modules_for_platform(current_platform)
+
+    print("Available modules:")
+    width = max(len(module) for module in all_modules)
+    descriptions = {info.name: info.description for info in registry.MODULES}
+    for module in all_modules:
+        status = "✓" if module in platform_modules else " "
+        print(f"  {status} {module:<{width}}  {descriptions[module]}")
+
+    print(f"\nModules for current platform ({current_platform}):")
+    for module in platform_modules:
+        print(f"  - {module}")
+    return 0
+
+
+async def main_async(args: argparse.Namespace) -> int:
     """Async main entry point."""
-    parser = setup_argparser()
-    args = parser.parse_args()
+    tracer = None
+    if args.trace is not None:
+        from src.utils.trace import enable_tracing
 
-    if args.list:
-        all_modules = list_available_modules()
-        current_platform = get_current_platform()
-        platform_modules = get_modules_for_platform(current_platform)
-
-        print("Available modules:")
-        for module in all_modules:
-            status = "✓" if module in platform_modules else " "
-            print(f"  {status} {module}")
-
-        print(f"\nModules for current platform ({current_platform}):")
-        for module in platform_modules:
-            print(f"  - {module}")
+        tracer = enable_tracing()
+
+    profiler = None
+    if args.profile is not None:
+        from src.utils.profiling import enable_profiling
+
+        profiler = enable_profiling(args.profile)
+        # cProfile covers the whole thread, so modules must not interleave
+        args.jobs = 1
+
+    from src.utils.process import set_max_workers
+
+    metrics = None
+    # Only collected when something reads them, to keep plain runs light
+    if args.metrics_file is not None or args.check or records_history(args):
+        from src.utils.metrics import enable_metrics
+
+        metrics = enable_metrics(args.dry_run)
+    set_max_workers(args.max_commands)
+
+    exit_code = 1
+    try:
+        exit_code = await run_setup(args)
+        return exit_code
+    finally:
+        # Drift and unverified items found by --check are reported, not a
+        # failure of the check itself
+        success = exit_code == 0 or (args.check and exit_code in (EXIT_DRIFT, EXIT_UNVERIFIED))
+        if metrics is not None and args.metrics_file is not None:
+            try:
+                metrics.write(args.metrics_file, success)
+            except OSError as e:
+                print(f"Warning: Could not write metrics {args.metrics_file}: {e}")
+        if metrics is not None and records_history(args):
+            record_history(metrics, success)
+        if tracer is not None:
+            try:
+                tracer.write(args.trace)
+                print(f"Trace written to {args.trace}")
+            except OSError as e:
+                print(f"Warning: Could not write trace {args.trace}: {e}")
+        if profiler is not None:
+            try:
+                profiler.print_summary(args.profile_top)
+            except OSError as e:
+                print(f"Warning: Could not write profile {args.profile}: {e}")
+
+
+def get_selected_modules(module_name: str | None = None) -> list[str]:
+    """Get the modules a run covers: one module and its dependencies, or the platform's."""
+    if module_name:
+        return [*registry.get_dependencies(module_name), module_name]
+    return get_modules_for_platform()
+
+
+async def run_targets(args: argparse.Namespace) -> int:
+    """Apply the selected modules to the --home and --root targets."""
+    from src.utils.targets import HomeTarget, RootTarget
+
+    if args.module and registry.get_module_info(args.module) is None:
+        print(f"Error: Unknown module {args.module}. Use --list to see available modules")
+        return 1
+
+    home = Path.home()
+    targets: list[Target] = [
+        *(HomeTarget(path.absolute(), home) for path in args.home or []),
+        *(RootTarget(path.absolute(), home) for path in args.root or []),
+    ]
+    built = await build_plans(get_selected_modules(args.module))
+    success = await apply_to_targets(built, targets, args.dry_run, args.jobs, force=args.force)
+
+    if success:
+        print(f"\n✅ Setup completed successfully for {len(targets)} targets!")
         return 0
+    print("\n❌ Setup completed with errors")
+    return 1
 
-    if args.dry_run:
-        print("DRY RUN: No changes will be made")
 
-    if args.verbose:
-        print("Verbose mode enabled")
+async def export_tar(args: argparse.Namespace) -> int:
+    """Materialize the selected modules into a staging root and archive it."""
+    import tempfile
+
+    from src.utils.archive import ARCHIVE_HOME, ARCHIVE_REPO, write_tar
+    from src.utils.targets import RootTarget, stage_sources
+
+    if args.module and registry.get_module_info(args.module) is None:
+        print(f"Error: Unknown module {args.module}. Use --list to see available modules")
+        return 1
+
+    with tempfile.TemporaryDirectory(prefix="dotfiles-stage-") as temp_dir:
+        stage = args.stage if args.stage is not None else Path(temp_dir)
+        if stage.exists() and any(stage.iterdir()):
+            print(f"Error: Staging root {stage} is not empty")
+            return 1
+        stage.mkdir(parents=True, exist_ok=True)
+
+        # The repo goes first, since it may be checked out inside the home
+        repo = Path(__file__).resolve().parent.parent
+        moves = ((repo, ARCHIVE_REPO), (Path.home(), ARCHIVE_HOME))
+        target = RootTarget(stage.absolute(), Path.home(), moves)
+        built = await build_plans(get_selected_modules(args.module))
+        # A state manifest would record build times and inode numbers
+        if not await apply_to_targets(built, [target], False, 1, record_state=False):
+            print("❌ Could not materialize the staging root")
+            return 1
+        stage_sources([plan for _, _, plan in built], target)
+
+        entries = write_tar(stage, args.export_tar)
+
+    print(f"\n✅ Wrote {entries} entries to {args.export_tar}")
+    return 0
+
+
+async def run_local(args: argparse.Namespace, deadline: float | None) -> bool:
+    """Run the selected modules against this machine and save the state manifest."""
+    from src.utils.state import get_manifest
+
+    manifest = get_manifest()
+    manifest.force = args.force
 
     # Execute modules
-    success = True
     if args.module:
-        success = await run_module(args.module, args.dry_run)
+        success = await run_with_dependencies(
+            args.module, args.dry_run, args.jobs, args.module_timeout, deadline
+        )
     else:
-        success = await run_all_modules(args.dry_run)
+        success = await run_all_modules(args.dry_run, args.jobs, args.module_timeout, deadline)
+
+    # Remember what was applied so unchanged work is skipped next run
+    try:
+        manifest.save()
+    except OSError as e:
+        print(f"Warning: Could not save state manifest {manifest.path}: {e}")
+
+    return success
+
+
+async def run_setup(args: argparse.Namespace) -> int:
+    """Run the requested setup modules and save the state manifest."""
+    from src.utils.metrics import get_metrics
+
+    deadline = time.monotonic() + args.timeout if args.timeout is not None else None
+
+    if args.seed_vsix_cache is not None:
+        return await seed_vsix_cache(args.seed_vsix_cache)
+
+    if args.check:
+        print("CHECK: Verifying managed items, no changes will be made")
+    elif args.dry_run:
+        print("DRY RUN: No changes will be made")
+
+    if args.verbose:
+        print("Verbose mode enabled")
+
+    if args.export_tar is not None:
+        return await export_tar(args)
+
+    if args.home or args.root:
+        return await run_targets(args)
+
+    success = await run_local(args, deadline)
+
+    metrics = get_metrics()
+    if metrics is not None and metrics.timed_out:
+        print(f"⚠️  Timed out: {', '.join(metrics.timed_out)}")
+
+    if args.check:
+        return report_check(success, metrics)
 
     if success:
         print("✅ Setup completed successfully!")
-        return 0
     else:
         print("❌ Setup completed with errors")
-        return 1
+
+    if args.watch and (not args.module or registry.get_module_info(args.module)):
+        return await watch_modules(get_selected_modules(args.module), args.dry_run)
+
+    return 0 if success else 1
+
+
+def report_check(success: bool, metrics: RunMetrics | None) -> int:
+    """Summarise a --check run, returning its exit code."""
+    modules = metrics.modules if metrics is not None else {}
+    drifted = sorted(name for name, module in modules.items() if module.drift)
+    unverified = {
+        name: module.actions["unavailable"]
+        for name, module in sorted(modules.items())
+        if module.actions.get("unavailable")
+    }
+    if not success:
+        print("❌ Check could not verify every managed item")
+        return EXIT_CHECK_FAILED
+    if unverified:
+        # A missing tool must not pass for a clean check, e.g. in CI
+        counts = ", ".join(f"{name} ({count})" for name, count in unverified.items())
+        print(f"⚠️  Could not verify items whose tools are unavailable: {counts}")
+    if drifted:
+        print(f"⚠️  Drift detected in: {', '.join(drifted)}")
+        return EXIT_DRIFT
+    if unverified:
+        return EXIT_UNVERIFIED
+    print("✅ No drift: every managed item is in its desired state")
+    return 0
+
+
+def check_args(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    """Reject invalid option values and combinations, exiting with a usage error."""
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+    if args.max_commands < 1:
+        parser.error("--max-commands must be at least 1")
+
+    if args.watch and args.check:
+        parser.error("--watch cannot be combined with --check")
+
+    if (args.home or args.root or args.export_tar) and (args.watch or args.check):
+        parser.error("--home, --root and --export-tar cannot be combined with --watch or --check")
+
+    if args.export_tar and (args.home or args.root or args.dry_run):
+        parser.error("--export-tar cannot be combined with --home, --root or --dry-run")
+
+    if args.stage and not args.export_tar:
+        parser.error("--stage requires --export-tar")
+
+    if args.module_timeout < 0 or (args.timeout is not None and args.timeout <= 0):
+        parser.error("--timeout and --module-timeout must be positive")
 
 
 def main() -> int:
     """Main entry point."""
-    return asyncio.run(main_async())
+    parser = setup_argparser()
+    args = parser.parse_args()
+
+    if args.list:
+        return list_modules()
+
+    if args.history:
+        return show_history()
+
+    check_args(parser, args)
+    if args.check:
+        # A check is a dry run that reports drift through its exit code
+        args.dry_run = True
+
+    # Set in the environment so --home and --root worker processes inherit them
+    if args.copy:
+        from src.utils.sync import LINK_MODE_VARIABLE
+
+        os.environ[LINK_MODE_VARIABLE] = "copy"
+    if args.checksum:
+        from src.utils.sync import CHECKSUM_VARIABLE
+
+        os.environ[CHECKSUM_VARIABLE] = "1"
+
+    import asyncio
+
+    try:
+        return asyncio.run(main_async(args))
+    except KeyboardInterrupt:
+        if not args.watch:
+            raise
+        print("\nStopped watching")
+        return 0
 
 
 if __name__ == "__main__":
@@ -1,3 +1,12 @@
 """
 Configuration modules for different tools and applications.
+
+Each module exposes an async ``setup()`` entry point. Its supported
+platforms, description and scheduling metadata live in the static registry
+in ``src/utils/registry.py``, so modules are only imported when they run.
+Adding a module means adding its ``ModuleInfo`` there:
+
+- ``dependencies``: modules that must finish before this one starts
+- ``resources``: files and tools the module touches; modules sharing a
+  resource never run at the same time
 """
@@ -7,22 +7,20 @@ and various git settings like user info, editor, and pull strategy.
 
 import asyncio
 import os
-import subprocess
 from pathlib import Path
 
-from ..utils.file_ops import touch
+from ..utils.gitconfig import GitConfigSet, global_config_path
+from ..utils.plan import Plan, Touch, execute
 
 
-async def setup() -> None:
-    """Set up git configuration."""
+async def build_plan(plan: Plan) -> None:
+    """Plan the global gitignore and git config settings."""
     print("Setting up git")
 
     # Create global gitignore file
     home = Path.home()
     gitignore_global = home / ".gitignore_global"
-    print(f"Creating global gitignore {gitignore_global}")
-
-    await touch(gitignore_global)
+    plan.add(Touch(gitignore_global))
 
     # Get user info from environment or use defaults
     user_email = os.environ.get("GIT_USER_EMAIL", "ryan.rushton79@gmail.com")
@@ -37,23 +35,15 @@ async def setup() -> None:
         "core.excludesfile": str(gitignore_global),
     }
 
-    print("Setting git config")
-
-    # Apply each configuration setting
+    # All keys are diffed and written to the config file together
+    config_path = global_config_path()
     for key, value in configs.items():
-        print(f"Setting {key} to {value}")
-        try:
-            subprocess.run(
-                ["git", "config", "--global", "--replace-all", key, value],
-                check=True,
-                capture_output=True,
-                text=True,
-            )
-        except subprocess.CalledProcessError as e:
-            print(f"Error setting git config {key}: {e.stderr}")
-        except FileNotFoundError:
-            print("Error: git command not found. Please install git first.")
-            break
+        plan.add(GitConfigSet(key, value, config_path))
+
+
+async def setup() -> None:
+    """Set up git configuration."""
+    await execute(build_plan, __name__)
 
 
 def setup_sync() -> None:
@@ -3,17 +3,33 @@ macOS-specific configuration setup module.
 
 Sets up macOS system defaults including Dock, Finder, Mission Control,
 and application-specific settings. Replicates the functionality of .defaults
-shell script using Python subprocess calls.
+shell script using external command calls.
 """
 
 import asyncio
+import stat
 import subprocess
+from pathlib import Path
 
+from ..utils.defaults import DefaultsWrite
 from ..utils.file_ops import get_platform
-
-
-async def setup() -> None:
-    """Set up macOS-specific configuration."""
+from ..utils.plan import Action, Plan, PlanResult, execute
+from ..utils.process import run_command
+
+# Commands that make each application pick up changes to a defaults domain
+RESTART_COMMANDS: dict[str, list[list[str]]] = {
+    "com.apple.dock": [["killall", "Dock"]],
+    "com.apple.finder": [["killall", "Finder"]],
+    "NSGlobalDomain": [
+        ["killall", "Finder"],
+        ["osascript", "-e", 'quit app "Visual Studio Code"'],
+    ],
+    "com.google.Chrome": [["osascript", "-e", 'quit app "Google Chrome"']],
+}
+
+
+async def build_plan(plan: Plan) -> None:
+    """Plan macOS system defaults."""
     # Only run on macOS
     if get_platform() != "macos":
         print(f"Skipping macOS setup on {get_platform()} platform")
@@ -21,135 +37,99 @@ async def setup() -> None:
 
     print("Setting up macOS system defaults")
 
-    try:
-        # Close any open System Preferences panes
-        print("Closing System Preferences...")
-        subprocess.run(
-            ["osascript", "-e", 'tell application "System Preferences" to quit'],
-            check=False,  # Don't fail if System Preferences isn't running
-            capture_output=True,
-        )
-
-        # Dock settings
-        print("Configuring Dock settings...")
+    # Dock settings
+    # Automatically hide and show the Dock
+    plan.add(DefaultsWrite("com.apple.dock", "autohide", True))
+    # Don't rearrange spaces by last used
+    plan.add(DefaultsWrite("com.apple.dock", "mru-spaces", False))
 
-        # Automatically hide and show the Dock
-        subprocess.run(
-            ["defaults", "write", "com.apple.dock", "autohide", "-bool", "true"],
-            check=True,
+    # Trackpad/mouse settings
+    plan.add(
+        DefaultsWrite(
+            "NSGlobalDomain", "com.apple.trackpad.enableSecondaryClick", True, current_host=True
         )
+    )
+
+    # Finder settings
+    # Show hidden files by default
+    plan.add(DefaultsWrite("com.apple.finder", "AppleShowAllFiles", True))
+    # Show all filename extensions
+    plan.add(DefaultsWrite("NSGlobalDomain", "AppleShowAllExtensions", True))
+    # Use list view in all Finder windows by default
+    plan.add(DefaultsWrite("com.apple.finder", "FXPreferredViewStyle", "clmv"))
+
+    # Google Chrome settings
+    # Disable the all too sensitive backswipe on trackpads
+    plan.add(DefaultsWrite("com.google.Chrome", "AppleEnableSwipeNavigateWithScrolls", False))
+    # Disable the all too sensitive backswipe on Magic Mouse
+    plan.add(DefaultsWrite("com.google.Chrome", "AppleEnableMouseSwipeNavigateWithScrolls", False))
+
+
+async def before_apply(changes: list[Action]) -> None:
+    """Close System Preferences so it can't overwrite the new defaults."""
+    print("Closing System Preferences...")
+    await run_command(
+        ["osascript", "-e", 'tell application "System Preferences" to quit'],
+        check=False,  # Don't fail if System Preferences isn't running
+    )
+
+
+async def unhide_volumes() -> None:
+    """Show the /Volumes folder (requires sudo), unless it's already visible."""
+    try:
+        # st_flags only exists on BSD-derived systems such as macOS
+        flags = getattr(Path("/Volumes").stat(), "st_flags", 0)
+    except OSError:
+        return
+    if not flags & stat.UF_HIDDEN:
+        return
 
-        # Don't rearrange spaces by last used
-        subprocess.run(
-            ["defaults", "write", "com.apple.dock", "mru-spaces", "-bool", "false"],
-            check=True,
+    print("Showing /Volumes folder...")
+    try:
+        await run_command(
+            ["sudo", "chflags", "nohidden", "/Volumes"],
+            timeout=30,  # Timeout in case sudo prompts for password
+            capture_output=False,  # Let sudo prompt on the terminal
         )
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError):
+        print("⚠️  Could not unhide /Volumes folder (may require sudo password)")
 
-        # Trackpad/mouse settings
-        print("Configuring trackpad/mouse settings...")
-        subprocess.run(
-            [
-                "defaults",
-                "-currentHost",
-                "write",
-                "NSGlobalDomain",
-                "com.apple.trackpad.enableSecondaryClick",
-                "-bool",
-                "true",
-            ],
-            check=True,
-        )
 
-        # Finder settings
-        print("Configuring Finder settings...")
+def get_restart_commands(changes: list[Action]) -> list[list[str]]:
+    """Get the commands restarting every application whose domain changed."""
+    commands: list[list[str]] = []
+    for action in changes:
+        if not isinstance(action, DefaultsWrite):
+            continue
+        for command in RESTART_COMMANDS.get(action.domain, []):
+            if command not in commands:
+                commands.append(command)
+    return commands
 
-        # Show hidden files by default
-        subprocess.run(
-            ["defaults", "write", "com.apple.finder", "AppleShowAllFiles", "-bool", "true"],
-            check=True,
-        )
 
-        # Show all filename extensions
-        subprocess.run(
-            ["defaults", "write", "NSGlobalDomain", "AppleShowAllExtensions", "-bool", "true"],
-            check=True,
-        )
-
-        # Use list view in all Finder windows by default
-        subprocess.run(
-            ["defaults", "write", "com.apple.finder", "FXPreferredViewStyle", "-string", "clmv"],
-            check=True,
-        )
+async def after_apply(result: PlanResult) -> None:
+    """Unhide /Volumes and restart the applications whose defaults changed."""
+    if get_platform() != "macos":
+        return
 
-        # Show the /Volumes folder (requires sudo)
-        print("Showing /Volumes folder...")
-        try:
-            subprocess.run(
-                ["sudo", "chflags", "nohidden", "/Volumes"],
-                check=True,
-                timeout=30,  # Timeout in case sudo prompts for password
-            )
-        except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
-            print("⚠️  Could not unhide /Volumes folder (may require sudo password)")
-
-        # Google Chrome settings
-        print("Configuring Google Chrome settings...")
-
-        # Disable the all too sensitive backswipe on trackpads
-        subprocess.run(
-            [
-                "defaults",
-                "write",
-                "com.google.Chrome",
-                "AppleEnableSwipeNavigateWithScrolls",
-                "-bool",
-                "false",
-            ],
-            check=True,
-        )
+    await unhide_volumes()
 
-        # Disable the all too sensitive backswipe on Magic Mouse
-        subprocess.run(
-            [
-                "defaults",
-                "write",
-                "com.google.Chrome",
-                "AppleEnableMouseSwipeNavigateWithScrolls",
-                "-bool",
-                "false",
-            ],
-            check=True,
-        )
+    commands = get_restart_commands(result.changed)
+    if not commands:
+        return
 
-        # Restart affected applications
-        print("Restarting affected applications...")
+    # Restart affected applications, quitting them gracefully where possible
+    print("Restarting affected applications...")
+    for command in commands:
+        await run_command(command, check=False)
 
-        subprocess.run(["killall", "Dock"], check=False)
-        subprocess.run(["killall", "Finder"], check=False)
+    print("✅ macOS configuration complete!")
+    print("   Some changes may require logging out and back in to take effect.")
 
-        # Quit applications gracefully
-        subprocess.run(
-            ["osascript", "-e", 'quit app "Google Chrome"'],
-            check=False,
-            capture_output=True,
-        )
-        subprocess.run(
-            ["osascript", "-e", 'quit app "Visual Studio Code"'],
-            check=False,
-            capture_output=True,
-        )
 
-        print("✅ macOS configuration complete!")
-        print("   Some changes may require logging out and back in to take effect.")
-
-    except subprocess.CalledProcessError as e:
-        print(f"⚠️  Error configuring macOS defaults: {e}")
-        print("   Some settings may not have been applied.")
-    except FileNotFoundError as e:
-        print(f"⚠️  Required command not found: {e}")
-        print("   Make sure you're running on macOS with required tools installed.")
-    except Exception as e:
-        print(f"⚠️  Unexpected error: {e}")
+async def setup() -> None:
+    """Set up macOS-specific configuration."""
+    await execute(build_plan, __name__, before_apply=before_apply, after_apply=after_apply)
 
 
 def setup_sync() -> None:
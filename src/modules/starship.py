@@ -8,26 +8,31 @@ and symlinking the starship.toml configuration file.
 import asyncio
 from pathlib import Path
 
-from ..utils.file_ops import create_symlink, mkdir
+from ..utils.plan import MakeDir, Plan, Symlink, execute
 
 CONFIG_FILE = "starship.toml"
 
 
-async def setup() -> None:
-    """Set up starship configuration."""
+async def build_plan(plan: Plan) -> None:
+    """Plan the ~/.config directory and starship.toml symlink."""
     print("Setting up starship")
 
     # Get home directory and create .config dir
     home = Path.home()
     dot_config = home / ".config"
-    await mkdir(dot_config)
+    plan.add(MakeDir(dot_config))
 
     # Set up paths for config and target
     target = dot_config / CONFIG_FILE
     config = Path(__file__).parent.parent.parent / "config" / "starship" / CONFIG_FILE
 
     # Create symlink
-    await create_symlink(config, target)
+    plan.add(Symlink(config, target))
+
+
+async def setup() -> None:
+    """Set up starship configuration."""
+    await execute(build_plan, __name__)
 
 
 def setup_sync() -> None:
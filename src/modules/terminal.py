@@ -10,81 +10,67 @@ import asyncio
 import subprocess
 from pathlib import Path
 
-from ..utils.file_ops import create_symlink, mkdir
+from ..utils.gnome import GSetting
+from ..utils.plan import MakeDir, Plan, Symlink, execute
+from ..utils.process import run_command
 
+TERMINAL_SETTINGS_PATH = "/org/gnome/terminal/legacy"
 
-async def setup() -> None:
-    """Set up terminal configuration for Ubuntu / GNOME desktops."""
-    print("Setting up terminal configuration")
 
+async def get_default_profile() -> str | None:
+    """Get the default GNOME Terminal profile UUID, or None without GNOME Terminal."""
     try:
-        # Setup GNOME Terminal keybindings (fallback/default)
-        print("Configuring GNOME Terminal keybindings...")
-
-        try:
-            subprocess.run(
-                [
-                    "gsettings",
-                    "set",
-                    "org.gnome.Terminal.Legacy.Settings",
-                    "shortcuts-enabled",
-                    "true"
-                ],
-                check=True,
-                capture_output=True,
-                text=True,
-            )
-
-            # Get the default profile UUID for keybindings
-            result = subprocess.run(
-                ["gsettings", "get", "org.gnome.Terminal.ProfilesList", "default"],
-                check=True,
-                capture_output=True,
-                text=True,
-            )
-            default_profile = result.stdout.strip().replace("'", "")
-
-            profile_path = f"/org/gnome/terminal/legacy/profiles:/:/{default_profile}/"
-
-            # Set keybindings for the default profile
-            subprocess.run(
-                ["dconf", "write", f"{profile_path}copy-binding", "'<Primary><Shift>c'"],
-                check=True,
-                capture_output=True,
-                text=True,
-            )
-            subprocess.run(
-                ["dconf", "write", f"{profile_path}paste-binding", "'<Primary><Shift>v'"],
-                check=True,
-                capture_output=True,
-                text=True,
-            )
-
-            print(f"Configured keybindings for profile: {default_profile}")
-
-        except (subprocess.CalledProcessError, FileNotFoundError) as terminal_error:
-            print(
-                "Could not configure GNOME Terminal keybindings "
-                "(this is expected if using a different terminal):",
-                terminal_error,
-            )
-
-        # Setup Alacritty configuration for better keybinding support
-        print("Setting up Alacritty configuration...")
-        home = Path.home()
-        alacritty_config_dir = home / ".config" / "alacritty"
-        await mkdir(alacritty_config_dir)
-
-        alacritty_config_source = (
-            Path(__file__).parent.parent.parent / "config" / "alacritty" / "alacritty.yml"
+        result = await run_command(
+            ["gsettings", "get", "org.gnome.Terminal.ProfilesList", "default"], timeout=10
         )
-        alacritty_config_target = alacritty_config_dir / "alacritty.yml"
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError) as e:
+        print(
+            "Could not configure GNOME Terminal keybindings "
+            "(this is expected if using a different terminal):",
+            e,
+        )
+        return None
+    return result.stdout.strip().replace("'", "")
+
+
+async def plan_gnome_keybindings(plan: Plan) -> None:
+    """Plan GNOME Terminal copy/paste keybindings for the default profile."""
+    print("Configuring GNOME Terminal keybindings...")
+
+    default_profile = await get_default_profile()
+    if not default_profile:
+        return
+
+    plan.add(GSetting(f"{TERMINAL_SETTINGS_PATH}/shortcuts-enabled", "true"))
+
+    # Set keybindings for the default profile
+    profile_path = f"{TERMINAL_SETTINGS_PATH}/profiles:/:{default_profile}/"
+    plan.add(GSetting(f"{profile_path}copy-binding", "'<Primary><Shift>c'"))
+    plan.add(GSetting(f"{profile_path}paste-binding", "'<Primary><Shift>v'"))
 
-        await create_symlink(alacritty_config_source, alacritty_config_target)
-        print("✅ Terminal configuration complete!")
 
-    except Exception as error:
-        print(f"Error setting up terminal configuration: {error}")
+async def build_plan(plan: Plan) -> None:
+    """Plan terminal configuration for Ubuntu / GNOME desktops."""
+    print("Setting up terminal configuration")
+
+    # Setup GNOME Terminal keybindings (fallback/default)
+    await plan_gnome_keybindings(plan)
+
+    # Setup Alacritty configuration for better keybinding support
+    home = Path.home()
+    alacritty_config_dir = home / ".config" / "alacritty"
+    plan.add(MakeDir(alacritty_config_dir))
+
+    alacritty_config_source = (
+        Path(__file__).parent.parent.parent / "config" / "alacritty" / "alacritty.yml"
+    )
+    alacritty_config_target = alacritty_config_dir / "alacritty.yml"
+    plan.add(Symlink(alacritty_config_source, alacritty_config_target))
+
+
+async def setup() -> None:
+    """Set up terminal configuration for Ubuntu / GNOME desktops."""
+    await execute(build_plan, __name__)
 
 
 def setup_sync() -> None:
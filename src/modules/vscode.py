@@ -1,15 +1,18 @@
 """
 VSCode configuration setup module.
 
-Sets up VSCode by symlinking settings.json and installing extensions.
+Sets up VSCode by symlinking settings.json and installing any missing
+extensions in a single code invocation, from the local VSIX cache where
+possible.
 Handles cross-platform path resolution for different operating systems.
 """
 
 import asyncio
-import subprocess
 from pathlib import Path
 
-from ..utils.file_ops import create_symlink, get_platform
+from ..utils.extensions import ExtensionInstall
+from ..utils.file_ops import get_platform
+from ..utils.plan import Plan, Symlink, execute
 
 SETTINGS_FILE_NAME = "settings.json"
 
@@ -42,45 +45,21 @@ def get_settings_location() -> Path:
         raise ValueError(f"System {platform} is not supported for VS Code file setup")
 
 
-async def setup() -> None:
-    """Set up VSCode configuration."""
+async def build_plan(plan: Plan) -> None:
+    """Plan the VSCode settings symlink and extension installs."""
     print("Setting up vscode")
 
     # Set up config symlink
     config = Path(__file__).parent.parent.parent / "config" / "vscode" / SETTINGS_FILE_NAME
-    target = get_settings_location()
-    await create_symlink(config, target)
+    plan.add(Symlink(config, get_settings_location()))
 
-    # Install extensions
     for extension in EXTENSIONS:
-        print(f"Installing vscode extension {extension}")
-        try:
-            # On Windows, use shell=True to properly resolve the code command
-            use_shell = get_platform() == "windows"
-            result = subprocess.run(
-                ["code", "--install-extension", extension],
-                capture_output=True,
-                text=True,
-                timeout=30,
-                check=True,
-                shell=use_shell,
-            )
-            # code command outputs to stderr even on success, so check both
-            if result.returncode == 0:
-                print(f"✅ Successfully installed {extension}")
-            else:
-                print(f"⚠️  Extension {extension} may have failed: {result.stderr}")
-
-        except subprocess.TimeoutExpired:
-            print(f"⚠️  Timeout installing extension {extension} (30s limit)")
-        except subprocess.CalledProcessError as e:
-            print(f"⚠️  Failed to install extension {extension}: {e.stderr}")
-        except FileNotFoundError:
-            print("⚠️  VSCode 'code' command not found. Please install VSCode first.")
-            print("   Extensions will need to be installed manually.")
-            break
-        except Exception as e:
-            print(f"⚠️  Unexpected error installing extension {extension}: {e}")
+        plan.add(ExtensionInstall(extension))
+
+
+async def setup() -> None:
+    """Set up VSCode configuration."""
+    await execute(build_plan, __name__)
 
 
 def setup_sync() -> None:
@@ -2,36 +2,31 @@
 Windows-specific configuration setup module.
 
 Sets up Windows Terminal configuration by symlinking settings.json
-to the Windows Terminal LocalState directory. Also imports and runs
-other generic setup modules (git, starship, vscode).
+to the Windows Terminal LocalState directory. The generic setup modules
+(git, starship, vscode) are its dependencies in the module registry, so the
+runner runs each of them once, before this module.
 """
 
 import asyncio
 import os
 from pathlib import Path
 
-from ..utils.file_ops import create_symlink, get_platform
-
-# Import other modules for Windows setup
-try:
-    from . import git, starship, vscode
-except ImportError:
-    git = starship = vscode = None  # type: ignore
+from ..utils.file_ops import get_platform
+from ..utils.plan import Plan, Symlink, execute
+from . import git, starship, vscode
 
 SETTINGS_FILE = "settings.json"
 
 
-async def setup_windows_terminal() -> None:
-    """Set up Windows Terminal configuration."""
+def plan_windows_terminal(plan: Plan) -> None:
+    """Plan the Windows Terminal configuration."""
     print("Setting up windows terminal")
 
     # Get LOCALAPPDATA environment variable
     local_app_data = os.environ.get("LOCALAPPDATA")
 
     if not local_app_data:
-        print(
-            "Cannot install windows terminal settings because LOCALAPPDATA cannot be resolved."
-        )
+        print("Cannot install windows terminal settings because LOCALAPPDATA cannot be resolved.")
         return
 
     # Target comes from https://learn.microsoft.com/en-us/windows/terminal/install#settings-json-file
@@ -43,17 +38,11 @@ async def setup_windows_terminal() -> None:
         / "settings.json"
     )
     config = Path(__file__).parent.parent.parent / "config" / "windows" / SETTINGS_FILE
-
-    try:
-        await create_symlink(config, target)
-        print("✅ Windows Terminal configuration complete!")
-    except Exception as e:
-        print(f"⚠️  Error setting up Windows Terminal: {e}")
-        print("   You may need to install Windows Terminal first")
+    plan.add(Symlink(config, target))
 
 
-async def setup() -> None:
-    """Set up Windows-specific configuration."""
+async def build_plan(plan: Plan) -> None:
+    """Plan Windows-specific configuration."""
     # Only run on Windows
     if get_platform() != "windows":
         print(f"Skipping Windows setup on {get_platform()} platform")
@@ -61,30 +50,16 @@ async def setup() -> None:
 
     print("Setting up Windows-specific configuration")
 
-    # Run other setup modules
-    # Note: In Python, we handle this differently than TypeScript imports
-    try:
-        if git:
-            print("Running git setup...")
-            await git.setup()
-
-        if starship:
-            print("Running starship setup...")
-            await starship.setup()
-
-        if vscode:
-            print("Running vscode setup...")
-            await vscode.setup()
-
-        if not any([git, starship, vscode]):
-            print("⚠️  Could not import setup modules")
-            print("   Please run individual modules manually")
+    # Setup Windows Terminal
+    plan_windows_terminal(plan)
 
-    except Exception as e:
-        print(f"⚠️  Error running generic setup modules: {e}")
 
-    # Setup Windows Terminal
-    await setup_windows_terminal()
+async def setup() -> None:
+    """Set up the generic modules, then Windows-specific configuration."""
+    # Without the runner there is nothing else to run the dependencies
+    for module in (git, starship, vscode):
+        await module.setup()
+    await execute(build_plan, __name__)
 
 
 def setup_sync() -> None:
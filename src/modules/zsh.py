@@ -7,11 +7,11 @@ Creates symlinks for zsh configuration files (.zshrc, .zsh_aliases).
 import asyncio
 from pathlib import Path
 
-from ..utils.file_ops import create_symlink
+from ..utils.plan import Plan, Symlink, execute
 
 
-async def setup() -> None:
-    """Set up zsh configuration by symlinking config files."""
+async def build_plan(plan: Plan) -> None:
+    """Plan symlinks for the zsh config files."""
     print("Setting up zsh configuration")
 
     # Get the dotfiles root directory (two levels up from this file)
@@ -28,12 +28,16 @@ async def setup() -> None:
     for source_name, target_path in zsh_files:
         source_path = config_dir / source_name
         if source_path.exists():
-            print(f"Symlinking {source_name}")
-            await create_symlink(source_path, target_path)
+            plan.add(Symlink(source_path, target_path))
         else:
             print(f"Warning: {source_path} does not exist, skipping...")
 
 
+async def setup() -> None:
+    """Set up zsh configuration by symlinking config files."""
+    await execute(build_plan, __name__)
+
+
 def setup_sync() -> None:
     """Synchronous version of setup for compatibility."""
     asyncio.run(setup())
@@ -0,0 +1,106 @@
+"""
+Reproducible tar archives of a staging root.
+
+The same tree always gives a byte-identical archive: entries are sorted,
+and timestamps, owners and permissions are normalised, so an unchanged
+``config/`` gives a container layer whose digest (and build cache key) does
+not change. Timestamps come from ``SOURCE_DATE_EPOCH`` when it is set.
+"""
+
+import gzip
+import io
+import os
+import stat
+import tarfile
+from pathlib import Path
+
+from .file_ops import atomic_write
+
+# Where archives put the builder's home directory and this repo, so the same
+# config/ gives the same bytes whoever builds it and wherever it is checked out
+ARCHIVE_HOME = Path("/home/dotfiles")
+ARCHIVE_REPO = Path("/opt/dotfiles")
+
+
+def source_date_epoch() -> int:
+    """Get the timestamp for archive entries, honouring SOURCE_DATE_EPOCH."""
+    try:
+        return int(os.environ.get("SOURCE_DATE_EPOCH", "0"))
+    except ValueError:
+        return 0
+
+
+def walk_sorted(root: Path) -> list[Path]:
+    """List every path under root, depth first with each directory's entries sorted."""
+    paths = []
+    with os.scandir(root) as entries:
+        listing = sorted(entries, key=lambda entry: entry.name)
+    for entry in listing:
+        path = Path(entry.path)
+        paths.append(path)
+        if entry.is_dir(follow_symlinks=False):
+            paths.extend(walk_sorted(path))
+    return paths
+
+
+def normalized_info(archive: tarfile.TarFile, path: Path, name: str, mtime: int) -> tarfile.TarInfo:
+    """Describe a path as a tar entry with a fixed owner, timestamp and permissions."""
+    info = archive.gettarinfo(str(path), arcname=name)
+    info.mtime = mtime
+    info.uid = info.gid = 0
+    info.uname = info.gname = "root"
+    if info.issym():
+        info.mode = 0o777
+    elif info.isdir() or info.mode & stat.S_IXUSR:
+        info.mode = 0o755
+    else:
+        info.mode = 0o644
+    return info
+
+
+def write_tar(root: Path, output: Path, mtime: int | None = None) -> int:
+    """
+    Write everything under root to a reproducible tar archive.
+
+    Archives named ``*.gz`` or ``*.tgz`` are gzip-compressed, also without a
+    timestamp or file name in the gzip header.
+
+    Args:
+        root: The staging root; entries are named relative to it
+        output: The archive to write, atomically
+        mtime: Timestamp for every entry, defaulting to source_date_epoch()
+
+    Returns:
+        The number of entries written
+    """
+    mtime = source_date_epoch() if mtime is None else mtime
+    paths = walk_sorted(root)
+
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w", format=tarfile.GNU_FORMAT) as archive:
+        for path in paths:
+            info = normalized_info(archive, path, path.relative_to(root).as_posix(), mtime)
+            if info.isreg():
+                with path.open("rb") as contents:
+                    archive.addfile(info, contents)
+            else:
+                archive.addfile(info)
+
+    data = buffer.getvalue()
+    if output.suffix in (".gz", ".tgz"):
+        compressed = io.BytesIO()
+        with gzip.GzipFile(filename="", mode="wb", fileobj=compressed, mtime=0) as gzip_file:
+            gzip_file.write(data)
+        data = compressed.getvalue()
+
+    atomic_write(output, data, mode=0o644)
+    return len(paths)
+
+
+__all__ = [
+    "ARCHIVE_HOME",
+    "ARCHIVE_REPO",
+    "source_date_epoch",
+    "walk_sorted",
+    "write_tar",
+]
@@ -0,0 +1,179 @@
+"""
+macOS defaults helpers for dotfiles setup.
+
+Preferences are addressed by domain and key, optionally in the -currentHost
+(per-machine) scope, with typed Python values. Each domain is read once with
+``defaults export`` and diffed with plistlib; changed keys are merged into
+the exported plist and written back with a single ``defaults import``.
+"""
+
+import math
+import plistlib
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, ClassVar
+
+from .plan import Action, Backend, BackendUnavailableError
+from .process import run_command
+
+DefaultsValue = bool | int | float | str
+
+DEFAULTS_MISSING = "defaults command not found. macOS defaults can only be set on macOS."
+
+# A domain and whether it is in the -currentHost scope
+Domain = tuple[str, bool]
+
+
+def get_preference_file(domain: str, current_host: bool = False) -> Path:
+    """Get the file backing a defaults domain (the ByHost dir for -currentHost)."""
+    preferences = Path.home() / "Library" / "Preferences"
+    if current_host:
+        return preferences / "ByHost"
+    if domain == "NSGlobalDomain":
+        return preferences / ".GlobalPreferences.plist"
+    return preferences / f"{domain}.plist"
+
+
+def defaults_command(domain: Domain, *args: str) -> list[str]:
+    """Build a defaults command line in a domain's scope."""
+    name, current_host = domain
+    scope = ["-currentHost"] if current_host else []
+    return ["defaults", *scope, args[0], name, *args[1:]]
+
+
+def values_equal(current: Any, desired: DefaultsValue) -> bool:
+    """Check whether a plist value equals the desired value, including its type."""
+    if isinstance(desired, bool) or isinstance(current, bool):
+        return isinstance(current, bool) and isinstance(desired, bool) and current == desired
+    if isinstance(desired, float) and isinstance(current, int | float):
+        return math.isclose(current, desired, rel_tol=1e-9)
+    return type(current) is type(desired) and current == desired
+
+
+def diff_domain(current: dict[str, Any], desired: dict[str, DefaultsValue]) -> dict[str, Any]:
+    """
+    Get the desired keys whose value differs from a domain's current contents.
+
+    Args:
+        current: The domain's exported plist
+        desired: The keys and values that should be set
+
+    Returns:
+        The changed keys and their desired values
+    """
+    return {
+        name: value
+        for name, value in desired.items()
+        if name not in current or not values_equal(current[name], value)
+    }
+
+
+def merge_domain(current: dict[str, Any], changes: dict[str, DefaultsValue]) -> bytes:
+    """Get the plist to import for a domain: its current contents plus the changes."""
+    return plistlib.dumps({**current, **changes}, fmt=plistlib.FMT_XML, sort_keys=False)
+
+
+async def export_domain(domain: Domain) -> dict[str, Any]:
+    """Read a whole defaults domain with a single defaults invocation."""
+    try:
+        result = await run_command(defaults_command(domain, "export", "-"), timeout=30)
+    except FileNotFoundError:
+        raise BackendUnavailableError(DEFAULTS_MISSING) from None
+    except subprocess.CalledProcessError:
+        # The domain does not exist yet
+        return {}
+
+    if not result.stdout.strip():
+        return {}
+    # Raises ValueError rather than returning {}, which would wipe the domain on import
+    data = plistlib.loads(result.stdout.encode())
+    return data if isinstance(data, dict) else {}
+
+
+async def import_domain(domain: Domain, plist: bytes) -> None:
+    """Replace a defaults domain's contents with a single defaults invocation."""
+    try:
+        await run_command(
+            defaults_command(domain, "import", "-"), input_text=plist.decode(), timeout=30
+        )
+    except FileNotFoundError:
+        raise BackendUnavailableError(DEFAULTS_MISSING) from None
+
+
+def _group_by_domain(actions: list["DefaultsWrite"]) -> dict[Domain, list["DefaultsWrite"]]:
+    """Group actions by domain and scope, in first-use order."""
+    groups: dict[Domain, list[DefaultsWrite]] = {}
+    for action in actions:
+        groups.setdefault(action.scope, []).append(action)
+    return groups
+
+
+class DefaultsBackend(Backend):
+    """Reads and writes macOS preferences one whole domain at a time."""
+
+    async def diff(self, actions: list["DefaultsWrite"]) -> list["DefaultsWrite"]:
+        changed: list[DefaultsWrite] = []
+        for domain, domain_actions in _group_by_domain(actions).items():
+            current = await export_domain(domain)
+            changes = diff_domain(current, {action.name: action.value for action in domain_actions})
+            changed.extend(action for action in domain_actions if action.name in changes)
+        return changed
+
+    async def apply(self, actions: list["DefaultsWrite"]) -> dict["DefaultsWrite", str]:
+        failed: dict[DefaultsWrite, str] = {}
+        for domain, domain_actions in _group_by_domain(actions).items():
+            for action in domain_actions:
+                print(f"Writing {action.domain} {action.name} = {action.value}")
+
+            # Re-read right before writing so changes made since the diff survive
+            try:
+                current = await export_domain(domain)
+                changes = {action.name: action.value for action in domain_actions}
+                await import_domain(domain, merge_domain(current, changes))
+            except (subprocess.CalledProcessError, subprocess.TimeoutExpired, ValueError) as e:
+                # ValueError means the exported plist could not be parsed
+                error = (getattr(e, "stderr", None) or "").strip() or str(e)
+                failed.update(dict.fromkeys(domain_actions, error))
+        return failed
+
+
+@dataclass(frozen=True)
+class DefaultsWrite(Action):
+    """A macOS preference that must have the given value."""
+
+    kind: ClassVar[str] = "defaults-write"
+    backend: ClassVar[type[Backend]] = DefaultsBackend
+
+    domain: str
+    name: str
+    value: DefaultsValue
+    current_host: bool = False
+
+    @property
+    def scope(self) -> Domain:
+        """The domain this preference lives in, and whether it is -currentHost."""
+        return (self.domain, self.current_host)
+
+    def target(self) -> str:
+        scope = "currentHost:" if self.current_host else ""
+        return f"{scope}{self.domain}:{self.name}"
+
+    def describe(self) -> str:
+        return f"write {self.domain} {self.name} = {self.value}"
+
+    def probes(self) -> list[Path]:
+        return [get_preference_file(self.domain, self.current_host)]
+
+
+__all__ = [
+    "DefaultsBackend",
+    "DefaultsWrite",
+    "defaults_command",
+    "diff_domain",
+    "export_domain",
+    "get_preference_file",
+    "import_domain",
+    "merge_domain",
+    "values_equal",
+]
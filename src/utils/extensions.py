@@ -0,0 +1,153 @@
+"""
+VSCode extension management for dotfiles setup.
+
+Queries the installed extensions once and installs any missing ones in a
+single ``code`` invocation, from the local VSIX cache where possible.
+"""
+
+import os
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import ClassVar
+
+from . import vsix_cache
+from .plan import Action, Backend, BackendUnavailableError
+from .process import run_command
+
+# Seconds allowed per extension when installing a batch
+INSTALL_TIMEOUT_PER_EXTENSION = 30
+
+# Extra attempts when extensions are downloaded from the marketplace
+MARKETPLACE_RETRIES = 2
+
+CODE_MISSING = "VSCode 'code' command not found. Please install VSCode first."
+
+
+def get_extensions_dir() -> Path:
+    """Get the directory VSCode installs extensions into."""
+    override = os.environ.get("VSCODE_EXTENSIONS")
+    if override:
+        return Path(override)
+    return Path.home() / ".vscode" / "extensions"
+
+
+async def get_installed_extensions() -> dict[str, str]:
+    """
+    Query the installed VSCode extensions with a single code invocation.
+
+    Returns:
+        Mapping of lowercased extension id to installed version
+    """
+    # On Windows, code is a .cmd shim; run_command resolves it via PATH
+    result = await run_command(["code", "--list-extensions", "--show-versions"], timeout=30)
+
+    installed = {}
+    for line in result.stdout.splitlines():
+        extension, _, version = line.strip().partition("@")
+        if extension:
+            installed[extension.lower()] = version
+    return installed
+
+
+def get_missing_extensions(extensions: list[str], installed: dict[str, str]) -> list[str]:
+    """Get the extensions that are not installed yet."""
+    return [extension for extension in extensions if extension.lower() not in installed]
+
+
+async def install_extensions(extensions: list[str]) -> list[str]:
+    """
+    Install extensions in one batched code invocation.
+
+    Args:
+        extensions: The extension ids to install
+
+    Returns:
+        The extensions that failed to install
+    """
+    # Install from local .vsix files where we can, falling back to the marketplace
+    report, cached = await vsix_cache.populate(extensions)
+    print(report.summary())
+
+    print(f"Installing {len(extensions)} vscode extensions: {', '.join(extensions)}")
+    args = ["code"]
+    for extension in extensions:
+        args.extend(["--install-extension", str(cached.get(extension, extension))])
+
+    timeout = INSTALL_TIMEOUT_PER_EXTENSION * len(extensions)
+    # Downloads can fail transiently; installs from the local cache don't need a retry
+    retries = MARKETPLACE_RETRIES if len(cached) < len(extensions) else 0
+    try:
+        await run_command(args, timeout=timeout, retries=retries)
+        for extension in extensions:
+            print(f"✅ Successfully installed {extension}")
+        return []
+    except FileNotFoundError:
+        raise BackendUnavailableError(CODE_MISSING) from None
+    except subprocess.TimeoutExpired:
+        print(f"⚠️  Timeout installing extensions ({timeout}s limit)")
+    except subprocess.CalledProcessError as e:
+        print(f"⚠️  Some extensions failed to install: {e.stderr.strip()}")
+
+    # code keeps going after a failed extension, so check what actually landed
+    try:
+        still_missing = get_missing_extensions(extensions, await get_installed_extensions())
+    except (OSError, subprocess.CalledProcessError, subprocess.TimeoutExpired):
+        return list(extensions)
+    for extension in extensions:
+        if extension not in still_missing:
+            print(f"✅ Successfully installed {extension}")
+    return still_missing
+
+
+class ExtensionBackend(Backend):
+    """Lists installed extensions once and installs the missing ones together."""
+
+    async def diff(self, actions: list["ExtensionInstall"]) -> list["ExtensionInstall"]:
+        try:
+            installed = await get_installed_extensions()
+        except FileNotFoundError:
+            raise BackendUnavailableError(CODE_MISSING) from None
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            print(f"⚠️  Could not list installed extensions, installing all: {e}")
+            installed = {}
+
+        return [action for action in actions if action.extension_id.lower() not in installed]
+
+    async def apply(self, actions: list["ExtensionInstall"]) -> dict["ExtensionInstall", str]:
+        failed = await install_extensions([action.extension_id for action in actions])
+        return {
+            action: "extension is not installed"
+            for action in actions
+            if action.extension_id in failed
+        }
+
+
+@dataclass(frozen=True)
+class ExtensionInstall(Action):
+    """A VSCode extension that must be installed."""
+
+    kind: ClassVar[str] = "extension-install"
+    backend: ClassVar[type[Backend]] = ExtensionBackend
+
+    extension_id: str
+
+    def target(self) -> str:
+        return self.extension_id.lower()
+
+    def describe(self) -> str:
+        return f"install vscode extension {self.extension_id}"
+
+    def probes(self) -> list[Path]:
+        extensions_dir = get_extensions_dir()
+        return [extensions_dir, extensions_dir / "extensions.json"]
+
+
+__all__ = [
+    "ExtensionBackend",
+    "ExtensionInstall",
+    "get_extensions_dir",
+    "get_installed_extensions",
+    "get_missing_extensions",
+    "install_extensions",
+]
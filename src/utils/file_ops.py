@@ -2,79 +2,192 @@
 Core file operations for dotfiles setup.
 
 Provides cross-platform utilities for symlinks, file creation, and directories.
+Imports only needed on some paths (asyncio for the sync wrappers, shutil for
+directory removal and copying, tempfile for atomic writes) are deferred to
+keep CLI startup fast.
 """
 
-import asyncio
 import os
-import platform
-import shutil
-import time
+import sys
+from collections.abc import Iterable
 from pathlib import Path
 
+from .sync import copy_mode, sync_tree
+from .trace import span
+
 PathLike = str | Path
 
 
 def get_platform() -> str:
     """Get the current platform in a normalized format."""
-    system = platform.system().lower()
+    # sys.platform avoids importing the platform module
     platform_map = {
         "darwin": "macos",
-        "windows": "windows",
+        "win32": "windows",
         "linux": "linux",
     }
-    return platform_map.get(system, system)
+    return platform_map.get(sys.platform, sys.platform)
 
 
-async def create_symlink(config_path: PathLike, symlink_path: PathLike) -> None:
+def symlink_points_to(symlink_path: Path, config_path: Path) -> bool:
     """
-    Creates a symlink and will remove any existing symlink or file.
+    Check whether symlink_path is already a symlink to config_path.
+
+    Only reads the link itself (a single readlink), so it is cheap enough to
+    run for every managed dotfile on every run.
+    """
+    try:
+        link_target = symlink_path.readlink()
+    except OSError:
+        # Missing, or a regular file/directory rather than a symlink
+        return False
+
+    if not link_target.is_absolute():
+        link_target = symlink_path.parent / link_target
+    return os.path.normcase(os.path.normpath(link_target)) == os.path.normcase(str(config_path))
 
-    Args:
-        config_path: The path of the config to be symlinked
-        symlink_path: The symlink path that points back to config_path
 
-    Note: This function matches the TypeScript implementation behavior exactly.
+def scan_entries(paths: Iterable[Path]) -> dict[Path, os.DirEntry[str] | None]:
     """
-    config_path = Path(config_path).resolve()
-    symlink_path = Path(symlink_path)
+    Look up many paths with one directory listing per parent directory.
+
+    Directory entries know whether they are a file, directory or symlink from
+    the listing itself, so missing paths and most type checks cost no extra
+    system calls.
 
-    # Remove existing file/symlink if it exists (matches TS behavior)
+    Returns:
+        The directory entry for each path, or None if it does not exist
+    """
+    wanted: dict[Path, dict[str, Path]] = {}
+    for path in paths:
+        wanted.setdefault(path.parent, {})[path.name] = path
+
+    entries: dict[Path, os.DirEntry[str] | None] = {}
+    for parent, names in wanted.items():
+        entries.update(dict.fromkeys(names.values()))
+        try:
+            with os.scandir(parent) as listing:
+                for entry in listing:
+                    if entry.name in names:
+                        entries[names[entry.name]] = entry
+        except OSError:
+            # A missing or unreadable parent: none of its entries exist
+            continue
+    return entries
+
+
+def atomic_write(path: PathLike, data: str | bytes, mode: int | None = None) -> None:
+    """
+    Replace a file's contents in one step, so readers never see a partial file.
+
+    The data goes to a temporary file next to path, which is then renamed
+    over it. Text is written as UTF-8 without newline translation.
+
+    Args:
+        path: The file to write; missing parent directories are created
+        data: The new contents
+        mode: Permissions for the file, instead of the temporary file's 0600
+    """
+    # Only needed when something is written, so not imported at startup
+    import tempfile  # noqa: PLC0415
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    temp_path = Path(temp_name)
     try:
-        if symlink_path.exists() or symlink_path.is_symlink():
-            if symlink_path.is_dir() and not symlink_path.is_symlink():
-                shutil.rmtree(symlink_path)
-            else:
-                symlink_path.unlink()
-            print(f"Removed existing file {symlink_path}")
-    except OSError as e:
-        print(f"{symlink_path} doesn't currently exist, creating new. {e}")
+        with os.fdopen(fd, "wb") as temp_file:
+            temp_file.write(data.encode("utf-8") if isinstance(data, str) else data)
+        if mode is not None:
+            temp_path.chmod(mode)
+        temp_path.replace(path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+def _replace_with_symlink(config_path: Path, symlink_path: Path) -> None:
+    """
+    Point symlink_path at config_path without a window where it is missing.
+
+    A temporary symlink is created next to the target and moved over it with
+    Path.replace. Real directories cannot be replaced atomically, so those are
+    removed first.
+    """
+    temp_path = symlink_path.with_name(f".{symlink_path.name}.dotfiles-{os.getpid()}")
+    temp_path.unlink(missing_ok=True)
+    temp_path.symlink_to(config_path, target_is_directory=config_path.is_dir())
 
-    # Create the symlink
     try:
-        print(f"Creating symlink, {symlink_path} is linked to {config_path}.")
+        if symlink_path.is_dir() and not symlink_path.is_symlink():
+            import shutil  # noqa: PLC0415
+
+            shutil.rmtree(symlink_path)
+            print(f"Removed existing directory {symlink_path}")
+        temp_path.replace(symlink_path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+def copy_config(config_path: Path, symlink_path: Path) -> None:
+    """Keep a copy of config_path at symlink_path, copying only what changed."""
+    report = sync_tree(config_path, symlink_path)
+    if report.changed:
+        print(
+            f"Synced copy of {config_path} to {symlink_path}: "
+            f"{len(report.copied)} copied, {len(report.removed)} removed"
+        )
+
+
+async def create_symlink(config_path: PathLike, symlink_path: PathLike) -> None:
+    """
+    Creates a symlink, replacing any existing symlink or file.
 
-        # Ensure parent directory exists
-        symlink_path.parent.mkdir(parents=True, exist_ok=True)
+    Does nothing when symlink_path already points at config_path. Otherwise
+    the existing file is swapped for the symlink atomically. Where symlinks
+    cannot be created (Windows without developer mode), or in copy mode, an
+    incrementally synced copy is kept instead.
 
-        # Create symlink with proper handling for different platforms
-        if get_platform() == "windows":
-            # On Windows, we need to determine if target is a directory
+    Args:
+        config_path: The path of the config to be symlinked
+        symlink_path: The symlink path that points back to config_path
+    """
+    config_path = Path(config_path).resolve()
+    symlink_path = Path(symlink_path)
+
+    with span("create_symlink", "file", path=str(symlink_path), target=str(config_path)):
+        if copy_mode():
             try:
-                is_dir = config_path.is_dir()
-                symlink_path.symlink_to(config_path, target_is_directory=is_dir)
-            except OSError:
-                # Fall back to copying if symlink creation fails on Windows
-                if config_path.is_dir():
-                    shutil.copytree(config_path, symlink_path)
-                else:
-                    shutil.copy2(config_path, symlink_path)
-                print(f"Warning: Created copy instead of symlink on Windows for {symlink_path}")
-        else:
-            # Unix-like systems
-            symlink_path.symlink_to(config_path)
+                copy_config(config_path, symlink_path)
+            except OSError as e:
+                print(f"Unable to copy {config_path} to {symlink_path}. {e}")
+            return
+
+        # Fast path: the link is already correct, so there is nothing to write
+        if symlink_points_to(symlink_path, config_path):
+            return
+
+        try:
+            print(f"Creating symlink, {symlink_path} is linked to {config_path}.")
+
+            # Ensure parent directory exists
+            symlink_path.parent.mkdir(parents=True, exist_ok=True)
+
+            # Create symlink with proper handling for different platforms
+            if get_platform() == "windows":
+                try:
+                    _replace_with_symlink(config_path, symlink_path)
+                except OSError:
+                    # Fall back to copying if symlink creation fails on Windows
+                    copy_config(config_path, symlink_path)
+                    print(f"Warning: Created copy instead of symlink on Windows for {symlink_path}")
+            else:
+                # Unix-like systems
+                _replace_with_symlink(config_path, symlink_path)
 
-    except OSError as e:
-        print(f"Unable to create symlink for {config_path} with symlink {symlink_path}. {e}")
+        except OSError as e:
+            print(f"Unable to create symlink for {config_path} with symlink {symlink_path}. {e}")
 
 
 def create_symlink_sync(config_path: PathLike, symlink_path: PathLike) -> None:
@@ -85,6 +198,7 @@ def create_symlink_sync(config_path: PathLike, symlink_path: PathLike) -> None:
         config_path: The path of the config to be symlinked
         symlink_path: The symlink path that points back to config_path
     """
+    import asyncio  # noqa: PLC0415
 
     # Run the async version in a new event loop if needed
     try:
@@ -111,18 +225,18 @@ async def touch(file_path: PathLike) -> None:
     """
     file_path = Path(file_path)
 
-    try:
-        if file_path.exists():
-            # File exists so update the timestamps (equivalent to utimes)
-            now = time.time()
-            os.utime(file_path, (now, now))
-        else:
-            # File doesn't exist so create it
-            print(f"Creating file {file_path}")
-            file_path.parent.mkdir(parents=True, exist_ok=True)
-            file_path.touch()
-    except OSError as e:
-        print(f"Error touching file {file_path}: {e}")
+    with span("touch", "file", path=str(file_path)):
+        try:
+            if file_path.exists():
+                # File exists so update the timestamps (equivalent to utimes)
+                os.utime(file_path)
+            else:
+                # File doesn't exist so create it
+                print(f"Creating file {file_path}")
+                file_path.parent.mkdir(parents=True, exist_ok=True)
+                file_path.touch()
+        except OSError as e:
+            print(f"Error touching file {file_path}: {e}")
 
 
 def touch_sync(file_path: PathLike) -> None:
@@ -132,6 +246,8 @@ def touch_sync(file_path: PathLike) -> None:
     Args:
         file_path: The path to touch
     """
+    import asyncio  # noqa: PLC0415
+
     asyncio.run(touch(file_path))
 
 
@@ -146,13 +262,14 @@ async def mkdir(dir_path: PathLike) -> None:
     """
     dir_path = Path(dir_path)
 
-    try:
-        if not dir_path.exists():
-            dir_path.mkdir(parents=True, exist_ok=True)
-            print(f"Created dir {dir_path}")
-        # If directory already exists, this is a no-op (matches TS behavior)
-    except OSError as e:
-        print(f"Error creating directory {dir_path}: {e}")
+    with span("mkdir", "file", path=str(dir_path)):
+        try:
+            if not dir_path.exists():
+                dir_path.mkdir(parents=True, exist_ok=True)
+                print(f"Created dir {dir_path}")
+            # If directory already exists, this is a no-op (matches TS behavior)
+        except OSError as e:
+            print(f"Error creating directory {dir_path}: {e}")
 
 
 def mkdir_sync(dir_path: PathLike) -> None:
@@ -162,17 +279,23 @@ def mkdir_sync(dir_path: PathLike) -> None:
     Args:
         dir_path: Directory path to be created
     """
+    import asyncio  # noqa: PLC0415
+
     asyncio.run(mkdir(dir_path))
 
 
 # Convenience exports for both sync and async usage
 __all__ = [
     "PathLike",
+    "atomic_write",
+    "copy_config",
     "create_symlink",
     "create_symlink_sync",
     "get_platform",
     "mkdir",
     "mkdir_sync",
+    "scan_entries",
+    "symlink_points_to",
     "touch",
     "touch_sync",
 ]
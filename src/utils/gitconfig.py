@@ -0,0 +1,439 @@
+"""
+Batched git config backend for dotfiles setup.
+
+Reads the global git config file directly, diffs it against the desired
+settings and writes every change in a single atomic file update. When the
+config is already up to date no files are written and no processes spawned.
+"""
+
+import os
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import TYPE_CHECKING, ClassVar
+
+from .file_ops import PathLike, atomic_write
+from .plan import Action, Backend
+
+if TYPE_CHECKING:
+    from .targets import Target
+
+GitConfig = dict[str, list[str]]
+
+
+@dataclass
+class _Entry:
+    """A key assignment in a git config file, spanning lines start..end."""
+
+    key: str
+    value: str
+    start: int
+    end: int
+
+
+@dataclass
+class _Section:
+    """A section header in a git config file and the line it ends before."""
+
+    name: str
+    start: int
+    end: int
+
+
+def global_config_path() -> Path:
+    """
+    Get the path of the global git config file, using the same lookup as git.
+
+    GIT_CONFIG_GLOBAL wins, then an existing ~/.gitconfig, then an existing
+    XDG config file, falling back to ~/.gitconfig for new configs.
+    """
+    override = os.environ.get("GIT_CONFIG_GLOBAL")
+    if override:
+        return Path(override).expanduser()
+
+    home_config = Path.home() / ".gitconfig"
+    if home_config.exists():
+        return home_config
+
+    xdg_home = os.environ.get("XDG_CONFIG_HOME") or str(Path.home() / ".config")
+    xdg_config = Path(xdg_home) / "git" / "config"
+    if xdg_config.exists():
+        return xdg_config
+
+    return home_config
+
+
+def split_key(key: str) -> tuple[str, str]:
+    """
+    Split a config key into its canonical section and variable name.
+
+    Section and variable names are case-insensitive in git, subsections are
+    not, so "url.GitHub.insteadOf" becomes ("url.GitHub", "insteadof").
+    """
+    section, _, name = key.rpartition(".")
+    if not section or not name:
+        raise ValueError(f"Invalid git config key: {key}")
+
+    base, dot, subsection = section.partition(".")
+    return f"{base.lower()}{dot}{subsection}", name.lower()
+
+
+def _parse_header(line: str) -> tuple[str, str] | None:
+    """
+    Parse a section header line.
+
+    Returns:
+        The canonical section name and whatever follows the closing bracket,
+        since git also accepts an assignment there, as in ``[core] editor = vim``
+    """
+    stripped = line.strip()
+    if not stripped.startswith("["):
+        return None
+
+    # A quoted subsection may itself contain a closing bracket
+    in_quotes = False
+    index = 1
+    while index < len(stripped):
+        char = stripped[index]
+        if char == "\\" and in_quotes:
+            index += 1
+        elif char == '"':
+            in_quotes = not in_quotes
+        elif char == "]" and not in_quotes:
+            break
+        index += 1
+    else:
+        return None
+
+    header = stripped[1:index].strip()
+    rest = stripped[index + 1 :].strip()
+    if '"' in header:
+        base, _, quoted = header.partition('"')
+        subsection = quoted.rsplit('"', 1)[0].replace('\\"', '"').replace("\\\\", "\\")
+        return f"{base.strip().lower()}.{subsection}", rest
+
+    # Legacy [section.subsection] syntax has a case-insensitive subsection
+    return header.lower(), rest
+
+
+def _has_assignment(text: str) -> bool:
+    """Whether text after a section header holds an assignment, not just a comment."""
+    return bool(text) and text[0] not in "#;"
+
+
+def _parse_value(raw: str, continued: bool = False) -> tuple[str, bool]:
+    """
+    Parse the value part of an assignment.
+
+    Args:
+        raw: The text after the equals sign, or a continuation line
+        continued: Whether raw continues a previous line, keeping leading space
+
+    Returns:
+        The decoded value and whether it continues onto the next line
+    """
+    value: list[str] = []
+    pending_space = ""
+    in_quotes = False
+    escapes = {"n": "\n", "t": "\t", "b": "\b", '"': '"', "\\": "\\"}
+
+    index = 0
+    while index < len(raw):
+        char = raw[index]
+        if char == "\\":
+            if index + 1 >= len(raw):
+                return "".join(value) + pending_space, True
+            value.append(pending_space + escapes.get(raw[index + 1], raw[index + 1]))
+            pending_space = ""
+            index += 2
+            continue
+        if char == '"':
+            in_quotes = not in_quotes
+        elif char in "#;" and not in_quotes:
+            break
+        elif char.isspace() and not in_quotes:
+            # Whitespace is only kept when something follows it
+            if value or continued:
+                pending_space += char
+        else:
+            value.append(pending_space + char)
+            pending_space = ""
+        index += 1
+
+    return "".join(value), False
+
+
+def _parse(lines: list[str]) -> tuple[list[_Section], list[_Entry]]:
+    """Parse config lines into section spans and key assignments."""
+    sections: list[_Section] = []
+    entries: list[_Entry] = []
+    section: str | None = None
+
+    index = 0
+    while index < len(lines):
+        line = lines[index]
+        stripped = line.strip()
+
+        parsed = _parse_header(line)
+        if parsed is not None:
+            header, stripped = parsed
+            if sections:
+                sections[-1].end = index
+            section = header
+            sections.append(_Section(name=header, start=index, end=len(lines)))
+            if not _has_assignment(stripped):
+                index += 1
+                continue
+
+        if not stripped or stripped[0] in "#;" or section is None:
+            index += 1
+            continue
+
+        name, equals, raw_value = stripped.partition("=")
+        start = index
+        if equals:
+            value, continues = _parse_value(raw_value.strip())
+            while continues and index + 1 < len(lines):
+                index += 1
+                more, continues = _parse_value(lines[index].rstrip("\r\n"), continued=True)
+                value += more
+        else:
+            # A bare variable name is a boolean true
+            value = "true"
+
+        entries.append(
+            _Entry(key=f"{section}.{name.strip().lower()}", value=value, start=start, end=index)
+        )
+        index += 1
+
+    return sections, entries
+
+
+def parse_config(text: str) -> GitConfig:
+    """
+    Parse git config text into a mapping of canonical keys to their values.
+
+    Args:
+        text: The contents of a git config file
+
+    Returns:
+        Every value for each key, in file order
+    """
+    _, entries = _parse(text.splitlines(keepends=True))
+    config: GitConfig = {}
+    for entry in entries:
+        config.setdefault(entry.key, []).append(entry.value)
+    return config
+
+
+def read_config(path: PathLike | None = None) -> GitConfig:
+    """Read and parse a git config file, treating a missing file as empty."""
+    path = Path(path) if path is not None else global_config_path()
+    try:
+        return parse_config(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+
+
+def diff_config(current: GitConfig, desired: dict[str, str]) -> dict[str, str]:
+    """
+    Get the desired settings that differ from the current config.
+
+    A key is up to date only when it has exactly one value equal to the
+    desired value, matching ``git config --replace-all`` semantics.
+    """
+    changes = {}
+    for key, value in desired.items():
+        section, name = split_key(key)
+        if current.get(f"{section}.{name}") != [value]:
+            changes[key] = value
+    return changes
+
+
+def _format_value(value: str) -> str:
+    """Encode a value the way git writes it."""
+    encoded = (
+        value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\t", "\\t")
+    )
+    if value != value.strip() or any(char in value for char in "#;"):
+        return f'"{encoded}"'
+    return encoded
+
+
+def _format_header(key: str) -> str:
+    """Render the section header line for a config key."""
+    base, _, subsection = key.rpartition(".")[0].partition(".")
+    if not subsection:
+        return f"[{base}]\n"
+    escaped = subsection.replace("\\", "\\\\").replace('"', '\\"')
+    return f'[{base} "{escaped}"]\n'
+
+
+def _split_header_lines(lines: list[str]) -> list[str]:
+    """Move assignments that follow a section header onto their own line."""
+    split: list[str] = []
+    for line in lines:
+        parsed = _parse_header(line)
+        if parsed is None or not _has_assignment(parsed[1]):
+            split.append(line)
+            continue
+        rest = parsed[1]
+        split.append(line[: line.rindex(rest)].rstrip() + "\n")
+        split.append(f"\t{rest}\n")
+    return split
+
+
+def update_config_text(text: str, changes: dict[str, str]) -> str:
+    """
+    Apply changes to git config text, keeping comments and unrelated keys.
+
+    Every existing value of a changed key is replaced by a single assignment
+    written where the first one was, and a section left with no assignments
+    is removed. New keys are appended to the last matching section, or to a
+    new section at the end of the file, with one header per section.
+    """
+    lines = text.splitlines(keepends=True)
+    if lines and not lines[-1].endswith("\n"):
+        lines[-1] += "\n"
+    lines = _split_header_lines(lines)
+
+    sections, entries = _parse(lines)
+    removed: set[int] = set()
+    replacements: dict[int, str] = {}
+    inserts: dict[int, list[str]] = {}
+    appended: dict[str, list[str]] = {}
+
+    for key, value in changes.items():
+        section, name = split_key(key)
+        assignment = f"\t{key.rpartition('.')[2]} = {_format_value(value)}\n"
+
+        matches = [entry for entry in entries if entry.key == f"{section}.{name}"]
+        for entry in matches:
+            removed.update(range(entry.start, entry.end + 1))
+        if matches:
+            replacements[matches[0].start] = assignment
+            continue
+
+        owners = [candidate for candidate in sections if candidate.name == section]
+        if owners:
+            inserts.setdefault(owners[-1].end, []).append(assignment)
+        else:
+            appended.setdefault(section, [_format_header(key)]).append(assignment)
+
+    for candidate in sections:
+        body = range(candidate.start + 1, candidate.end)
+        emptied = (
+            any(index in removed for index in body)
+            and candidate.end not in inserts
+            and not any(index in replacements for index in body)
+            and all(index in removed or not lines[index].strip() for index in body)
+        )
+        if emptied:
+            # e.g. a duplicate [core] header whose only key moved to the first one
+            removed.update(range(candidate.start, candidate.end))
+
+    output: list[str] = []
+    for index, line in enumerate(lines):
+        # Section ends are the index of the next header, so inserts go first
+        output.extend(inserts.get(index, []))
+        if index in replacements:
+            output.append(replacements[index])
+        elif index not in removed:
+            output.append(line)
+
+    output.extend(inserts.get(len(lines), []))
+    for section_lines in appended.values():
+        output.extend(section_lines)
+    return "".join(output)
+
+
+def write_config(path: PathLike, text: str) -> None:
+    """Atomically replace a config file, following symlinks like git does."""
+    path = Path(path).resolve()
+    atomic_write(path, text, mode=path.stat().st_mode & 0o7777 if path.exists() else 0o644)
+
+
+async def apply_config(desired: dict[str, str], path: PathLike | None = None) -> dict[str, str]:
+    """
+    Bring a git config file in line with the desired settings.
+
+    Args:
+        desired: Mapping of config keys to values, e.g. {"core.editor": "vim"}
+        path: The config file to update, defaulting to the global config
+
+    Returns:
+        The settings that were changed; empty when already up to date
+    """
+    path = Path(path) if path is not None else global_config_path()
+    try:
+        text = path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        text = ""
+
+    changes = diff_config(parse_config(text), desired)
+    if changes:
+        write_config(path, update_config_text(text, changes))
+    return changes
+
+
+class GitConfigBackend(Backend):
+    """Reads each git config file once and writes all its changes together."""
+
+    async def diff(self, actions: list["GitConfigSet"]) -> list["GitConfigSet"]:
+        current = {path: read_config(path) for path in {action.path for action in actions}}
+        return [
+            action
+            for action in actions
+            if diff_config(current[action.path], {action.name: action.value})
+        ]
+
+    async def apply(self, actions: list["GitConfigSet"]) -> dict["GitConfigSet", str]:
+        by_path: dict[Path, dict[str, str]] = {}
+        for action in actions:
+            by_path.setdefault(action.path, {})[action.name] = action.value
+
+        for path, desired in by_path.items():
+            for key, value in (await apply_config(desired, path)).items():
+                print(f"Set git config {key} to {value}")
+        return {}
+
+
+@dataclass(frozen=True)
+class GitConfigSet(Action):
+    """A git config key that must have exactly one, given, value."""
+
+    kind: ClassVar[str] = "git-config"
+    backend: ClassVar[type[Backend]] = GitConfigBackend
+
+    name: str
+    value: str
+    path: Path
+
+    def target(self) -> str:
+        return f"{self.path}:{self.name}"
+
+    def describe(self) -> str:
+        return f"set git config {self.name} to {self.value}"
+
+    def probes(self) -> list[Path]:
+        return [self.path.resolve()]
+
+    def relocate(self, target: "Target") -> "Action | None":
+        path = target.place(self.path)
+        if path is None:
+            return None
+        return replace(self, path=path, value=target.rewrite(self.value))
+
+
+__all__ = [
+    "GitConfig",
+    "GitConfigBackend",
+    "GitConfigSet",
+    "apply_config",
+    "diff_config",
+    "global_config_path",
+    "parse_config",
+    "read_config",
+    "split_key",
+    "update_config_text",
+    "write_config",
+]
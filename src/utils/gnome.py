@@ -0,0 +1,309 @@
+"""
+GNOME desktop settings helpers for dotfiles setup.
+
+Settings are addressed by their dconf key path, e.g.
+``/org/gnome/desktop/peripherals/mouse/speed``, with values written as
+GVariant text (``-0.3``, ``'flat'``, ``false``). The current values are read
+with a single ``dconf dump`` and changes are written with a single
+``dconf load`` keyfile transaction, so a module's settings cost two
+processes and one change notification however many keys it sets.
+
+Settings relocated into a root filesystem (``--root``, ``--export-tar``)
+cannot go through dconf, so they are written to a system keyfile instead,
+which the image compiles into its dconf database with ``dconf update``.
+"""
+
+import math
+import os
+import posixpath
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, ClassVar
+
+from .file_ops import atomic_write
+from .plan import Action, Backend, BackendUnavailableError
+from .process import run_command
+
+GVariantValue = bool | int | float | str | None
+
+DCONF_MISSING = "dconf command not found. GNOME settings require a GNOME desktop environment."
+
+# System keyfile holding the settings in a root filesystem; the image needs a
+# dconf profile using the "local" database and a "dconf update" to apply it
+DCONF_KEYFILE = Path("/etc/dconf/db/local.d/00-dotfiles")
+
+if TYPE_CHECKING:
+    from .targets import Target
+
+
+def get_dconf_database() -> Path:
+    """
+    Get the user's dconf database file.
+
+    Every gsettings/dconf write ends up in this file, so its lstat signature
+    changes whenever any GNOME setting is modified.
+    """
+    config_home = os.environ.get("XDG_CONFIG_HOME") or str(Path.home() / ".config")
+    return Path(config_home) / "dconf" / "user"
+
+
+# Type annotations GVariant text may put in front of numbers
+_TYPE_PREFIXES = {
+    "byte",
+    "int16",
+    "uint16",
+    "int32",
+    "uint32",
+    "int64",
+    "uint64",
+    "double",
+    "@y",
+    "@n",
+    "@q",
+    "@i",
+    "@u",
+    "@x",
+    "@t",
+    "@d",
+}
+
+
+def parse_gvariant(text: str) -> GVariantValue:
+    """
+    Parse a scalar GVariant text value (boolean, number or string).
+
+    Values of any other type are returned unchanged as their text, which is
+    still good enough for an equality check.
+    """
+    text = text.strip()
+    if not text:
+        return None
+    if text in ("true", "false"):
+        return text == "true"
+    if text[0] in "'\"" and text[-1] == text[0] and len(text) >= 2:
+        body = text[1:-1]
+        return body.replace(f"\\{text[0]}", text[0]).replace("\\\\", "\\")
+
+    # Typed literals such as "uint32 5" or "@i 5"
+    number = text.split()[-1] if text.split()[0] in _TYPE_PREFIXES else text
+    try:
+        return int(number)
+    except ValueError:
+        pass
+    try:
+        return float(number)
+    except ValueError:
+        return text
+
+
+def gvariant_equal(current: str | None, desired: str) -> bool:
+    """Compare two GVariant text values, tolerating float formatting."""
+    if current is None:
+        return False
+
+    current_value = parse_gvariant(current)
+    desired_value = parse_gvariant(desired)
+    if isinstance(current_value, bool) or isinstance(desired_value, bool):
+        return type(current_value) is type(desired_value) and current_value == desired_value
+    if isinstance(current_value, int | float) and isinstance(desired_value, int | float):
+        return math.isclose(current_value, desired_value, rel_tol=1e-9, abs_tol=1e-12)
+    return current_value == desired_value
+
+
+def key_dir(path: str) -> str:
+    """Get the dconf directory (with trailing slash) containing a key."""
+    return path.rsplit("/", 1)[0] + "/"
+
+
+def common_dir(paths: list[str]) -> str:
+    """Get the deepest dconf directory containing every key."""
+    root = posixpath.commonpath([key_dir(path) for path in paths])
+    return root.rstrip("/") + "/"
+
+
+def parse_keyfile(text: str, root: str = "/") -> dict[str, str]:
+    """
+    Parse ``dconf dump`` output into a mapping of key path to GVariant text.
+
+    Args:
+        text: The keyfile, with sections relative to root
+        root: The dconf directory that was dumped
+    """
+    settings = {}
+    section = root
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("[") and line.endswith("]"):
+            name = line[1:-1].strip("/")
+            section = f"{root}{name}/" if name else root
+            continue
+        name, separator, value = line.partition("=")
+        if separator:
+            settings[f"{section}{name.strip()}"] = value.strip()
+    return settings
+
+
+def format_keyfile(settings: dict[str, str], root: str = "/") -> str:
+    """
+    Format key paths and GVariant values as a keyfile for ``dconf load``.
+
+    Args:
+        settings: Mapping of key path (under root) to GVariant text
+        root: The dconf directory the keyfile will be loaded into
+    """
+    sections: dict[str, list[str]] = {}
+    for path, value in settings.items():
+        section = key_dir(path)[len(root) :].strip("/") or "/"
+        sections.setdefault(section, []).append(f"{path.rsplit('/', 1)[1]}={value}")
+
+    return "\n".join(
+        f"[{section}]\n" + "\n".join(lines) + "\n" for section, lines in sections.items()
+    )
+
+
+async def dump_settings(root: str = "/") -> dict[str, str]:
+    """Read every key under a dconf directory with one dconf invocation."""
+    try:
+        result = await run_command(["dconf", "dump", root], timeout=10)
+    except FileNotFoundError:
+        raise BackendUnavailableError(DCONF_MISSING) from None
+    return parse_keyfile(result.stdout, root)
+
+
+async def load_settings(settings: dict[str, str]) -> None:
+    """Write keys in a single dconf transaction."""
+    root = common_dir(list(settings))
+    try:
+        await run_command(
+            ["dconf", "load", root], input_text=format_keyfile(settings, root), timeout=10
+        )
+    except FileNotFoundError:
+        raise BackendUnavailableError(DCONF_MISSING) from None
+
+
+class GSettingBackend(Backend):
+    """Reads GNOME settings with one dconf dump and writes them with one dconf load."""
+
+    async def diff(self, actions: list["GSetting"]) -> list["GSetting"]:
+        current = await dump_settings(common_dir([action.path for action in actions]))
+        return [
+            action
+            for action in actions
+            if not gvariant_equal(current.get(action.path), action.value)
+        ]
+
+    async def apply(self, actions: list["GSetting"]) -> dict["GSetting", str]:
+        for action in actions:
+            print(f"Setting {action.path} to {action.value}")
+        try:
+            await load_settings({action.path: action.value for action in actions})
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            error = (getattr(e, "stderr", None) or "").strip() or str(e)
+            return dict.fromkeys(actions, error)
+        return {}
+
+
+@dataclass(frozen=True)
+class GSetting(Action):
+    """A GNOME setting, addressed by dconf key path, with a GVariant value."""
+
+    kind: ClassVar[str] = "gsetting"
+    backend: ClassVar[type[Backend]] = GSettingBackend
+
+    path: str
+    value: str
+
+    def target(self) -> str:
+        return self.path
+
+    def describe(self) -> str:
+        return f"set {self.path} to {self.value}"
+
+    def probes(self) -> list[Path]:
+        return [get_dconf_database()]
+
+    def relocate(self, target: "Target") -> "Action | None":
+        # Only root filesystems have a system keyfile; another user's dconf
+        # database can only be written from their own session
+        keyfile = target.place(DCONF_KEYFILE)
+        if keyfile is None:
+            return None
+        return DconfKeyfileSetting(keyfile, self.path, self.value)
+
+
+def read_keyfile(path: Path) -> dict[str, str]:
+    """Read the settings in a dconf keyfile, or none if it does not exist."""
+    try:
+        return parse_keyfile(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+
+
+def write_keyfile(path: Path, settings: dict[str, str]) -> None:
+    """Atomically write a dconf keyfile, sorted so identical settings give identical files."""
+    atomic_write(path, format_keyfile(dict(sorted(settings.items()))), mode=0o644)
+
+
+class DconfKeyfileBackend(Backend):
+    """Reads and writes each dconf keyfile once."""
+
+    async def diff(self, actions: list["DconfKeyfileSetting"]) -> list["DconfKeyfileSetting"]:
+        current = {path: read_keyfile(path) for path in {action.keyfile for action in actions}}
+        return [
+            action
+            for action in actions
+            if not gvariant_equal(current[action.keyfile].get(action.path), action.value)
+        ]
+
+    async def apply(self, actions: list["DconfKeyfileSetting"]) -> dict["DconfKeyfileSetting", str]:
+        changes: dict[Path, dict[str, str]] = {}
+        for action in actions:
+            changes.setdefault(action.keyfile, {})[action.path] = action.value
+
+        for keyfile, settings in changes.items():
+            print(f"Writing {len(settings)} settings to {keyfile}")
+            write_keyfile(keyfile, {**read_keyfile(keyfile), **settings})
+        return {}
+
+
+@dataclass(frozen=True)
+class DconfKeyfileSetting(Action):
+    """A GNOME setting written to a dconf keyfile rather than the live database."""
+
+    kind: ClassVar[str] = "dconf-keyfile"
+    backend: ClassVar[type[Backend]] = DconfKeyfileBackend
+
+    keyfile: Path
+    path: str
+    value: str
+
+    def target(self) -> str:
+        return f"{self.keyfile}:{self.path}"
+
+    def describe(self) -> str:
+        return f"set {self.path} to {self.value} in {self.keyfile}"
+
+    def probes(self) -> list[Path]:
+        return [self.keyfile]
+
+
+__all__ = [
+    "DCONF_KEYFILE",
+    "DconfKeyfileBackend",
+    "DconfKeyfileSetting",
+    "GSetting",
+    "GSettingBackend",
+    "common_dir",
+    "dump_settings",
+    "format_keyfile",
+    "get_dconf_database",
+    "gvariant_equal",
+    "load_settings",
+    "parse_gvariant",
+    "parse_keyfile",
+    "read_keyfile",
+    "write_keyfile",
+]
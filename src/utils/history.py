@@ -0,0 +1,238 @@
+"""
+Local run history for dotfiles setup.
+
+Every run appends its per-module timings, action counts and outcomes to a
+small SQLite database in the state directory. ``--history`` shows recent
+trends and flags modules whose latest duration regressed compared with
+their rolling baseline (the median of their previous runs), e.g. after a
+new extension was added or the ``code`` CLI got slower.
+"""
+
+import sqlite3
+import statistics
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from .state import get_history_path
+
+if TYPE_CHECKING:
+    from .metrics import RunMetrics
+
+# Number of previous runs making up a module's rolling baseline
+BASELINE_RUNS = 10
+
+# A module has regressed when it is this much slower than its baseline...
+REGRESSION_THRESHOLD = 0.5
+
+# ...and slower by at least this many seconds, so millisecond jitter is ignored
+MIN_REGRESSION_SECONDS = 0.25
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    duration REAL NOT NULL,
+    success INTEGER NOT NULL,
+    dry_run INTEGER NOT NULL,
+    platform TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS module_runs (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    module TEXT NOT NULL,
+    duration REAL NOT NULL,
+    success INTEGER NOT NULL,
+    applied INTEGER NOT NULL,
+    unchanged INTEGER NOT NULL,
+    skipped INTEGER NOT NULL,
+    unavailable INTEGER NOT NULL,
+    failed INTEGER NOT NULL,
+    drift INTEGER NOT NULL,
+    PRIMARY KEY (run_id, module)
+);
+CREATE INDEX IF NOT EXISTS module_runs_by_module ON module_runs (module, run_id);
+"""
+
+
+@dataclass
+class ModuleTrend:
+    """A module's recent durations compared with its rolling baseline."""
+
+    module: str
+    durations: list[float]
+    baseline: float | None
+
+    @property
+    def latest(self) -> float:
+        """The module's duration in the most recent run."""
+        return self.durations[-1]
+
+    @property
+    def change(self) -> float | None:
+        """Relative change of the latest duration against the baseline."""
+        if not self.baseline:
+            return None
+        return (self.latest - self.baseline) / self.baseline
+
+    @property
+    def regressed(self) -> bool:
+        """Whether the latest run was notably slower than the baseline."""
+        if self.baseline is None or self.change is None:
+            return False
+        return (
+            self.change > REGRESSION_THRESHOLD
+            and self.latest - self.baseline >= MIN_REGRESSION_SECONDS
+        )
+
+
+def connect(path: Path | None = None) -> sqlite3.Connection:
+    """Open the history database, creating its tables if needed."""
+    path = path if path is not None else get_history_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(path, timeout=5)
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def connect_readonly(path: Path | None = None) -> sqlite3.Connection | None:
+    """
+    Open the history database for reading, without creating it.
+
+    Returns:
+        The connection, or None if no run has been recorded yet
+    """
+    path = path if path is not None else get_history_path()
+    if not path.exists():
+        return None
+    return sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", timeout=5, uri=True)
+
+
+def record_run(
+    metrics: "RunMetrics", success: bool, platform: str, path: Path | None = None
+) -> None:
+    """Append a run and its modules to the history."""
+    connection = connect(path)
+    try:
+        with connection:
+            cursor = connection.execute(
+                "INSERT INTO runs (started, duration, success, dry_run, platform)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (metrics.started, metrics.duration, success, metrics.dry_run, platform),
+            )
+            connection.executemany(
+                "INSERT INTO module_runs (run_id, module, duration, success, applied,"
+                " unchanged, skipped, unavailable, failed, drift)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        cursor.lastrowid,
+                        name,
+                        module.duration,
+                        module.success,
+                        module.actions.get("applied", 0),
+                        module.actions.get("unchanged", 0),
+                        module.actions.get("skipped", 0),
+                        module.actions.get("unavailable", 0),
+                        module.actions.get("failed", 0),
+                        module.drift,
+                    )
+                    for name, module in metrics.modules.items()
+                ],
+            )
+    finally:
+        connection.close()
+
+
+def get_trends(path: Path | None = None, runs: int = BASELINE_RUNS) -> list[ModuleTrend]:
+    """
+    Get each module's recent durations and rolling baseline.
+
+    Only successful, non dry runs are compared, since dry runs and failures
+    do a different amount of work.
+
+    Args:
+        path: The history database, defaulting to this user's
+        runs: How many runs before the latest make up the baseline
+    """
+    connection = connect_readonly(path)
+    if connection is None:
+        return []
+    try:
+        rows = connection.execute(
+            "SELECT module, duration FROM ("
+            "  SELECT module_runs.module, module_runs.duration, module_runs.run_id,"
+            "    ROW_NUMBER() OVER ("
+            "      PARTITION BY module_runs.module ORDER BY module_runs.run_id DESC"
+            "    ) AS age"
+            "  FROM module_runs JOIN runs ON runs.id = module_runs.run_id"
+            "  WHERE module_runs.success AND NOT runs.dry_run"
+            ") WHERE age <= ? ORDER BY module, run_id",
+            (runs + 1,),
+        ).fetchall()
+    finally:
+        connection.close()
+
+    durations: dict[str, list[float]] = {}
+    for module, duration in rows:
+        durations.setdefault(module, []).append(duration)
+
+    return [
+        ModuleTrend(
+            module=module,
+            durations=values,
+            baseline=statistics.median(values[:-1]) if len(values) > 1 else None,
+        )
+        for module, values in sorted(durations.items())
+    ]
+
+
+def get_module_durations(path: Path | None = None) -> dict[str, float]:
+    """
+    Get each module's expected duration on this host, for scheduling.
+
+    This is the median of the module's recent successful, non dry runs.
+
+    Args:
+        path: The history database, defaulting to this user's
+    """
+    return {trend.module: statistics.median(trend.durations) for trend in get_trends(path)}
+
+
+def print_history(path: Path | None = None) -> int:
+    """
+    Print recent module durations and flag regressions.
+
+    Returns:
+        1 if any module regressed, otherwise 0
+    """
+    trends = get_trends(path)
+    if not trends:
+        print("No run history yet")
+        return 0
+
+    print(f"Module durations (baseline: median of up to {BASELINE_RUNS} previous runs):")
+    width = max(len(trend.module) for trend in trends)
+    for trend in trends:
+        recent = " ".join(f"{duration:.2f}" for duration in trend.durations[-5:])
+        baseline = f"{trend.baseline:.2f}s" if trend.baseline is not None else "-"
+        change = f"{trend.change:+.0%}" if trend.change is not None else ""
+        flag = "  ⚠️  regressed" if trend.regressed else ""
+        print(
+            f"  {trend.module:<{width}}  latest {trend.latest:.2f}s  baseline {baseline:>7}"
+            f"  {change:>6}  recent [{recent}]{flag}"
+        )
+
+    return 1 if any(trend.regressed for trend in trends) else 0
+
+
+__all__ = [
+    "BASELINE_RUNS",
+    "ModuleTrend",
+    "connect",
+    "connect_readonly",
+    "get_history_path",
+    "get_module_durations",
+    "get_trends",
+    "print_history",
+    "record_run",
+]
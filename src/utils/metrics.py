@@ -0,0 +1,177 @@
+"""
+Prometheus textfile metrics for dotfiles setup.
+
+Every run records each module's duration, success and action outcomes.
+With ``--metrics-file FILE`` they are written in the Prometheus text
+exposition format for node-exporter's textfile collector; the file is
+written to a temporary name and renamed into place, so the collector never
+reads a partial file. The same records feed the local run history.
+"""
+
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from .file_ops import atomic_write
+
+if TYPE_CHECKING:
+    from .plan import PlanResult
+
+# Action outcomes reported per module
+OUTCOMES = ("applied", "unchanged", "skipped", "unavailable", "failed")
+
+# The metrics of this run, if they are being collected
+_metrics: "RunMetrics | None" = None
+
+
+@dataclass
+class ModuleMetrics:
+    """What happened in one module during the run."""
+
+    duration: float = 0.0
+    success: bool = False
+    actions: dict[str, int] = field(default_factory=dict)
+    drift: int = 0
+    timed_out: bool = False
+
+
+def escape_label(value: str) -> str:
+    """Escape a label value for the Prometheus text format."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class RunMetrics:
+    """Collects metrics for a run and writes them as a textfile."""
+
+    def __init__(self, dry_run: bool = False) -> None:
+        self.dry_run = dry_run
+        self.modules: dict[str, ModuleMetrics] = {}
+        self.started = time.time()
+        self._start = time.monotonic()
+
+    @property
+    def duration(self) -> float:
+        """Seconds since the run started."""
+        return time.monotonic() - self._start
+
+    def record_module(
+        self, name: str, duration: float, success: bool, timed_out: bool = False
+    ) -> None:
+        """Record how long a module took, whether it succeeded and whether it timed out."""
+        module = self.modules.setdefault(name, ModuleMetrics())
+        module.duration = duration
+        module.success = success
+        module.timed_out = timed_out
+
+    @property
+    def timed_out(self) -> list[str]:
+        """Names of the modules that ran out of time."""
+        return sorted(name for name, module in self.modules.items() if module.timed_out)
+
+    def record_plan(self, name: str, result: "PlanResult") -> None:
+        """Record the outcome of each action in a module's plan."""
+        module = self.modules.setdefault(name, ModuleMetrics())
+        module.actions = {
+            # In a dry run, changed actions were only found, not applied
+            "applied": 0 if self.dry_run else len(result.changed),
+            "unchanged": len(result.unchanged),
+            "skipped": len(result.skipped),
+            "unavailable": len(result.unavailable),
+            "failed": len(result.failed),
+        }
+        # Actions whose current state differed from the desired state
+        module.drift = len(result.changed) + len(result.failed)
+
+    def render(self, success: bool) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        lines: list[str] = []
+
+        def metric(name: str, help_text: str, samples: list[tuple[str, float]]) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(f"{name}{labels} {value!r}" for labels, value in samples)
+
+        modules = sorted(self.modules.items())
+
+        def per_module(values: list[tuple[str, float]]) -> list[tuple[str, float]]:
+            return [(f'{{module="{escape_label(name)}"}}', value) for name, value in values]
+
+        metric(
+            "dotfiles_run_duration_seconds",
+            "Wall-clock duration of the last dotfiles run.",
+            [("", round(self.duration, 6))],
+        )
+        metric("dotfiles_run_success", "Whether the last run succeeded.", [("", int(success))])
+        metric(
+            "dotfiles_run_dry_run", "Whether the last run was a dry run.", [("", int(self.dry_run))]
+        )
+        metric(
+            "dotfiles_run_timestamp_seconds",
+            "Unix time the last run finished.",
+            [("", round(time.time(), 3))],
+        )
+        metric(
+            "dotfiles_drift_actions",
+            "Actions whose state differed from the desired state in the last run.",
+            [("", sum(module.drift for _, module in modules))],
+        )
+        metric(
+            "dotfiles_module_duration_seconds",
+            "Wall-clock duration of each module in the last run.",
+            per_module([(name, round(module.duration, 6)) for name, module in modules]),
+        )
+        metric(
+            "dotfiles_module_success",
+            "Whether each module succeeded in the last run.",
+            per_module([(name, int(module.success)) for name, module in modules]),
+        )
+        metric(
+            "dotfiles_module_timed_out",
+            "Whether each module was cancelled for exceeding its deadline in the last run.",
+            per_module([(name, int(module.timed_out)) for name, module in modules]),
+        )
+        metric(
+            "dotfiles_module_actions",
+            "Actions in each module's plan by outcome in the last run.",
+            [
+                (f'{{module="{escape_label(name)}",outcome="{outcome}"}}', module.actions[outcome])
+                for name, module in modules
+                if module.actions
+                for outcome in OUTCOMES
+            ],
+        )
+        metric(
+            "dotfiles_module_drift_actions",
+            "Actions in each module whose state differed from the desired state.",
+            per_module([(name, module.drift) for name, module in modules]),
+        )
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Path, success: bool) -> None:
+        """Atomically write the metrics as a textfile."""
+        # The collector only reads *.prom, so the temporary file is never picked
+        # up, and it usually runs as another user, so the file is world-readable
+        atomic_write(path, self.render(success), mode=0o644)
+
+
+def enable_metrics(dry_run: bool = False) -> RunMetrics:
+    """Start collecting metrics for the rest of the run."""
+    # Every module run and plan records into the same collector, wherever it runs
+    global _metrics  # noqa: PLW0603
+    _metrics = RunMetrics(dry_run)
+    return _metrics
+
+
+def get_metrics() -> RunMetrics | None:
+    """Get the active metrics collector, or None if metrics are disabled."""
+    return _metrics
+
+
+__all__ = [
+    "ModuleMetrics",
+    "RunMetrics",
+    "enable_metrics",
+    "escape_label",
+    "get_metrics",
+]
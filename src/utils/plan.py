@@ -0,0 +1,454 @@
+"""
+Declarative plan/apply engine for dotfiles setup.
+
+Modules describe the state they want as actions in a Plan instead of
+performing side effects directly. The engine groups actions by backend, lets
+each backend read the current state once and diff it against the plan, and
+then applies only the actions that would change something. A dry run stops
+after the diff, giving an exact preview of what a real run would do.
+"""
+
+import os
+import subprocess
+from abc import ABC, abstractmethod
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, ClassVar
+
+from .file_ops import (
+    create_symlink,
+    get_platform,
+    mkdir,
+    scan_entries,
+    symlink_points_to,
+    touch,
+)
+from .state import StateManifest, fingerprint, get_manifest
+from .sync import copy_mode, sync_tree, tree_paths
+from .trace import span
+
+if TYPE_CHECKING:
+    from .targets import Target
+
+
+class BackendUnavailableError(Exception):
+    """Raised by a backend when the tool it needs is not installed."""
+
+
+@dataclass(frozen=True)
+class Action(ABC):
+    """A single piece of desired state, e.g. a symlink or a git config key."""
+
+    kind: ClassVar[str] = "action"
+    backend: ClassVar[type["Backend"]]
+
+    @property
+    def key(self) -> str:
+        """Stable identity of the action, used as its state manifest key."""
+        return f"{self.kind}:{self.target()}"
+
+    @abstractmethod
+    def target(self) -> str:
+        """The thing this action manages, e.g. a path or a config key."""
+
+    @abstractmethod
+    def describe(self) -> str:
+        """Lowercase description of the change, e.g. "create directory ~/.config"."""
+
+    def inputs(self) -> dict[str, Any]:
+        """The desired values that make up the action's fingerprint."""
+        return asdict(self)
+
+    def probes(self) -> list[Path]:
+        """Files whose lstat signature reflects the action's on-disk result."""
+        return []
+
+    def relocate(self, target: "Target") -> "Action | None":
+        """
+        Get this action as it applies to another home or root filesystem.
+
+        Returns:
+            The relocated action, or None if it cannot be applied there
+        """
+        return None
+
+
+class Backend(ABC):
+    """Reads the current state for, and applies, every action of one kind."""
+
+    @abstractmethod
+    async def diff(self, actions: list[Any]) -> list[Any]:
+        """
+        Get the actions whose desired state differs from the current state.
+
+        Raises:
+            BackendUnavailableError: If the backend's tool is not installed
+        """
+
+    @abstractmethod
+    async def apply(self, actions: list[Any]) -> dict[Any, str]:
+        """
+        Apply changed actions, batching them where the backend can.
+
+        Returns:
+            Error messages for any actions that failed
+        """
+
+
+@dataclass
+class Plan:
+    """The actions a module wants applied, in order."""
+
+    module: str
+    actions: list[Action] = field(default_factory=list)
+
+    def add(self, action: Action) -> None:
+        """Add an action to the plan, ignoring exact duplicates."""
+        if action not in self.actions:
+            self.actions.append(action)
+
+
+@dataclass
+class PlanResult:
+    """What happened to each action when a plan was applied or diffed."""
+
+    changed: list[Action] = field(default_factory=list)
+    unchanged: list[Action] = field(default_factory=list)
+    skipped: list[Action] = field(default_factory=list)
+    unavailable: list[Action] = field(default_factory=list)
+    failed: dict[Action, str] = field(default_factory=dict)
+
+    def summary(self, dry_run: bool = False) -> str:
+        """Get a one line summary of the result."""
+        parts = [
+            f"{len(self.changed)} {'to change' if dry_run else 'changed'}",
+            f"{len(self.unchanged) + len(self.skipped)} unchanged",
+        ]
+        if self.unavailable:
+            parts.append(f"{len(self.unavailable)} unavailable")
+        if self.failed:
+            parts.append(f"{len(self.failed)} failed")
+        return ", ".join(parts)
+
+
+class SymlinkBackend(Backend):
+    """Creates symlinks from home directory paths to repo config files."""
+
+    @staticmethod
+    def _up_to_date(action: "Symlink", entry: os.DirEntry[str] | None) -> bool:
+        if entry is None:
+            return False
+        if copy_mode():
+            return (
+                not entry.is_symlink()
+                and not sync_tree(action.source.resolve(), action.path, dry_run=True).changed
+            )
+        # Only paths that are symlinks need their target read
+        if entry.is_symlink():
+            return symlink_points_to(action.path, action.source.resolve())
+        # Windows keeps a copy when it may not create symlinks
+        return (
+            get_platform() == "windows"
+            and not sync_tree(action.source.resolve(), action.path, dry_run=True).changed
+        )
+
+    async def diff(self, actions: list["Symlink"]) -> list["Symlink"]:
+        entries = scan_entries(action.path for action in actions)
+        return [action for action in actions if not self._up_to_date(action, entries[action.path])]
+
+    async def apply(self, actions: list["Symlink"]) -> dict["Symlink", str]:
+        failed = {}
+        for action in actions:
+            await create_symlink(action.source, action.path)
+            linked = symlink_points_to(action.path, action.source.resolve())
+            # Windows falls back to copying when it may not create symlinks
+            copied = (get_platform() == "windows" or copy_mode()) and action.path.exists()
+            if not (linked or copied):
+                failed[action] = f"Could not link {action.path}"
+        return failed
+
+
+class MakeDirBackend(Backend):
+    """Creates directories."""
+
+    async def diff(self, actions: list["MakeDir"]) -> list["MakeDir"]:
+        entries = scan_entries(action.path for action in actions)
+        return [
+            action
+            for action in actions
+            if (entry := entries[action.path]) is None or not entry.is_dir()
+        ]
+
+    async def apply(self, actions: list["MakeDir"]) -> dict["MakeDir", str]:
+        for action in actions:
+            await mkdir(action.path)
+        return {
+            action: f"Could not create {action.path}"
+            for action in actions
+            if not action.path.is_dir()
+        }
+
+
+class TouchBackend(Backend):
+    """Creates empty files that must exist."""
+
+    async def diff(self, actions: list["Touch"]) -> list["Touch"]:
+        entries = scan_entries(action.path for action in actions)
+        return [
+            action
+            for action in actions
+            if (entry := entries[action.path]) is None
+            # A dangling symlink doesn't count as the file existing
+            or (entry.is_symlink() and not action.path.exists())
+        ]
+
+    async def apply(self, actions: list["Touch"]) -> dict["Touch", str]:
+        for action in actions:
+            await touch(action.path)
+        return {
+            action: f"Could not create {action.path}"
+            for action in actions
+            if not action.path.exists()
+        }
+
+
+@dataclass(frozen=True)
+class Symlink(Action):
+    """A symlink at path pointing to a config file in the repo."""
+
+    kind: ClassVar[str] = "symlink"
+    backend: ClassVar[type[Backend]] = SymlinkBackend
+
+    source: Path
+    path: Path
+
+    def target(self) -> str:
+        return str(self.path)
+
+    def describe(self) -> str:
+        if copy_mode():
+            return f"copy {self.source.resolve()} to {self.path}"
+        return f"link {self.path} -> {self.source.resolve()}"
+
+    def probes(self) -> list[Path]:
+        # A copy goes stale when any file in the source changes, unlike a symlink
+        if get_platform() == "windows" or copy_mode():
+            return tree_paths(self.path) + tree_paths(self.source)
+        return [self.path]
+
+    def relocate(self, target: "Target") -> "Action | None":
+        path = target.place(self.path)
+        if path is None:
+            return None
+        # Copies are made from the repo's files, wherever a link would point
+        if copy_mode():
+            return replace(self, path=path)
+        return replace(self, path=path, source=target.link(self.source))
+
+
+@dataclass(frozen=True)
+class MakeDir(Action):
+    """A directory that must exist."""
+
+    kind: ClassVar[str] = "mkdir"
+    backend: ClassVar[type[Backend]] = MakeDirBackend
+
+    path: Path
+
+    def target(self) -> str:
+        return str(self.path)
+
+    def describe(self) -> str:
+        return f"create directory {self.path}"
+
+    def probes(self) -> list[Path]:
+        return [self.path]
+
+    def relocate(self, target: "Target") -> "Action | None":
+        path = target.place(self.path)
+        return replace(self, path=path) if path is not None else None
+
+
+@dataclass(frozen=True)
+class Touch(Action):
+    """A file that must exist, created empty if missing."""
+
+    kind: ClassVar[str] = "touch"
+    backend: ClassVar[type[Backend]] = TouchBackend
+
+    path: Path
+
+    def target(self) -> str:
+        return str(self.path)
+
+    def describe(self) -> str:
+        return f"create file {self.path}"
+
+    def probes(self) -> list[Path]:
+        return [self.path]
+
+    def relocate(self, target: "Target") -> "Action | None":
+        path = target.place(self.path)
+        return replace(self, path=path) if path is not None else None
+
+
+Planner = Callable[[Plan], Awaitable[None]]
+BeforeApplyHook = Callable[[list[Action]], Awaitable[None]]
+AfterApplyHook = Callable[[PlanResult], Awaitable[None]]
+
+
+def _group_by_backend(actions: list[Action]) -> dict[type[Backend], list[Action]]:
+    """Group actions by backend, keeping backends in first-use order."""
+    groups: dict[type[Backend], list[Action]] = {}
+    for action in actions:
+        groups.setdefault(action.backend, []).append(action)
+    return groups
+
+
+async def diff_plan(plan: Plan, manifest: StateManifest | None = None) -> PlanResult:
+    """
+    Compare a plan against the current state without changing anything.
+
+    Actions the state manifest knows to be unchanged are reported as skipped
+    without asking their backend.
+    """
+    manifest = manifest if manifest is not None else get_manifest()
+    result = PlanResult()
+
+    for backend_type, actions in _group_by_backend(plan.actions).items():
+        pending = []
+        for action in actions:
+            action_fingerprint = fingerprint(plan.module, action.kind, action.inputs())
+            if manifest.is_current(action.key, action_fingerprint, list(action.probes())):
+                result.skipped.append(action)
+            else:
+                pending.append(action)
+
+        if not pending:
+            continue
+
+        try:
+            with span(f"diff {pending[0].kind}", "plan", actions=len(pending)):
+                changed = await backend_type().diff(pending)
+        except BackendUnavailableError as e:
+            print(f"Skipping {len(pending)} {pending[0].kind} actions: {e}")
+            result.unavailable.extend(pending)
+            continue
+        except (OSError, subprocess.SubprocessError, ValueError) as e:
+            for action in pending:
+                result.failed[action] = f"Could not read current state: {e}"
+            continue
+
+        result.changed.extend(changed)
+        result.unchanged.extend(action for action in pending if action not in changed)
+
+    return result
+
+
+async def apply_plan(
+    plan: Plan,
+    dry_run: bool = False,
+    before_apply: BeforeApplyHook | None = None,
+    manifest: StateManifest | None = None,
+) -> PlanResult:
+    """
+    Apply the actions in a plan that differ from the current state.
+
+    Args:
+        plan: The plan to apply
+        dry_run: Only diff the plan and report what would change
+        before_apply: Called with the changed actions before any are applied
+        manifest: The state manifest, defaulting to this host's manifest
+
+    Returns:
+        The outcome of every action in the plan
+    """
+    manifest = manifest if manifest is not None else get_manifest()
+    result = await diff_plan(plan, manifest)
+
+    def record(action: Action, outcome: str) -> None:
+        action_fingerprint = fingerprint(plan.module, action.kind, action.inputs())
+        manifest.record(action.key, action_fingerprint, list(action.probes()), outcome)
+
+    if dry_run:
+        for action in result.changed:
+            print(f"Would {action.describe()}")
+        return result
+
+    for action in result.unchanged:
+        record(action, "unchanged")
+
+    if result.changed and before_apply is not None:
+        await before_apply(list(result.changed))
+
+    for backend_type, actions in _group_by_backend(result.changed).items():
+        try:
+            with span(f"apply {actions[0].kind}", "plan", actions=len(actions)):
+                failures = await backend_type().apply(actions)
+        except BackendUnavailableError as e:
+            print(f"Skipping {len(actions)} {actions[0].kind} actions: {e}")
+            failures = {}
+            result.unavailable.extend(actions)
+        except (OSError, subprocess.SubprocessError) as e:
+            failures = {action: str(e) for action in actions}
+
+        for action in actions:
+            if action in result.unavailable:
+                continue
+            if action in failures:
+                result.failed[action] = failures[action]
+                manifest.forget(action.key)
+            else:
+                record(action, "applied")
+
+    for action, error in result.failed.items():
+        print(f"⚠️  Failed to {action.describe()}: {error}")
+
+    result.changed = [
+        action
+        for action in result.changed
+        if action not in result.failed and action not in result.unavailable
+    ]
+    return result
+
+
+async def execute(
+    planner: Planner,
+    module: str,
+    dry_run: bool = False,
+    before_apply: BeforeApplyHook | None = None,
+    after_apply: AfterApplyHook | None = None,
+) -> PlanResult:
+    """
+    Build a module's plan and apply it.
+
+    Args:
+        planner: The module's plan() function
+        module: The module name, used to fingerprint its actions
+        dry_run: Only report what would change
+        before_apply: Called with the changed actions before they are applied
+        after_apply: Called with the result after a real (non dry) run
+    """
+    plan = Plan(module=module)
+    await planner(plan)
+
+    result = await apply_plan(plan, dry_run, before_apply)
+    if not dry_run and after_apply is not None:
+        await after_apply(result)
+    return result
+
+
+__all__ = [
+    "Action",
+    "Backend",
+    "BackendUnavailableError",
+    "MakeDir",
+    "Plan",
+    "PlanResult",
+    "Symlink",
+    "Touch",
+    "apply_plan",
+    "diff_plan",
+    "execute",
+]
@@ -0,0 +1,205 @@
+"""
+Non-blocking external command execution for dotfiles setup.
+
+Provides a shared async executor built on asyncio subprocesses so modules
+can run external tools (git, gsettings, defaults, code...) without blocking
+the event loop. The number of concurrently running child processes is
+bounded, and each command supports a timeout and a simple retry policy.
+
+Commands run in their own process group, so when one times out or its
+module is cancelled (e.g. by a module deadline) the whole group is killed,
+including helpers it spawned, such as the editor behind the ``code`` shim.
+Commands that use the terminal (``capture_output=False``, e.g. a sudo
+password prompt) stay in the foreground group and only they are killed.
+"""
+
+import asyncio
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import weakref
+from collections.abc import Sequence
+from pathlib import Path
+
+from .trace import span
+
+DEFAULT_MAX_WORKERS = 8
+
+
+class _WorkerPool:
+    """Bounds the number of child processes running at once, per event loop."""
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.semaphores: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def resize(self, size: int) -> None:
+        """Change the pool size, taking effect from the next event loop that runs commands."""
+        self.size = max(1, size)
+        self.semaphores.clear()
+
+    def get(self) -> asyncio.Semaphore:
+        """Get the semaphore for the running event loop."""
+        loop = asyncio.get_running_loop()
+        workers = self.semaphores.get(loop)
+        if workers is None:
+            workers = self.semaphores[loop] = asyncio.Semaphore(self.size)
+        return workers
+
+
+_workers = _WorkerPool(DEFAULT_MAX_WORKERS)
+
+
+def set_max_workers(count: int) -> None:
+    """
+    Set the maximum number of child processes that may run at once.
+
+    Args:
+        count: Maximum number of concurrent commands (at least 1)
+    """
+    _workers.resize(count)
+
+
+def resolve_command(program: str) -> str:
+    """
+    Resolve a program name to its full path using PATH.
+
+    This is needed on Windows where tools like ``code`` are ``.cmd`` shims
+    that cannot be executed by bare name without a shell.
+    """
+    return shutil.which(program) or program
+
+
+def _process_group_options(capture_output: bool) -> dict[str, object]:
+    """Get the subprocess options that start a command in its own process group."""
+    if not capture_output:
+        # Reading from the terminal needs the foreground process group
+        return {}
+    if sys.platform == "win32":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"process_group": 0}
+
+
+async def _kill(process: asyncio.subprocess.Process, own_group: bool) -> None:
+    """Kill a command, and its process group if it has its own, then reap it."""
+    if process.returncode is None:
+        try:
+            if own_group and sys.platform == "win32":
+                # taskkill /T also ends the children started by .cmd shims
+                killer = await asyncio.create_subprocess_exec(
+                    "taskkill",
+                    "/F",
+                    "/T",
+                    "/PID",
+                    str(process.pid),
+                    stdout=asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.DEVNULL,
+                )
+                await killer.wait()
+            elif own_group:
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except (ProcessLookupError, PermissionError):
+            pass
+    await process.wait()
+
+
+async def _run_once(
+    args: Sequence[str],
+    timeout: float | None,
+    input_text: str | None,
+    capture_output: bool,
+) -> subprocess.CompletedProcess[str]:
+    """Run a command a single time, killing it if it exceeds the timeout or is cancelled."""
+    pipe = asyncio.subprocess.PIPE if capture_output else None
+    group_options = _process_group_options(capture_output)
+    process = await asyncio.create_subprocess_exec(
+        resolve_command(args[0]),
+        *args[1:],
+        stdin=asyncio.subprocess.PIPE if input_text is not None else None,
+        stdout=pipe,
+        stderr=pipe,
+        **group_options,  # type: ignore[arg-type]
+    )
+
+    try:
+        stdout, stderr = await asyncio.wait_for(
+            process.communicate(input_text.encode() if input_text is not None else None),
+            timeout=timeout,
+        )
+    except TimeoutError:
+        await _kill(process, bool(group_options))
+        raise subprocess.TimeoutExpired(list(args), timeout or 0) from None
+    except asyncio.CancelledError:
+        # Don't leave the command running when its module is cancelled
+        await asyncio.shield(_kill(process, bool(group_options)))
+        raise
+
+    return subprocess.CompletedProcess(
+        list(args),
+        process.returncode if process.returncode is not None else -1,
+        stdout.decode(errors="replace") if stdout is not None else "",
+        stderr.decode(errors="replace") if stderr is not None else "",
+    )
+
+
+async def run_command(
+    args: Sequence[str],
+    *,
+    check: bool = True,
+    timeout: float | None = None,
+    retries: int = 0,
+    retry_delay: float = 1.0,
+    input_text: str | None = None,
+    capture_output: bool = True,
+) -> subprocess.CompletedProcess[str]:
+    """
+    Run an external command without blocking the event loop.
+
+    Args:
+        args: The program and its arguments
+        check: Raise CalledProcessError if the command exits non-zero
+        timeout: Seconds to wait for each attempt before killing the command
+        retries: Number of extra attempts after a failure or timeout
+        retry_delay: Seconds to wait between attempts
+        input_text: Text to write to the command's stdin
+        capture_output: Capture stdout/stderr instead of inheriting them
+
+    Returns:
+        The completed process with decoded stdout and stderr
+
+    Raises:
+        FileNotFoundError: If the program is not installed
+        subprocess.CalledProcessError: If check is set and the command failed
+        subprocess.TimeoutExpired: If the final attempt timed out
+    """
+    attempt = 0
+    while True:
+        try:
+            async with _workers.get():
+                with span(Path(args[0]).name, "command", argv=list(args)) as details:
+                    result = await _run_once(args, timeout, input_text, capture_output)
+                    details["exit_code"] = result.returncode
+            if check and result.returncode != 0:
+                raise subprocess.CalledProcessError(
+                    result.returncode, result.args, result.stdout, result.stderr
+                )
+            return result
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+            if attempt >= retries:
+                raise
+            attempt += 1
+            await asyncio.sleep(retry_delay)
+
+
+__all__ = [
+    "DEFAULT_MAX_WORKERS",
+    "resolve_command",
+    "run_command",
+    "set_max_workers",
+]
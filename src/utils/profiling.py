@@ -0,0 +1,106 @@
+"""
+Per-module cProfile support for dotfiles setup.
+
+When profiling is enabled (``--profile``), each module runs under its own
+cProfile profiler and its stats are written to ``<module>.pstats``. At the
+end of the run the stats are merged into ``merged.pstats`` and the hottest
+functions are printed. Time spent waiting on child processes shows up in the
+event loop's selector (e.g. ``select.epoll.poll``), so the summary also tells
+Python work apart from waiting on external tools.
+
+cProfile profiles a whole thread, so modules are run one at a time while
+profiling; otherwise concurrently running modules would blur together.
+"""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pstats
+
+DEFAULT_TOP = 20
+
+# The profiler of this run, if profiling is enabled
+_profiler: "ModuleProfiler | None" = None
+
+
+class ModuleProfiler:
+    """Profiles modules one at a time and writes their stats to a directory."""
+
+    def __init__(self, output_dir: Path) -> None:
+        self.output_dir = output_dir
+        self.stats_files: list[Path] = []
+
+    @contextmanager
+    def profile(self, name: str) -> Iterator[None]:
+        """Profile the enclosed block, saving its stats as ``<name>.pstats``."""
+        # Every module run looks up profile(), so only --profile pays for these
+        import cProfile  # noqa: PLC0415
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            stats_file = self.output_dir / f"{name}.pstats"
+            profiler.dump_stats(stats_file)
+            self.stats_files.append(stats_file)
+
+    def merge(self) -> "pstats.Stats | None":
+        """Merge every module's stats, saving them as ``merged.pstats``."""
+        import pstats  # noqa: PLC0415
+
+        if not self.stats_files:
+            return None
+        stats = pstats.Stats(*(str(path) for path in self.stats_files))
+        stats.dump_stats(self.output_dir / "merged.pstats")
+        return stats
+
+    def print_summary(self, top: int = DEFAULT_TOP) -> None:
+        """Print the functions with the most time spent in them across all modules."""
+        stats = self.merge()
+        if stats is None:
+            return
+
+        print(f"\nTop {top} functions by own time (stats in {self.output_dir}):")
+        print(f"  {'own s':>8} {'cumul s':>8} {'calls':>8}  function")
+        entries = sorted(
+            stats.stats.items(),  # type: ignore[attr-defined]
+            key=lambda item: item[1][2],
+            reverse=True,
+        )
+        for (filename, line, function), (_, calls, own, cumulative, _) in entries[:top]:
+            location = function if filename == "~" else f"{Path(filename).name}:{line}({function})"
+            print(f"  {own:>8.3f} {cumulative:>8.3f} {calls:>8}  {location}")
+
+
+def enable_profiling(output_dir: Path) -> ModuleProfiler:
+    """Start profiling every module run for the rest of the run."""
+    # Modules are profiled where the scheduler runs them, far from where the
+    # option is parsed
+    global _profiler  # noqa: PLW0603
+    _profiler = ModuleProfiler(output_dir)
+    return _profiler
+
+
+@contextmanager
+def profile(name: str) -> Iterator[None]:
+    """Profile the enclosed block as module ``name`` if profiling is enabled."""
+    profiler = _profiler
+    if profiler is None:
+        yield
+        return
+    with profiler.profile(name):
+        yield
+
+
+__all__ = [
+    "DEFAULT_TOP",
+    "ModuleProfiler",
+    "enable_profiling",
+    "profile",
+]
@@ -0,0 +1,124 @@
+"""
+Static registry of setup modules.
+
+Describes every module (supported platforms, scheduling metadata and a short
+description) without importing its code, so listing modules and choosing
+the ones for a platform is instant. Module code is only imported when the
+module actually runs.
+"""
+
+from typing import NamedTuple
+
+# Platform keys, as returned by main.get_current_platform()
+PLATFORMS = ("darwin", "linux", "wsl", "windows")
+
+
+class ModuleInfo(NamedTuple):
+    """
+    Static metadata for a setup module in src/modules.
+
+    A NamedTuple rather than a dataclass: importing dataclasses (and with it
+    inspect) would roughly double the startup time of --list.
+    """
+
+    name: str
+    description: str
+    platforms: tuple[str, ...]
+    dependencies: tuple[str, ...] = ()
+    resources: tuple[str, ...] = ()
+
+
+# In the order modules run on each platform
+MODULES = (
+    ModuleInfo(
+        name="git",
+        description="Global git configuration",
+        platforms=("darwin", "linux", "wsl", "windows"),
+        resources=("~/.gitconfig", "~/.gitignore_global"),
+    ),
+    ModuleInfo(
+        name="zsh",
+        description="Zsh configuration file symlinks",
+        platforms=("darwin", "linux", "wsl"),
+        resources=("~/.zshrc", "~/.zsh_aliases"),
+    ),
+    ModuleInfo(
+        name="starship",
+        description="Starship prompt configuration",
+        platforms=("darwin", "linux", "wsl", "windows"),
+        resources=("~/.config/starship.toml",),
+    ),
+    ModuleInfo(
+        name="vscode",
+        description="VSCode settings and extensions",
+        # WSL: VSCode runs on Windows via Remote-WSL
+        platforms=("darwin", "linux", "windows"),
+        resources=("code", "vscode-settings"),
+    ),
+    ModuleInfo(
+        name="osx",
+        description="macOS system defaults (Dock, Finder, etc.)",
+        platforms=("darwin",),
+        resources=("defaults",),
+    ),
+    ModuleInfo(
+        name="terminal",
+        description="GNOME Terminal and Alacritty configuration",
+        # No GNOME desktop under WSL
+        platforms=("linux",),
+        resources=("gsettings", "~/.config/alacritty"),
+    ),
+    ModuleInfo(
+        name="mouse",
+        description="GNOME mouse settings",
+        platforms=("linux",),
+        resources=("gsettings",),
+    ),
+    ModuleInfo(
+        name="windows",
+        description="Windows Terminal settings, plus the git, starship and vscode setup",
+        platforms=("windows",),
+        dependencies=("git", "starship", "vscode"),
+        resources=("windows-terminal-settings",),
+    ),
+)
+
+_MODULES_BY_NAME = {module.name: module for module in MODULES}
+
+
+def get_module_info(name: str) -> ModuleInfo | None:
+    """Get a module's metadata, or None if there is no such module."""
+    return _MODULES_BY_NAME.get(name)
+
+
+def get_dependencies(name: str) -> list[str]:
+    """Get every module a module depends on, directly or not, dependencies first."""
+    dependencies: list[str] = []
+
+    def visit(module_name: str) -> None:
+        info = _MODULES_BY_NAME.get(module_name)
+        for dependency in info.dependencies if info is not None else ():
+            if dependency not in dependencies:
+                visit(dependency)
+                dependencies.append(dependency)
+
+    visit(name)
+    return dependencies
+
+
+def get_platform_modules() -> dict[str, list[str]]:
+    """Get the modules that run on each platform, in run order."""
+    return {
+        platform: [module.name for module in MODULES if platform in module.platforms]
+        for platform in PLATFORMS
+    }
+
+
+__all__ = [
+    "MODULES",
+    "PLATFORMS",
+    "ModuleInfo",
+    "get_dependencies",
+    "get_module_info",
+    "get_platform_modules",
+]
@@ -0,0 +1,252 @@
+"""
+Dependency-aware concurrent scheduler for setup modules.
+
+Modules declare the modules they depend on and the resources they touch
+(files under the home directory, external tools such as gsettings).
+Independent modules run concurrently, bounded by a job limit, while modules
+that share a resource or depend on each other are serialised. A module
+starts once its dependencies have finished, whether or not they succeeded.
+
+When a job slot frees up, the waiting module on the longest remaining chain
+of work goes first: its critical path is its expected duration (learned from
+previous runs) plus the longest critical path among the modules depending on
+it. Slow, widely depended-on modules therefore start early and the total run
+time approaches the critical path rather than depending on list order.
+"""
+
+import asyncio
+import heapq
+import time
+from collections.abc import Awaitable, Callable, Iterable, Mapping
+from dataclasses import dataclass, field
+
+# Expected duration of a module that has never run, in seconds
+DEFAULT_DURATION = 1.0
+
+
+@dataclass
+class ModuleSpec:
+    """Scheduling metadata for a single module."""
+
+    name: str
+    dependencies: list[str] = field(default_factory=list)
+    resources: list[str] = field(default_factory=list)
+
+
+@dataclass
+class ModuleResult:
+    """Outcome of running a single module."""
+
+    name: str
+    success: bool
+    duration: float = 0.0
+
+
+def topological_order(specs: Iterable[ModuleSpec]) -> list[str]:
+    """
+    Order modules so that every module comes after its dependencies.
+
+    Dependencies that are not part of the run are ignored. The original
+    order is preserved wherever the dependency graph allows it.
+
+    Raises:
+        ValueError: If the dependencies contain a cycle
+    """
+    spec_map = {spec.name: spec for spec in specs}
+    order: list[str] = []
+    state: dict[str, str] = {}
+
+    def visit(name: str, chain: list[str]) -> None:
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            cycle = " -> ".join([*chain, name])
+            raise ValueError(f"Module dependency cycle detected: {cycle}")
+
+        state[name] = "visiting"
+        for dependency in spec_map[name].dependencies:
+            if dependency in spec_map:
+                visit(dependency, [*chain, name])
+        state[name] = "done"
+        order.append(name)
+
+    for name in spec_map:
+        visit(name, [])
+
+    return order
+
+
+def critical_paths(
+    specs: Iterable[ModuleSpec], durations: Mapping[str, float] | None = None
+) -> dict[str, float]:
+    """
+    Get the critical path of each module: the expected time from starting it
+    until every module that (transitively) depends on it has finished.
+
+    Modules without a recorded duration are expected to take DEFAULT_DURATION.
+
+    Args:
+        specs: The modules in the run
+        durations: Expected duration of each module in seconds
+
+    Raises:
+        ValueError: If the dependencies contain a cycle
+    """
+    specs = list(specs)
+    durations = durations or {}
+    dependents: dict[str, list[str]] = {spec.name: [] for spec in specs}
+    for spec in specs:
+        for dependency in spec.dependencies:
+            if dependency in dependents:
+                dependents[dependency].append(spec.name)
+
+    paths: dict[str, float] = {}
+    # Dependents come later in topological order, so walk it backwards
+    for name in reversed(topological_order(specs)):
+        longest_dependent = max((paths[dependent] for dependent in dependents[name]), default=0.0)
+        paths[name] = durations.get(name, DEFAULT_DURATION) + longest_dependent
+    return paths
+
+
+def count_dependents(specs: Iterable[ModuleSpec]) -> dict[str, int]:
+    """Count the modules in the run that depend on each module, directly or not."""
+    spec_map = {spec.name: spec for spec in specs}
+    ancestors: dict[str, set[str]] = {}
+    for name in topological_order(spec_map.values()):
+        ancestors[name] = set()
+        for dependency in spec_map[name].dependencies:
+            if dependency in spec_map:
+                ancestors[name] |= ancestors[dependency] | {dependency}
+
+    counts = dict.fromkeys(spec_map, 0)
+    for name_ancestors in ancestors.values():
+        for ancestor in name_ancestors:
+            counts[ancestor] += 1
+    return counts
+
+
+class PrioritySlots:
+    """A job limit that hands free slots to the highest priority waiter first."""
+
+    def __init__(self, jobs: int) -> None:
+        self.free = max(1, jobs)
+        self._waiters: list[tuple[tuple[float, ...], int, asyncio.Future[None]]] = []
+        self._counter = 0
+
+    async def acquire(self, priority: tuple[float, ...]) -> None:
+        """Wait for a slot; lower priority values are served first."""
+        if self.free and not self._waiters:
+            self.free -= 1
+            return
+
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._counter += 1
+        entry = (priority, self._counter, waiter)
+        heapq.heappush(self._waiters, entry)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before cancelling, so pass it on
+                self.release()
+            else:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            raise
+
+    def release(self) -> None:
+        """Give the slot to the next waiter, or free it."""
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.free += 1
+
+
+async def run_scheduled(
+    specs: list[ModuleSpec],
+    runner: Callable[[str], Awaitable[bool]],
+    jobs: int = 1,
+    durations: Mapping[str, float] | None = None,
+) -> list[ModuleResult]:
+    """
+    Run modules concurrently while respecting dependencies and resources.
+
+    Args:
+        specs: The modules to run, in their preferred order
+        runner: Coroutine function that runs a module and returns success
+        jobs: Maximum number of modules running at the same time
+        durations: Expected duration of each module, from previous runs;
+            modules on the longest critical path are started first
+
+    Returns:
+        One result per module, in dependency order
+    """
+    order = topological_order(specs)
+    spec_map = {spec.name: spec for spec in specs}
+
+    paths = critical_paths(specs, durations)
+    dependents = count_dependents(specs)
+    # Longest critical path first, then most dependents, then the preferred order
+    priorities = {
+        name: (-paths[name], -dependents[name], float(index)) for index, name in enumerate(spec_map)
+    }
+
+    slots = PrioritySlots(jobs)
+    resource_locks: dict[str, asyncio.Lock] = {}
+    for spec in specs:
+        for resource in spec.resources:
+            resource_locks.setdefault(resource, asyncio.Lock())
+
+    tasks: dict[str, asyncio.Task[ModuleResult]] = {}
+
+    async def run_one(name: str) -> ModuleResult:
+        spec = spec_map[name]
+
+        # Dependencies only order modules: a module still runs after one of
+        # its dependencies failed, e.g. Windows Terminal after an extension
+        for dependency in spec.dependencies:
+            if dependency in tasks:
+                await tasks[dependency]
+
+        # Locks are always taken in sorted order so two modules sharing
+        # several resources can never deadlock each other.
+        held: list[asyncio.Lock] = []
+        try:
+            for resource in sorted(set(spec.resources)):
+                lock = resource_locks[resource]
+                await lock.acquire()
+                held.append(lock)
+
+            await slots.acquire(priorities[name])
+            try:
+                start = time.perf_counter()
+                success = await runner(name)
+                return ModuleResult(
+                    name=name, success=success, duration=time.perf_counter() - start
+                )
+            finally:
+                slots.release()
+        finally:
+            for lock in reversed(held):
+                lock.release()
+
+    # Ready modules reach the job limit in creation order, so create the
+    # tasks by priority; those that wait are then served by priority too
+    for name in sorted(order, key=priorities.__getitem__):
+        tasks[name] = asyncio.create_task(run_one(name), name=f"module:{name}")
+
+    return list(await asyncio.gather(*(tasks[name] for name in order)))
+
+
+__all__ = [
+    "DEFAULT_DURATION",
+    "ModuleResult",
+    "ModuleSpec",
+    "PrioritySlots",
+    "count_dependents",
+    "critical_paths",
+    "run_scheduled",
+    "topological_order",
+]
@@ -0,0 +1,200 @@
+"""
+Per-host state manifest for dotfiles setup.
+
+Records a fingerprint of each applied action's inputs together with a cheap
+signature (lstat/readlink) of the files it produced, taken when the manifest
+is saved at the end of the run. On the next run an action whose inputs and
+on-disk result are both unchanged can be skipped without spawning any
+processes or reading external state.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import socket
+import stat
+import sys
+import time
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+from .file_ops import PathLike, atomic_write
+
+MANIFEST_VERSION = 1
+
+Probe = list[Any]
+
+
+def get_state_dir() -> Path:
+    """Get the dotfiles state directory, honouring XDG_STATE_HOME."""
+    state_home = os.environ.get("XDG_STATE_HOME") or str(Path.home() / ".local" / "state")
+    return Path(state_home) / "dotfiles"
+
+
+def get_history_path() -> Path:
+    """Get the run history database for this user (see history.py)."""
+    return get_state_dir() / "history.sqlite3"
+
+
+@functools.cache
+def module_digest(module_name: str) -> str:
+    """Hash the source of a module so edits to it invalidate its actions."""
+    module = sys.modules.get(module_name)
+    source = getattr(module, "__file__", None)
+    if not source:
+        return ""
+    try:
+        return hashlib.sha256(Path(source).read_bytes()).hexdigest()
+    except OSError:
+        return ""
+
+
+def file_digest(path: PathLike) -> str:
+    """Hash the contents of a file, or return an empty string if unreadable."""
+    try:
+        return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+    except OSError:
+        return ""
+
+
+def fingerprint(module_name: str, *inputs: Any) -> str:
+    """
+    Fingerprint the inputs of an action.
+
+    Args:
+        module_name: The module producing the action, whose source is hashed
+        inputs: JSON-serialisable desired values, paths, config hashes...
+    """
+    payload = json.dumps(
+        [MANIFEST_VERSION, module_digest(module_name), *inputs], sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def probe(paths: Sequence[PathLike]) -> Probe:
+    """
+    Take a cheap signature of the on-disk state of some paths.
+
+    Uses lstat (and readlink for symlinks) only, so it never follows links or
+    reads file contents.
+    """
+    signature: Probe = []
+    for path in map(Path, paths):
+        try:
+            path_stat = path.lstat()
+        except OSError:
+            signature.append(None)
+            continue
+
+        entry: list[Any] = [
+            path_stat.st_mode,
+            path_stat.st_size,
+            path_stat.st_mtime_ns,
+            path_stat.st_ino,
+        ]
+        if stat.S_ISLNK(path_stat.st_mode):
+            entry.append(str(path.readlink()))
+        signature.append(entry)
+    return signature
+
+
+class StateManifest:
+    """Fingerprints and outcomes of previously applied actions."""
+
+    def __init__(self, path: PathLike) -> None:
+        self.path = Path(path)
+        self.force = False
+        self.dirty = False
+        self.entries: dict[str, dict[str, Any]] = {}
+        self._pending: dict[str, list[PathLike]] = {}
+        self.load()
+
+    def load(self) -> None:
+        """Load the manifest from disk, starting empty if it is missing or stale."""
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+
+        if data.get("version") == MANIFEST_VERSION:
+            self.entries = data.get("entries", {})
+
+    def save(self) -> None:
+        """
+        Atomically write the manifest if anything was recorded.
+
+        Recorded paths are probed now rather than when recorded, so several
+        actions writing to the same file (e.g. the dconf database) all see
+        its final state for this run.
+        """
+        if not self.dirty:
+            return
+
+        for key, paths in self._pending.items():
+            if key in self.entries:
+                self.entries[key]["probe"] = probe(paths)
+        self._pending.clear()
+
+        atomic_write(self.path, json.dumps({"version": MANIFEST_VERSION, "entries": self.entries}))
+        self.dirty = False
+
+    def is_current(self, key: str, action_fingerprint: str, paths: Sequence[PathLike]) -> bool:
+        """
+        Check whether an action was applied with the same inputs and its
+        result on disk is untouched since.
+        """
+        if self.force:
+            return False
+
+        entry = self.entries.get(key)
+        if entry is None or entry.get("fingerprint") != action_fingerprint:
+            return False
+        if entry.get("outcome") not in ("applied", "unchanged"):
+            return False
+
+        # Round-trip through JSON so tuples and lists compare equal
+        return bool(entry.get("probe") == json.loads(json.dumps(probe(paths))))
+
+    def record(
+        self,
+        key: str,
+        action_fingerprint: str,
+        paths: Sequence[PathLike],
+        outcome: str = "applied",
+    ) -> None:
+        """Record the outcome of an action; its paths are probed on save."""
+        self.entries[key] = {
+            "fingerprint": action_fingerprint,
+            "probe": None,
+            "outcome": outcome,
+            "time": time.time(),
+        }
+        self._pending[key] = list(paths)
+        self.dirty = True
+
+    def forget(self, key: str) -> None:
+        """Drop a recorded action so it is re-applied next run."""
+        self._pending.pop(key, None)
+        if self.entries.pop(key, None) is not None:
+            self.dirty = True
+
+
+@functools.cache
+def get_manifest() -> StateManifest:
+    """Get the manifest for this host, loading it on first use."""
+    hostname = socket.gethostname() or "localhost"
+    return StateManifest(get_state_dir() / f"manifest-{hostname}.json")
+
+
+__all__ = [
+    "StateManifest",
+    "file_digest",
+    "fingerprint",
+    "get_history_path",
+    "get_manifest",
+    "get_state_dir",
+    "module_digest",
+    "probe",
+]
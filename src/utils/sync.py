@@ -0,0 +1,187 @@
+"""
+Incremental copy-sync for when config files cannot be symlinked.
+
+Windows only lets administrators and developer-mode users create symlinks,
+so there config files are copied instead. Rather than deleting and
+re-copying the whole target every run, the sync compares each file's size
+and modification time (and, optionally, a content hash), copies only the
+files that differ and removes files that no longer exist in the source.
+
+Copy mode can be forced on any platform (``--copy``, or
+``DOTFILES_LINK_MODE=copy``) to exercise and benchmark the engine; setting
+``DOTFILES_SYNC_CHECKSUM=1`` (``--checksum``) also compares file contents.
+"""
+
+import hashlib
+import os
+import stat
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .trace import span
+
+LINK_MODE_VARIABLE = "DOTFILES_LINK_MODE"
+CHECKSUM_VARIABLE = "DOTFILES_SYNC_CHECKSUM"
+
+
+@dataclass
+class SyncReport:
+    """What a sync copied, removed and left alone."""
+
+    copied: list[Path] = field(default_factory=list)
+    removed: list[Path] = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def changed(self) -> bool:
+        """Whether the sync changed anything."""
+        return bool(self.copied or self.removed)
+
+
+def copy_mode() -> bool:
+    """Whether config files are copied instead of symlinked on every platform."""
+    return os.environ.get(LINK_MODE_VARIABLE, "").lower() == "copy"
+
+
+def checksum_enabled() -> bool:
+    """Whether syncs compare file contents as well as size and mtime."""
+    return os.environ.get(CHECKSUM_VARIABLE, "") not in ("", "0")
+
+
+def file_hash(path: Path) -> str:
+    """Hash a file's contents."""
+    with path.open("rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def same_file(source: Path, source_stat: os.stat_result, destination: Path, checksum: bool) -> bool:
+    """Check whether destination is an up to date copy of source."""
+    try:
+        destination_stat = destination.lstat()
+    except OSError:
+        return False
+    if not stat.S_ISREG(destination_stat.st_mode):
+        return False
+    if destination_stat.st_size != source_stat.st_size:
+        return False
+    # copy2 carries the modification time over, so a match means no edits since
+    if destination_stat.st_mtime_ns != source_stat.st_mtime_ns:
+        return False
+    return not checksum or file_hash(source) == file_hash(destination)
+
+
+def tree_paths(path: Path) -> list[Path]:
+    """List a path and, for a directory, everything under it."""
+    paths = [path]
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    paths.extend(tree_paths(Path(entry.path)))
+                else:
+                    paths.append(Path(entry.path))
+    except (FileNotFoundError, NotADirectoryError):
+        pass
+    return paths
+
+
+def _copy_file(source: Path, destination: Path) -> None:
+    """Copy a file with its metadata, replacing destination atomically."""
+    import shutil  # noqa: PLC0415
+
+    temp_path = destination.with_name(f".{destination.name}.dotfiles-{os.getpid()}")
+    try:
+        shutil.copy2(source, temp_path)
+        temp_path.replace(destination)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+def _remove(path: Path) -> None:
+    """Remove a file, symlink or directory tree."""
+    if path.is_dir() and not path.is_symlink():
+        import shutil  # noqa: PLC0415
+
+        shutil.rmtree(path)
+    else:
+        path.unlink()
+
+
+def _sync(
+    source: Path, destination: Path, checksum: bool, report: SyncReport, dry_run: bool
+) -> None:
+    """Sync one file or directory into destination, recording what changed."""
+    source_stat = source.stat()
+
+    if not stat.S_ISDIR(source_stat.st_mode):
+        if same_file(source, source_stat, destination, checksum):
+            report.unchanged += 1
+            return
+        report.copied.append(destination)
+        if not dry_run:
+            if destination.is_dir() and not destination.is_symlink():
+                _remove(destination)
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            _copy_file(source, destination)
+        return
+
+    if destination.is_symlink() or (destination.exists() and not destination.is_dir()):
+        report.removed.append(destination)
+        if not dry_run:
+            destination.unlink()
+    if not dry_run:
+        destination.mkdir(parents=True, exist_ok=True)
+
+    wanted = set()
+    with os.scandir(source) as entries:
+        for entry in entries:
+            wanted.add(entry.name)
+            _sync(Path(entry.path), destination / entry.name, checksum, report, dry_run)
+
+    try:
+        with os.scandir(destination) as entries:
+            stale = [Path(entry.path) for entry in entries if entry.name not in wanted]
+    except FileNotFoundError:
+        # Only in a dry run, where the directory was never created
+        stale = []
+    for path in stale:
+        report.removed.append(path)
+        if not dry_run:
+            _remove(path)
+
+
+def sync_tree(
+    source: Path, destination: Path, checksum: bool | None = None, dry_run: bool = False
+) -> SyncReport:
+    """
+    Make destination an up to date copy of a source file or directory.
+
+    Args:
+        source: The file or directory to copy
+        destination: Where the copy lives
+        checksum: Also compare contents, defaulting to checksum_enabled()
+        dry_run: Only report what would be copied and removed
+
+    Returns:
+        The files copied and removed, and how many were already up to date
+    """
+    checksum = checksum_enabled() if checksum is None else checksum
+    report = SyncReport()
+    with span("sync_tree", "file", path=str(destination), source=str(source)) as details:
+        _sync(source, destination, checksum, report, dry_run)
+        details.update(copied=len(report.copied), removed=len(report.removed))
+    return report
+
+
+__all__ = [
+    "CHECKSUM_VARIABLE",
+    "LINK_MODE_VARIABLE",
+    "SyncReport",
+    "checksum_enabled",
+    "copy_mode",
+    "file_hash",
+    "same_file",
+    "sync_tree",
+    "tree_paths",
+]
@@ -0,0 +1,311 @@
+"""
+Apply plans to other home directories and root filesystems.
+
+With ``--home DIR`` or ``--root DIR`` the plans are built once, for the
+invoking user, and then relocated to each target and applied there in a
+separate process, so many user accounts or container rootfs trees are
+provisioned in parallel:
+
+- ``--home DIR`` treats DIR as another user's home directory: paths under
+  the invoking user's home are moved to DIR, including home paths in config
+  values (e.g. git's ``core.excludesfile``).
+- ``--root DIR`` treats DIR as a root filesystem: every managed path is
+  placed inside DIR, while values keep the paths the system will see at
+  runtime. Symlinks still point at this repo's config files, so the repo
+  must be at the same path inside the image.
+- ``--export-tar FILE`` also stages a root filesystem, but moves the
+  invoking user's home and the repo to fixed paths, so the archive does not
+  depend on who built it or where the repo is checked out.
+
+Only file-based actions (symlinks, directories, files and git config) can be
+relocated. Actions that talk to the invoking user's session, such as GNOME
+settings, macOS defaults and VSCode extensions, are reported as unavailable.
+
+When root provisions another user's home, everything it creates there is
+handed over to the owner of that home.
+"""
+
+import asyncio
+import contextlib
+import importlib
+import io
+import os
+import shutil
+import socket
+from abc import ABC, abstractmethod
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+
+from .plan import Action, Plan, PlanResult, apply_plan
+from .state import StateManifest, get_state_dir
+from .sync import tree_paths
+
+# Variables pointing at the invoking user's files, cleared for targets
+USER_ENVIRONMENT = (
+    "XDG_CONFIG_HOME",
+    "XDG_STATE_HOME",
+    "XDG_CACHE_HOME",
+    "GIT_CONFIG_GLOBAL",
+    "USERPROFILE",
+)
+
+
+@dataclass(frozen=True)
+class Target(ABC):
+    """Somewhere other than the invoking user's home to apply plans to."""
+
+    path: Path
+    planned_home: Path
+
+    @property
+    @abstractmethod
+    def home(self) -> Path:
+        """The home directory of the target."""
+
+    @abstractmethod
+    def place(self, path: Path) -> Path | None:
+        """Get where a managed path goes in the target, or None if it doesn't belong there."""
+
+    def rewrite(self, text: str) -> str:
+        """Rewrite a config value that may contain a path, as the target sees it."""
+        return text
+
+    def link(self, source: Path) -> Path:
+        """Get what a symlink to a repo config file points at in the target."""
+        return source
+
+    def owner(self) -> tuple[int, int] | None:
+        """
+        Get the uid and gid that created files must be given, if not our own.
+
+        Raises:
+            PermissionError: If the files would end up owned by the wrong user
+        """
+        return None
+
+
+@dataclass(frozen=True)
+class HomeTarget(Target):
+    """Another user's home directory."""
+
+    @property
+    def home(self) -> Path:
+        return self.path
+
+    def place(self, path: Path) -> Path | None:
+        if not path.is_relative_to(self.planned_home):
+            # e.g. a git config file chosen with GIT_CONFIG_GLOBAL
+            return None
+        return self.path / path.relative_to(self.planned_home)
+
+    def rewrite(self, text: str) -> str:
+        home = str(self.planned_home)
+        if text == home or text.startswith(home + os.sep):
+            return str(self.path) + text[len(home) :]
+        return text
+
+    def owner(self) -> tuple[int, int] | None:
+        if not hasattr(os, "geteuid"):
+            return None
+        try:
+            home_stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+
+        user = os.geteuid()
+        if home_stat.st_uid == user:
+            return None
+        if user != 0:
+            raise PermissionError(
+                f"{self.path} belongs to another user; run as root or as its owner"
+            )
+        return home_stat.st_uid, home_stat.st_gid
+
+
+@dataclass(frozen=True)
+class RootTarget(Target):
+    """A root filesystem tree, e.g. a container image being built."""
+
+    # (from, to) pairs of directories that are somewhere else in the image,
+    # checked in order, e.g. the builder's home moved to a fixed path
+    moves: tuple[tuple[Path, Path], ...] = ()
+
+    def runtime_path(self, path: Path) -> Path:
+        """Get where a path is when the root filesystem is in use."""
+        for source, destination in self.moves:
+            if path.is_relative_to(source):
+                return destination / path.relative_to(source)
+        return path
+
+    @property
+    def home(self) -> Path:
+        home = self.runtime_path(self.planned_home)
+        return self.path / home.relative_to(home.anchor)
+
+    def place(self, path: Path) -> Path | None:
+        path = self.runtime_path(path)
+        return self.path / path.relative_to(path.anchor)
+
+    def rewrite(self, text: str) -> str:
+        for source, destination in self.moves:
+            prefix = str(source)
+            if text == prefix or text.startswith(prefix + os.sep):
+                return str(destination) + text[len(prefix) :]
+        return text
+
+    def link(self, source: Path) -> Path:
+        return self.runtime_path(source.resolve())
+
+
+def relocate_plan(plan: Plan, target: Target) -> tuple[Plan, list[Action]]:
+    """
+    Relocate a plan to a target.
+
+    Returns:
+        The relocated plan, and the actions that cannot be applied to the target
+    """
+    relocated = Plan(module=plan.module)
+    unsupported = []
+    for action in plan.actions:
+        moved = action.relocate(target)
+        if moved is None:
+            unsupported.append(action)
+        else:
+            relocated.add(moved)
+    return relocated, unsupported
+
+
+def stage_sources(plans: list[Plan], target: Target) -> int:
+    """
+    Copy the repo config files that symlinks point at into a target.
+
+    They are placed at the same path they have in the repo, so the links in a
+    root filesystem resolve without the repo being there.
+
+    Returns:
+        The number of files and directories copied
+    """
+    copied = 0
+    for plan in plans:
+        for action in plan.actions:
+            source = getattr(action, "source", None)
+            if not isinstance(source, Path):
+                continue
+            source = source.resolve()
+            destination = target.place(source)
+            if destination is None or destination.exists():
+                continue
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            if source.is_dir():
+                shutil.copytree(source, destination, symlinks=True)
+            else:
+                shutil.copy2(source, destination)
+            copied += 1
+    return copied
+
+
+def hand_over(target: Target, paths: Iterable[Path], owner: tuple[int, int]) -> int:
+    """
+    Give paths created in a target to its owner.
+
+    Parent directories created inside the target and the contents of copied
+    directories are included. Only paths we own are changed, so files that
+    were there before keep their owner.
+
+    Returns:
+        The number of paths handed over
+    """
+    candidates: set[Path] = set()
+    for path in paths:
+        # Never descend through a link, which may point back into the repo
+        candidates.update([path] if path.is_symlink() else tree_paths(path))
+        candidates.update(parent for parent in path.parents if parent.is_relative_to(target.path))
+
+    user = os.geteuid()
+    handed = 0
+    for path in sorted(candidates):
+        try:
+            if path.lstat().st_uid != user:
+                continue
+            os.lchown(path, *owner)
+        except FileNotFoundError:
+            continue
+        handed += 1
+    return handed
+
+
+async def _apply_plans(
+    target: Target, plans: list[Plan], dry_run: bool, force: bool, record_state: bool
+) -> dict[str, PlanResult]:
+    """Apply relocated plans, using a manifest inside the target."""
+    owner = None if dry_run else target.owner()
+    hostname = socket.gethostname() or "localhost"
+    manifest = StateManifest(get_state_dir() / f"manifest-{hostname}.json")
+    manifest.force = force
+    results = {}
+    written: list[Path] = []
+    for plan in plans:
+        # Imported so edits to the module invalidate its actions in the manifest
+        importlib.import_module(plan.module)
+        relocated, unsupported = relocate_plan(plan, target)
+        result = await apply_plan(relocated, dry_run, manifest=manifest)
+        result.unavailable.extend(unsupported)
+        results[plan.module] = result
+        written.extend(
+            path
+            for action in result.changed
+            if isinstance(path := getattr(action, "path", None), Path)
+        )
+
+    if record_state and not dry_run:
+        manifest.save()
+        written.append(manifest.path)
+    if owner is not None:
+        hand_over(target, written, owner)
+    return results
+
+
+def apply_to_target(
+    target: Target,
+    plans: list[Plan],
+    dry_run: bool = False,
+    force: bool = False,
+    record_state: bool = True,
+) -> tuple[str, dict[str, PlanResult]]:
+    """
+    Apply plans to a target; runs in a worker process.
+
+    The worker's HOME is the target's home, so state and config lookups
+    resolve inside the target.
+
+    Args:
+        target: Where to apply the plans
+        plans: The plans, as built for the invoking user
+        dry_run: Only report what would change
+        force: Ignore the target's state manifest
+        record_state: Save the target's state manifest; off for staging
+            roots, whose contents must not depend on when they were built
+
+    Returns:
+        The output printed while applying, and the result of each plan
+    """
+    os.environ["HOME"] = str(target.home)
+    for variable in USER_ENVIRONMENT:
+        os.environ.pop(variable, None)
+
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        results = asyncio.run(_apply_plans(target, plans, dry_run, force, record_state))
+    return output.getvalue(), results
+
+
+__all__ = [
+    "HomeTarget",
+    "RootTarget",
+    "Target",
+    "apply_to_target",
+    "hand_over",
+    "relocate_plan",
+    "stage_sources",
+]
@@ -0,0 +1,136 @@
+"""
+Chrome trace-event recording for dotfiles setup.
+
+When tracing is enabled (``--trace FILE``), spans are recorded for every
+module, file operation and external command, and written as Chrome
+trace-event JSON that can be opened in chrome://tracing or Perfetto. Each
+module gets its own track (a trace "thread"), so modules running
+concurrently show up side by side. With tracing disabled, ``span`` does no
+work beyond a global lookup.
+"""
+
+import contextvars
+import json
+import os
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+# The tracer of this run, if tracing is enabled
+_tracer: "Tracer | None" = None
+
+# Track of the module running in the current task; 0 is the main track
+_track: contextvars.ContextVar[int] = contextvars.ContextVar("dotfiles_trace_track", default=0)
+
+
+class Tracer:
+    """Collects completed spans as Chrome trace events."""
+
+    def __init__(self) -> None:
+        self.events: list[dict[str, Any]] = []
+        self.pid = os.getpid()
+        self.tracks = ["main"]
+        self._start = time.perf_counter_ns()
+
+    def now(self) -> float:
+        """Microseconds since tracing started."""
+        return (time.perf_counter_ns() - self._start) / 1000
+
+    def new_track(self, name: str) -> int:
+        """Start a new named track, returning its id."""
+        self.tracks.append(name)
+        return len(self.tracks) - 1
+
+    def add_span(
+        self, name: str, category: str, start: float, track: int, args: dict[str, Any]
+    ) -> None:
+        """Record a span that started at ``start`` and ends now."""
+        self.events.append(
+            {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": round(start, 3),
+                "dur": round(self.now() - start, 3),
+                "pid": self.pid,
+                "tid": track,
+                "args": args,
+            }
+        )
+
+    def to_json(self) -> dict[str, Any]:
+        """Get the trace in Chrome trace-event format."""
+        metadata = [
+            {"name": "process_name", "ph": "M", "pid": self.pid, "args": {"name": "dotfiles"}}
+        ]
+        metadata.extend(
+            {"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": track}}
+            for tid, track in enumerate(self.tracks)
+        )
+        return {"traceEvents": metadata + self.events, "displayTimeUnit": "ms"}
+
+    def write(self, path: str | Path) -> None:
+        """Atomically write the trace to a file."""
+        # file_ops records spans itself, so it imports this module
+        from .file_ops import atomic_write  # noqa: PLC0415
+
+        atomic_write(path, json.dumps(self.to_json()))
+
+
+def enable_tracing() -> Tracer:
+    """Start recording spans for the rest of the run."""
+    # span() wraps every file operation, so the tracer is looked up rather
+    # than passed down through every call
+    global _tracer  # noqa: PLW0603
+    _tracer = Tracer()
+    return _tracer
+
+
+def get_tracer() -> Tracer | None:
+    """Get the active tracer, or None if tracing is disabled."""
+    return _tracer
+
+
+@contextmanager
+def span(
+    name: str, category: str, *, track: str | None = None, **args: Any
+) -> Iterator[dict[str, Any]]:
+    """
+    Record the enclosed block as a span.
+
+    Args:
+        name: The span name shown in the trace viewer
+        category: The span category, e.g. "module", "file" or "command"
+        track: Put this span, and everything inside it, on a new named track
+        args: Details shown for the span; the yielded dict can be updated
+            with more (e.g. an exit code) before the block ends
+
+    Yields:
+        The span's args
+    """
+    tracer = _tracer
+    if tracer is None:
+        yield args
+        return
+
+    token = _track.set(tracer.new_track(track)) if track is not None else None
+    start = tracer.now()
+    try:
+        yield args
+    except BaseException as e:
+        args.setdefault("error", f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        tracer.add_span(name, category, start, _track.get(), args)
+        if token is not None:
+            _track.reset(token)
+
+
+__all__ = [
+    "Tracer",
+    "enable_tracing",
+    "get_tracer",
+    "span",
+]
@@ -0,0 +1,222 @@
+"""
+Local VSIX cache for VSCode extensions.
+
+Extensions are stored as ``publisher.name@version.vsix`` files in a cache
+directory so that re-provisioning installs from local disk instead of the
+marketplace. The cache can be pre-seeded from the marketplace or from
+existing .vsix files, e.g. when baking images on an isolated network.
+"""
+
+import asyncio
+import io
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .file_ops import PathLike, atomic_write
+
+MARKETPLACE_URL = (
+    "https://marketplace.visualstudio.com/_apis/public/gallery/publishers/"
+    "{publisher}/vsextensions/{name}/{version}/vspackage"
+)
+
+DOWNLOAD_TIMEOUT = 60
+
+# Limit parallel marketplace downloads so we don't get rate limited
+MAX_PARALLEL_DOWNLOADS = 4
+
+
+@dataclass
+class CacheReport:
+    """Cache hits and misses for a set of extensions."""
+
+    hits: list[str] = field(default_factory=list)
+    misses: list[str] = field(default_factory=list)
+
+    def summary(self) -> str:
+        """Get a one line summary of the report."""
+        return f"VSIX cache: {len(self.hits)} hits, {len(self.misses)} misses"
+
+
+def get_cache_dir() -> Path:
+    """Get the VSIX cache directory, honouring DOTFILES_VSIX_CACHE."""
+    override = os.environ.get("DOTFILES_VSIX_CACHE")
+    if override:
+        return Path(override).expanduser()
+
+    cache_home = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(cache_home) / "dotfiles" / "vsix"
+
+
+def _version_key(version: str) -> tuple[tuple[int, str], ...]:
+    """Sort key that orders numeric version parts numerically."""
+    return tuple((int(part), "") if part.isdigit() else (-1, part) for part in version.split("."))
+
+
+def find_cached(extension_id: str, cache_dir: PathLike | None = None) -> Path | None:
+    """
+    Find the newest cached VSIX for an extension.
+
+    Args:
+        extension_id: The extension id, e.g. "esbenp.prettier-vscode"
+        cache_dir: The cache directory, defaulting to get_cache_dir()
+
+    Returns:
+        The path to the cached VSIX, or None on a cache miss
+    """
+    cache_dir = Path(cache_dir) if cache_dir is not None else get_cache_dir()
+    prefix = f"{extension_id.lower()}@"
+    try:
+        with os.scandir(cache_dir) as entries:
+            candidates = [
+                entry
+                for entry in entries
+                if entry.name.startswith(prefix) and entry.name.endswith(".vsix")
+            ]
+    except OSError:
+        # Missing, not a directory or unreadable: install from the marketplace
+        return None
+
+    if not candidates:
+        return None
+
+    newest = max(candidates, key=lambda entry: _version_key(entry.name[len(prefix) : -5]))
+    return Path(newest.path)
+
+
+def read_vsix_identity(data: bytes) -> tuple[str, str]:
+    """
+    Read the extension id and version from VSIX package contents.
+
+    Raises:
+        ValueError: If the data is not a valid VSIX package
+    """
+    # Only needed on a cache miss or when seeding, so not imported at startup
+    import zipfile  # noqa: PLC0415
+
+    try:
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            manifest = json.loads(archive.read("extension/package.json"))
+    except (zipfile.BadZipFile, KeyError, json.JSONDecodeError) as e:
+        raise ValueError(f"Not a valid VSIX package: {e}") from e
+
+    publisher = manifest.get("publisher")
+    name = manifest.get("name")
+    version = manifest.get("version")
+    if not (publisher and name and version):
+        raise ValueError("VSIX package.json is missing publisher, name or version")
+    return f"{publisher}.{name}".lower(), str(version)
+
+
+def store(data: bytes, cache_dir: PathLike | None = None) -> Path:
+    """
+    Store VSIX contents in the cache under their content address.
+
+    Returns:
+        The path of the cached ``publisher.name@version.vsix`` file
+    """
+    cache_dir = Path(cache_dir) if cache_dir is not None else get_cache_dir()
+    extension_id, version = read_vsix_identity(data)
+    target = cache_dir / f"{extension_id}@{version}.vsix"
+    # The temporary file's name does not end in .vsix, so lookups never see it
+    atomic_write(target, data)
+    return target
+
+
+def _download(extension_id: str, version: str) -> bytes:
+    """Download a VSIX package from the marketplace."""
+    import gzip  # noqa: PLC0415
+    import urllib.request  # noqa: PLC0415
+
+    publisher, _, name = extension_id.partition(".")
+    url = MARKETPLACE_URL.format(publisher=publisher, name=name, version=version)
+    request = urllib.request.Request(url, headers={"User-Agent": "dotfiles-setup"})
+    with urllib.request.urlopen(request, timeout=DOWNLOAD_TIMEOUT) as response:
+        data: bytes = response.read()
+
+    # The marketplace serves packages gzip encoded regardless of Accept-Encoding
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+    return data
+
+
+async def fetch(
+    extension_id: str, version: str = "latest", cache_dir: PathLike | None = None
+) -> Path:
+    """
+    Download an extension from the marketplace into the cache.
+
+    Raises:
+        OSError: If the download fails
+        ValueError: If the download is not a valid VSIX package
+    """
+    data = await asyncio.to_thread(_download, extension_id, version)
+    return store(data, cache_dir)
+
+
+async def populate(
+    extension_ids: list[str], cache_dir: PathLike | None = None
+) -> tuple[CacheReport, dict[str, Path]]:
+    """
+    Make sure each extension is in the cache, downloading any misses.
+
+    Returns:
+        The hit/miss report and the cached path of every extension that is
+        now available locally
+    """
+    report = CacheReport()
+    paths: dict[str, Path] = {}
+    downloads = asyncio.Semaphore(MAX_PARALLEL_DOWNLOADS)
+
+    async def fetch_miss(extension_id: str) -> None:
+        async with downloads:
+            try:
+                paths[extension_id] = await fetch(extension_id, cache_dir=cache_dir)
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Could not download {extension_id} into the VSIX cache: {e}")
+
+    for extension_id in extension_ids:
+        cached = find_cached(extension_id, cache_dir)
+        if cached is not None:
+            report.hits.append(extension_id)
+            paths[extension_id] = cached
+        else:
+            report.misses.append(extension_id)
+
+    await asyncio.gather(*(fetch_miss(extension_id) for extension_id in report.misses))
+    return report, paths
+
+
+async def seed(
+    extension_ids: list[str], vsix_files: list[PathLike], cache_dir: PathLike | None = None
+) -> CacheReport:
+    """
+    Pre-seed the cache from local VSIX files and the marketplace.
+
+    Args:
+        extension_ids: Extensions to download when not already cached
+        vsix_files: Existing .vsix files to import into the cache
+        cache_dir: The cache directory, defaulting to get_cache_dir()
+    """
+    for vsix_file in vsix_files:
+        try:
+            cached = store(Path(vsix_file).read_bytes(), cache_dir)
+            print(f"Cached {vsix_file} as {cached.name}")
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Could not import {vsix_file} into the VSIX cache: {e}")
+
+    report, _ = await populate(extension_ids, cache_dir)
+    return report
+
+
+__all__ = [
+    "CacheReport",
+    "fetch",
+    "find_cached",
+    "get_cache_dir",
+    "populate",
+    "read_vsix_identity",
+    "seed",
+    "store",
+]
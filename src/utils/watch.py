@@ -0,0 +1,235 @@
+"""
+File watching for dotfiles ``--watch`` mode.
+
+Watches the repo's config files and the paths the plans manage, and reports
+which of them changed so only the affected actions are re-applied. On Linux
+the kernel's inotify is used through ctypes; elsewhere, or when inotify is
+unavailable, the paths are polled with ``lstat``.
+
+Watches are placed on the parent directory of each path (or its nearest
+existing ancestor), since the files themselves are replaced atomically or
+deleted and re-created.
+"""
+
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+from abc import ABC, abstractmethod
+from collections.abc import Iterable
+from pathlib import Path
+
+from .plan import Action, Plan
+from .state import Probe, probe
+
+# Seconds to keep collecting changes after the first one, so an editor's
+# write-rename-chmod sequence is handled as one change
+DEBOUNCE = 0.2
+
+# Seconds between scans when polling
+POLL_INTERVAL = 1.0
+
+# inotify event masks, from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+)
+
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def existing_ancestor(path: Path) -> Path:
+    """Get the closest directory above path that exists."""
+    for parent in path.parents:
+        if parent.is_dir():
+            return parent
+    return Path(path.anchor)
+
+
+def watch_paths(action: Action) -> list[Path]:
+    """Get the paths whose changes affect an action."""
+    paths = list(action.probes())
+    source = getattr(action, "source", None)
+    if isinstance(source, Path):
+        paths.append(source)
+    return paths
+
+
+def affected_actions(plans: Iterable[Plan], changed: set[Path]) -> dict[str, list[Action]]:
+    """
+    Get the actions affected by changed paths, by module.
+
+    A change to a directory affects every action with a path inside it, e.g.
+    when a missing parent directory is created.
+    """
+    affected: dict[str, list[Action]] = {}
+    for plan in plans:
+        for action in plan.actions:
+            if any(
+                path == changed_path or changed_path in path.parents
+                for path in watch_paths(action)
+                for changed_path in changed
+            ):
+                affected.setdefault(plan.module, []).append(action)
+    return affected
+
+
+class Watcher(ABC):
+    """Reports changes to a set of paths."""
+
+    def __init__(self, paths: Iterable[Path]) -> None:
+        self.paths = set(paths)
+
+    @abstractmethod
+    async def wait(self) -> set[Path]:
+        """Wait for changes, returning the paths (or directories) that changed."""
+
+    @abstractmethod
+    def close(self) -> None:
+        """Stop watching."""
+
+
+class PollingWatcher(Watcher):
+    """Detects changes by comparing lstat signatures on an interval."""
+
+    def __init__(self, paths: Iterable[Path], interval: float = POLL_INTERVAL) -> None:
+        super().__init__(paths)
+        self.interval = interval
+        self._signatures = self._scan()
+
+    def _scan(self) -> dict[Path, Probe]:
+        return {path: probe([path]) for path in self.paths}
+
+    async def wait(self) -> set[Path]:
+        while True:
+            await asyncio.sleep(self.interval)
+            signatures = self._scan()
+            changed = {
+                path
+                for path, signature in signatures.items()
+                if self._signatures.get(path) != signature
+            }
+            self._signatures = signatures
+            if changed:
+                return changed
+
+    def close(self) -> None:
+        # Polling holds nothing open
+        pass
+
+
+class InotifyWatcher(Watcher):
+    """Watches the directories containing the paths with Linux inotify."""
+
+    def __init__(self, paths: Iterable[Path]) -> None:
+        super().__init__(paths)
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._directories: dict[int, Path] = {}
+        self._changed: set[Path] = set()
+        self._event = asyncio.Event()
+        self._add_watches()
+        asyncio.get_running_loop().add_reader(self._fd, self._read)
+
+    def _add_watches(self) -> None:
+        """Watch each path's parent, or its closest existing ancestor."""
+        directories = set()
+        for path in self.paths:
+            parent = path.parent if path.parent.is_dir() else existing_ancestor(path)
+            directories.add(parent)
+            # Watch config directories themselves, e.g. to catch files added to them
+            if path.is_dir() and not path.is_symlink():
+                directories.add(path)
+
+        for directory in directories - set(self._directories.values()):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+            if wd >= 0:
+                self._directories[wd] = directory
+
+    def _read(self) -> None:
+        """Read pending inotify events into the set of changed paths."""
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+
+            directory = self._directories.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                # The directory was deleted or moved; it is re-watched on the next wait
+                del self._directories[wd]
+                self._changed.add(directory)
+                continue
+            self._changed.add(directory / os.fsdecode(name) if name else directory)
+        self._event.set()
+
+    async def wait(self) -> set[Path]:
+        # Directories may have been created or deleted since the last wait
+        self._add_watches()
+        await self._event.wait()
+        await asyncio.sleep(DEBOUNCE)
+        changed, self._changed = self._changed, set()
+        self._event.clear()
+        return changed
+
+    def close(self) -> None:
+        asyncio.get_running_loop().remove_reader(self._fd)
+        os.close(self._fd)
+
+
+def open_watcher(paths: Iterable[Path]) -> Watcher:
+    """Watch paths with inotify where available, falling back to polling."""
+    paths = list(paths)
+    if sys.platform == "linux":
+        try:
+            return InotifyWatcher(paths)
+        except (OSError, AttributeError) as e:
+            print(f"⚠️  inotify unavailable ({e}), polling for changes instead")
+    return PollingWatcher(paths)
+
+
+__all__ = [
+    "DEBOUNCE",
+    "POLL_INTERVAL",
+    "InotifyWatcher",
+    "PollingWatcher",
+    "Watcher",
+    "affected_actions",
+    "existing_ancestor",
+    "open_watcher",
+    "watch_paths",
+]
@@ -0,0 +1,5 @@
+"""
+Tests for the dotfiles setup package.
+
+Run with ``python -m unittest discover tests``.
+"""
@@ -0,0 +1,58 @@
+"""Tests for the exit codes of --check."""
+
+import unittest
+from unittest import mock
+
+from src import main
+from src.utils.metrics import RunMetrics
+from src.utils.plan import PlanResult
+
+
+def check_metrics(**results: PlanResult) -> RunMetrics:
+    """Get run metrics with a plan result recorded for each named module."""
+    metrics = RunMetrics(dry_run=True)
+    for name, result in results.items():
+        metrics.record_plan(name, result)
+    return metrics
+
+
+class ReportCheckTest(unittest.TestCase):
+    def setUp(self) -> None:
+        patcher = mock.patch("builtins.print")
+        self.print = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.action = mock.Mock()
+
+    def printed(self) -> str:
+        return "\n".join(str(call.args[0]) for call in self.print.call_args_list)
+
+    def test_in_sync(self) -> None:
+        metrics = check_metrics(git=PlanResult(unchanged=[self.action]))
+
+        self.assertEqual(main.report_check(True, metrics), 0)
+
+    def test_unavailable_items_are_unverified(self) -> None:
+        metrics = check_metrics(
+            git=PlanResult(unchanged=[self.action]),
+            vscode=PlanResult(unavailable=[self.action, self.action]),
+        )
+
+        self.assertEqual(main.report_check(True, metrics), main.EXIT_UNVERIFIED)
+        self.assertIn("vscode (2)", self.printed())
+        self.assertNotIn("No drift", self.printed())
+
+    def test_drift_wins_over_unverified_items(self) -> None:
+        metrics = check_metrics(
+            git=PlanResult(changed=[self.action]),
+            vscode=PlanResult(unavailable=[self.action]),
+        )
+
+        self.assertEqual(main.report_check(True, metrics), main.EXIT_DRIFT)
+        self.assertIn("vscode (1)", self.printed())
+
+    def test_failed_check(self) -> None:
+        self.assertEqual(main.report_check(False, check_metrics()), main.EXIT_CHECK_FAILED)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+"""Tests for the batched macOS defaults backend, with `defaults` stood in for."""
+
+import asyncio
+import plistlib
+import subprocess
+import unittest
+from datetime import datetime
+from typing import Any
+from unittest import mock
+
+from src.utils.defaults import (
+    DefaultsBackend,
+    DefaultsValue,
+    DefaultsWrite,
+    defaults_command,
+    diff_domain,
+    merge_domain,
+    values_equal,
+)
+from src.utils.plan import BackendUnavailableError
+
+DOCK_PLIST = b"""<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE plist PUBLIC "-//Apple//DTD PLIST 1.0//EN" "http://www.apple.com/DTDs/PropertyList-1.0.dtd">
+<plist version="1.0">
+<dict>
+\t<key>autohide</key>
+\t<false/>
+\t<key>tilesize</key>
+\t<integer>48</integer>
+\t<key>autohide-delay</key>
+\t<real>0.5</real>
+\t<key>orientation</key>
+\t<string>bottom</string>
+\t<key>mod-count</key>
+\t<integer>12</integer>
+\t<key>lastShown</key>
+\t<date>2024-01-02T03:04:05Z</date>
+\t<key>persistent-apps</key>
+\t<array>
+\t\t<dict>
+\t\t\t<key>tile-type</key>
+\t\t\t<string>file-tile</string>
+\t\t</dict>
+\t</array>
+</dict>
+</plist>
+"""
+
+
+class FakeDefaults:
+    """Stands in for `defaults export` and `defaults import` on an in-memory store."""
+
+    def __init__(self, domains: dict[str, bytes]) -> None:
+        self.domains = domains
+        self.commands: list[list[str]] = []
+
+    async def run(
+        self, args: list[str], input_text: str | None = None, **kwargs: Any
+    ) -> subprocess.CompletedProcess[str]:
+        self.commands.append(args)
+        command, name = args[-3], args[-2]
+        if command == "export":
+            if name not in self.domains:
+                raise subprocess.CalledProcessError(1, args, "", f"Domain {name} does not exist")
+            return subprocess.CompletedProcess(args, 0, self.domains[name].decode(), "")
+        assert input_text is not None
+        self.domains[name] = input_text.encode()
+        return subprocess.CompletedProcess(args, 0, "", "")
+
+    def read(self, name: str) -> dict[str, Any]:
+        return dict(plistlib.loads(self.domains[name]))
+
+
+class ValuesTest(unittest.TestCase):
+    def test_types_must_match(self) -> None:
+        self.assertTrue(values_equal(True, True))
+        self.assertFalse(values_equal(1, True))
+        self.assertFalse(values_equal(False, 0))
+        self.assertFalse(values_equal("48", 48))
+        self.assertTrue(values_equal(48, 48))
+
+    def test_floats_compare_approximately(self) -> None:
+        self.assertTrue(values_equal(0.1 + 0.2, 0.3))
+        self.assertTrue(values_equal(2, 2.0))
+        self.assertFalse(values_equal(0.5, 0.0))
+
+    def test_current_host_scope(self) -> None:
+        self.assertEqual(
+            defaults_command(("com.apple.screensaver", True), "export", "-"),
+            ["defaults", "-currentHost", "export", "com.apple.screensaver", "-"],
+        )
+
+
+class DomainTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.current = plistlib.loads(DOCK_PLIST)
+
+    def test_diff_against_exported_plist(self) -> None:
+        desired: dict[str, DefaultsValue] = {
+            "autohide": True,
+            "tilesize": 48,
+            "autohide-delay": 0.0,
+            "magnification": True,
+        }
+
+        self.assertEqual(
+            diff_domain(self.current, desired),
+            {"autohide": True, "autohide-delay": 0.0, "magnification": True},
+        )
+
+    def test_merge_round_trips_unrelated_keys(self) -> None:
+        merged = plistlib.loads(merge_domain(self.current, {"autohide": True, "tilesize": 36}))
+
+        self.assertEqual(merged, {**self.current, "autohide": True, "tilesize": 36})
+        self.assertIsInstance(merged["lastShown"], datetime)
+        self.assertEqual(diff_domain(merged, {"autohide": True, "tilesize": 36}), {})
+
+
+class DefaultsBackendTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.defaults = FakeDefaults({"com.apple.dock": DOCK_PLIST})
+        patcher = mock.patch("src.utils.defaults.run_command", self.defaults.run)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.actions = [
+            DefaultsWrite("com.apple.dock", "autohide", True),
+            DefaultsWrite("com.apple.dock", "tilesize", 48),
+            DefaultsWrite("com.apple.finder", "ShowPathbar", True),
+        ]
+
+    def test_each_domain_is_exported_and_imported_once(self) -> None:
+        backend = DefaultsBackend()
+
+        changed = asyncio.run(backend.diff(self.actions))
+        self.assertEqual(changed, [self.actions[0], self.actions[2]])
+        with mock.patch("builtins.print"):
+            self.assertEqual(asyncio.run(backend.apply(changed)), {})
+
+        commands = [command[-3:-1] for command in self.defaults.commands]
+        self.assertEqual(commands.count(["export", "com.apple.dock"]), 2)
+        self.assertEqual(commands.count(["import", "com.apple.dock"]), 1)
+        self.assertEqual(commands.count(["import", "com.apple.finder"]), 1)
+
+        dock = self.defaults.read("com.apple.dock")
+        self.assertIs(dock["autohide"], True)
+        self.assertEqual(dock["persistent-apps"], [{"tile-type": "file-tile"}])
+        self.assertEqual(self.defaults.read("com.apple.finder"), {"ShowPathbar": True})
+        self.assertEqual(asyncio.run(backend.diff(self.actions)), [])
+
+    def test_unreadable_domain_is_not_overwritten(self) -> None:
+        self.defaults.domains["com.apple.dock"] = b"not a plist"
+
+        with mock.patch("builtins.print"):
+            failed = asyncio.run(DefaultsBackend().apply(self.actions[:1]))
+
+        self.assertEqual(list(failed), self.actions[:1])
+        self.assertEqual(self.defaults.domains["com.apple.dock"], b"not a plist")
+
+    def test_missing_defaults_command(self) -> None:
+        with (
+            mock.patch("src.utils.defaults.run_command", side_effect=FileNotFoundError),
+            self.assertRaises(BackendUnavailableError),
+        ):
+            asyncio.run(DefaultsBackend().diff(self.actions))
+
+
+if __name__ == "__main__":
+    unittest.main()
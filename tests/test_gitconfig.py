@@ -0,0 +1,91 @@
+"""Tests for the batched git config backend."""
+
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.utils.gitconfig import apply_config, diff_config, parse_config, update_config_text
+
+DESIRED = {"user.email": "alice@example.com", "user.name": "Alice", "core.editor": "vim"}
+
+
+class UpdateConfigTextTest(unittest.TestCase):
+    def test_empty_file_gets_one_header_per_section(self) -> None:
+        text = update_config_text("", DESIRED)
+
+        self.assertEqual(
+            text,
+            "[user]\n\temail = alice@example.com\n\tname = Alice\n[core]\n\teditor = vim\n",
+        )
+
+    def test_existing_file_keeps_sections_and_comments(self) -> None:
+        text = update_config_text(
+            "# My config\n[core]\n\tpager = less\n[user]\n\tname = Bob\n",
+            {**DESIRED, "alias.co": "checkout", "alias.st": "status"},
+        )
+
+        self.assertEqual(
+            text,
+            "# My config\n"
+            "[core]\n\tpager = less\n\teditor = vim\n"
+            "[user]\n\tname = Alice\n\temail = alice@example.com\n"
+            "[alias]\n\tco = checkout\n\tst = status\n",
+        )
+
+    def test_duplicate_section_emptied_by_replacement_is_removed(self) -> None:
+        text = update_config_text(
+            "[core]\n\teditor = nano\n[user]\n\tname = Alice\n[core]\n\teditor = emacs\n",
+            {"core.editor": "vim"},
+        )
+
+        self.assertEqual(text, "[core]\n\teditor = vim\n[user]\n\tname = Alice\n")
+
+    def test_assignment_on_header_line_is_replaced(self) -> None:
+        text = update_config_text(
+            "[core] editor = nano\n\tpager = less\n[user] # me\n", {"core.editor": "vim"}
+        )
+
+        self.assertEqual(text, "[core]\n\teditor = vim\n\tpager = less\n[user] # me\n")
+
+
+class ParseConfigTest(unittest.TestCase):
+    def test_assignment_on_header_line(self) -> None:
+        config = parse_config('[core] editor = nano\n[remote "a]b"] url = x\n[user] # me\n')
+
+        self.assertEqual(config, {"core.editor": ["nano"], "remote.a]b.url": ["x"]})
+        self.assertEqual(diff_config(config, {"core.editor": "nano"}), {})
+
+
+class ApplyConfigTest(unittest.TestCase):
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.path = Path(temp_dir.name) / ".gitconfig"
+
+    def test_missing_file(self) -> None:
+        changes = asyncio.run(apply_config(DESIRED, self.path))
+
+        self.assertEqual(changes, DESIRED)
+        text = self.path.read_text(encoding="utf-8")
+        self.assertEqual(text.count("[user]"), 1)
+        self.assertEqual(text.count("[core]"), 1)
+        self.assertEqual(parse_config(text), {key: [value] for key, value in DESIRED.items()})
+
+    def test_existing_file_is_updated_once(self) -> None:
+        self.path.write_text("[user]\n\tname = Bob\n[core]\n\tpager = less\n", encoding="utf-8")
+
+        self.assertEqual(
+            asyncio.run(apply_config(DESIRED, self.path)),
+            {"user.name": "Alice", "user.email": "alice@example.com", "core.editor": "vim"},
+        )
+        self.assertEqual(asyncio.run(apply_config(DESIRED, self.path)), {})
+
+        text = self.path.read_text(encoding="utf-8")
+        self.assertEqual(text.count("[user]"), 1)
+        self.assertEqual(text.count("[core]"), 1)
+        self.assertEqual(parse_config(text)["core.pager"], ["less"])
+
+
+if __name__ == "__main__":
+    unittest.main()
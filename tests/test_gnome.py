@@ -0,0 +1,139 @@
+"""Tests for reading and writing GNOME settings as dconf keyfiles."""
+
+import asyncio
+import subprocess
+import unittest
+from unittest import mock
+
+from src.utils.gnome import (
+    GSetting,
+    GSettingBackend,
+    common_dir,
+    format_keyfile,
+    gvariant_equal,
+    parse_keyfile,
+)
+
+TERMINAL = "/org/gnome/terminal/legacy/"
+PROFILE = f"{TERMINAL}profiles:/:b1dcc9dd-5262-4d8d-a863-c897e6d979b9/"
+
+# What `dconf dump /org/gnome/terminal/legacy/` prints
+TERMINAL_DUMP = """\
+[/]
+theme-variant='dark'
+
+[profiles:]
+default='b1dcc9dd-5262-4d8d-a863-c897e6d979b9'
+list=['b1dcc9dd-5262-4d8d-a863-c897e6d979b9']
+
+[profiles:/:b1dcc9dd-5262-4d8d-a863-c897e6d979b9]
+# comment
+font='Monospace 11'
+use-system-font=false
+custom-command='env A=1 zsh'
+"""
+
+
+class KeyfileTest(unittest.TestCase):
+    def test_dump_sections_are_relative_to_root(self) -> None:
+        self.assertEqual(
+            parse_keyfile(TERMINAL_DUMP, TERMINAL),
+            {
+                f"{TERMINAL}theme-variant": "'dark'",
+                f"{TERMINAL}profiles:/default": "'b1dcc9dd-5262-4d8d-a863-c897e6d979b9'",
+                f"{TERMINAL}profiles:/list": "['b1dcc9dd-5262-4d8d-a863-c897e6d979b9']",
+                f"{PROFILE}font": "'Monospace 11'",
+                f"{PROFILE}use-system-font": "false",
+                f"{PROFILE}custom-command": "'env A=1 zsh'",
+            },
+        )
+
+    def test_format_groups_keys_by_section(self) -> None:
+        settings = {
+            f"{PROFILE}font": "'Monospace 11'",
+            f"{TERMINAL}theme-variant": "'dark'",
+            f"{PROFILE}use-system-font": "false",
+        }
+
+        self.assertEqual(
+            format_keyfile(settings, TERMINAL),
+            "[profiles:/:b1dcc9dd-5262-4d8d-a863-c897e6d979b9]\n"
+            "font='Monospace 11'\n"
+            "use-system-font=false\n"
+            "\n"
+            "[/]\n"
+            "theme-variant='dark'\n",
+        )
+
+    def test_format_round_trips_through_parse(self) -> None:
+        settings = parse_keyfile(TERMINAL_DUMP, TERMINAL)
+
+        self.assertEqual(parse_keyfile(format_keyfile(settings, TERMINAL), TERMINAL), settings)
+        self.assertEqual(parse_keyfile(format_keyfile(settings)), settings)
+
+
+class CommonDirTest(unittest.TestCase):
+    def test_deepest_directory_holding_every_key(self) -> None:
+        self.assertEqual(
+            common_dir(
+                [
+                    "/org/gnome/desktop/peripherals/mouse/speed",
+                    "/org/gnome/desktop/peripherals/touchpad/speed",
+                ]
+            ),
+            "/org/gnome/desktop/peripherals/",
+        )
+        self.assertEqual(common_dir([f"{PROFILE}font"]), PROFILE)
+        self.assertEqual(common_dir([f"{PROFILE}font", f"{TERMINAL}theme-variant"]), TERMINAL)
+        self.assertEqual(common_dir(["/org/gnome/foo", "/com/example/bar"]), "/")
+
+
+class GVariantTest(unittest.TestCase):
+    def test_equal_values(self) -> None:
+        self.assertTrue(gvariant_equal("-0.29999999999999999", "-0.3"))
+        self.assertTrue(gvariant_equal("uint32 5", "5"))
+        self.assertTrue(gvariant_equal("@i 0", "0"))
+        self.assertTrue(gvariant_equal("'flat'", '"flat"'))
+        self.assertTrue(gvariant_equal("'it\\'s'", '"it\'s"'))
+        self.assertTrue(gvariant_equal("['a', 'b']", "['a', 'b']"))
+
+    def test_different_values(self) -> None:
+        self.assertFalse(gvariant_equal(None, "false"))
+        self.assertFalse(gvariant_equal("false", "0"))
+        self.assertFalse(gvariant_equal("true", "1"))
+        self.assertFalse(gvariant_equal("'5'", "5"))
+        self.assertFalse(gvariant_equal("-0.3", "-0.2"))
+
+
+class GSettingBackendTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.run_command = mock.AsyncMock(
+            return_value=subprocess.CompletedProcess([], 0, TERMINAL_DUMP, "")
+        )
+        patcher = mock.patch("src.utils.gnome.run_command", self.run_command)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.actions = [
+            GSetting(f"{PROFILE}font", "'Monospace 11'"),
+            GSetting(f"{PROFILE}use-system-font", "true"),
+            GSetting(f"{TERMINAL}theme-variant", '"dark"'),
+        ]
+
+    def test_diff_dumps_the_common_directory_once(self) -> None:
+        changed = asyncio.run(GSettingBackend().diff(self.actions))
+
+        self.assertEqual(changed, [self.actions[1]])
+        self.run_command.assert_awaited_once_with(["dconf", "dump", TERMINAL], timeout=10)
+
+    def test_apply_loads_one_keyfile(self) -> None:
+        with mock.patch("builtins.print"):
+            failed = asyncio.run(GSettingBackend().apply(self.actions[1:2]))
+
+        self.assertEqual(failed, {})
+        self.run_command.assert_awaited_once_with(
+            ["dconf", "load", PROFILE], input_text="[/]\nuse-system-font=true\n", timeout=10
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
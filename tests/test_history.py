@@ -0,0 +1,36 @@
+"""Tests for the local run history."""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.utils.history import get_module_durations, get_trends, record_run
+from src.utils.metrics import RunMetrics
+
+
+class HistoryTest(unittest.TestCase):
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.path = Path(temp_dir.name) / "state" / "history.sqlite3"
+
+    def test_reading_missing_history_creates_nothing(self) -> None:
+        self.assertEqual(get_module_durations(self.path), {})
+        self.assertEqual(get_trends(self.path), [])
+
+        self.assertFalse(self.path.parent.exists())
+
+    def test_recorded_runs_are_read_back(self) -> None:
+        for duration in (1.0, 3.0, 2.0):
+            metrics = RunMetrics()
+            metrics.record_module("git", duration, success=True)
+            record_run(metrics, success=True, platform="linux", path=self.path)
+
+        self.assertEqual(get_module_durations(self.path), {"git": 2.0})
+        [trend] = get_trends(self.path)
+        self.assertEqual(trend.durations, [1.0, 3.0, 2.0])
+        self.assertEqual(trend.baseline, 2.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+"""Tests that each module runs once per run, with the platform forced to Windows."""
+
+import asyncio
+import unittest
+from collections import Counter
+from unittest import mock
+
+from src import main
+from src.modules import git, starship, vscode, windows
+
+GENERIC_MODULES = ("git", "starship", "vscode")
+
+
+class WindowsModuleRunsTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.runs: Counter[str] = Counter()
+        self.failing: set[str] = set()
+
+        async def load_and_run_module(module_name: str, dry_run: bool) -> bool:
+            self.runs[module_name] += 1
+            # Let other modules start, so concurrent requests overlap
+            await asyncio.sleep(0)
+            return module_name not in self.failing
+
+        for target, replacement in (
+            ("src.main.get_current_platform", mock.Mock(return_value="windows")),
+            ("src.utils.file_ops.get_platform", mock.Mock(return_value="windows")),
+            ("src.main.get_learned_durations", mock.Mock(return_value={})),
+            ("src.main.load_and_run_module", load_and_run_module),
+        ):
+            patcher = mock.patch(target, replacement)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def test_dependencies_run_once(self) -> None:
+        with mock.patch("builtins.print"):
+            self.assertTrue(await main.run_with_dependencies("windows"))
+
+        self.assertEqual(self.runs, Counter({*GENERIC_MODULES, "windows"}))
+
+    async def test_all_modules_run_once(self) -> None:
+        with mock.patch("builtins.print"):
+            self.assertTrue(await main.run_all_modules())
+
+        self.assertEqual(self.runs, Counter({*GENERIC_MODULES, "windows"}))
+
+    async def test_concurrent_requests_share_runs(self) -> None:
+        with mock.patch("builtins.print"):
+            results = await asyncio.gather(
+                main.run_with_dependencies("windows"),
+                main.run_module("git"),
+                main.run_with_dependencies("windows"),
+            )
+
+        self.assertEqual(results, [True, True, True])
+        self.assertEqual(self.runs, Counter({*GENERIC_MODULES, "windows"}))
+
+    async def test_failed_dependency_does_not_skip_windows(self) -> None:
+        self.failing.add("vscode")
+
+        with mock.patch("builtins.print"):
+            self.assertFalse(await main.run_with_dependencies("windows"))
+
+        self.assertEqual(self.runs, Counter({*GENERIC_MODULES, "windows"}))
+
+    async def test_failed_dependency_fails_the_run(self) -> None:
+        self.failing.add("git")
+
+        with mock.patch("builtins.print"):
+            self.assertFalse(await main.run_all_modules())
+
+        self.assertEqual(self.runs, Counter({*GENERIC_MODULES, "windows"}))
+
+
+class WindowsStandaloneSetupTest(unittest.IsolatedAsyncioTestCase):
+    async def test_generic_modules_set_up_once(self) -> None:
+        setups = {name: mock.AsyncMock() for name in GENERIC_MODULES}
+        with (
+            mock.patch.object(git, "setup", setups["git"]),
+            mock.patch.object(starship, "setup", setups["starship"]),
+            mock.patch.object(vscode, "setup", setups["vscode"]),
+            mock.patch.object(windows, "execute", mock.AsyncMock()) as execute,
+        ):
+            await windows.setup()
+
+        for setup in setups.values():
+            setup.assert_awaited_once()
+        execute.assert_awaited_once_with(windows.build_plan, windows.__name__)
+
+
+if __name__ == "__main__":
+    unittest.main()
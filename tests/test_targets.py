@@ -0,0 +1,79 @@
+"""Tests for applying plans to other homes."""
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.utils.targets import HomeTarget, RootTarget, hand_over
+
+OWNER = (1234, 1234)
+
+
+@unittest.skipUnless(hasattr(os, "geteuid") and os.geteuid() == 0, "chown needs root")
+class HandOverTest(unittest.TestCase):
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        root = Path(temp_dir.name)
+        self.repo = root / "repo" / "config" / "nvim"
+        self.repo.mkdir(parents=True)
+        (self.repo / "init.lua").write_text("", encoding="utf-8")
+        self.home = root / "home"
+        self.home.mkdir()
+        os.chown(self.home, *OWNER)
+        self.target = HomeTarget(path=self.home, planned_home=Path.home())
+
+    def test_links_are_handed_over_without_their_targets(self) -> None:
+        link = self.home / ".config" / "nvim"
+        link.parent.mkdir()
+        link.symlink_to(self.repo)
+
+        self.assertEqual(hand_over(self.target, [link], OWNER), 2)
+
+        self.assertEqual((link.lstat().st_uid, link.lstat().st_gid), OWNER)
+        self.assertEqual(link.parent.stat().st_uid, OWNER[0])
+        self.assertEqual(self.repo.stat().st_uid, 0)
+        self.assertEqual((self.repo / "init.lua").stat().st_uid, 0)
+
+    def test_copied_directories_are_handed_over_whole(self) -> None:
+        copy = self.home / ".config" / "nvim"
+        copy.mkdir(parents=True)
+        (copy / "init.lua").write_text("", encoding="utf-8")
+
+        self.assertEqual(hand_over(self.target, [copy], OWNER), 3)
+
+        self.assertEqual((copy / "init.lua").stat().st_uid, OWNER[0])
+
+
+class RootTargetMovesTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.home = Path("/home/alice")
+        self.repo = self.home / "src" / "dotfiles"
+        moves = ((self.repo, Path("/opt/dotfiles")), (self.home, Path("/home/dotfiles")))
+        self.target = RootTarget(Path("/stage"), self.home, moves)
+
+    def test_paths_are_moved_into_the_stage(self) -> None:
+        self.assertEqual(self.target.home, Path("/stage/home/dotfiles"))
+        self.assertEqual(
+            self.target.place(self.home / ".gitconfig"), Path("/stage/home/dotfiles/.gitconfig")
+        )
+        self.assertEqual(
+            self.target.place(self.repo / "config" / "zsh"), Path("/stage/opt/dotfiles/config/zsh")
+        )
+        self.assertEqual(self.target.place(Path("/etc/dconf")), Path("/stage/etc/dconf"))
+
+    def test_values_and_links_use_runtime_paths(self) -> None:
+        self.assertEqual(
+            self.target.rewrite(f"{self.home}/.gitignore_global"),
+            "/home/dotfiles/.gitignore_global",
+        )
+        self.assertEqual(self.target.rewrite("vim"), "vim")
+        self.assertEqual(
+            self.target.link(self.repo / "config" / "zsh" / ".zshrc"),
+            Path("/opt/dotfiles/config/zsh/.zshrc"),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()